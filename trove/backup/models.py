@@ -25,6 +25,7 @@ from trove.common.i18n import _
 from trove.common.remote import create_swift_client
 from trove.common import utils
 from trove.datastore import models as datastore_models
+from trove.db import get_db_api
 from trove.db.models import DatabaseModelBase
 from trove.quota.quota import run_with_quotas
 from trove.taskmanager import api
@@ -131,6 +132,18 @@ class Backup(object):
             query = query.filter(DBBackup.id != exclude)
         return query.first()
 
+    @classmethod
+    def running_for_tenant(cls, tenant_id):
+        """
+        Returns the first running backup of the tenant
+        :param tenant_id: Id of the tenant
+        """
+        query = DBBackup.query()
+        query = query.filter(DBBackup.tenant_id == tenant_id,
+                             DBBackup.state.in_(BackupState.RUNNING_STATES))
+        query = query.filter_by(deleted=False)
+        return query.first()
+
     @classmethod
     def get_by_id(cls, context, backup_id, deleted=False):
         """
@@ -151,22 +164,19 @@ class Backup(object):
     @classmethod
     def _paginate(cls, context, query):
         """Paginate the results of the base query.
-        We use limit/offset as the results need to be ordered by date
-        and not the primary key.
+        Backups are listed most recent first, ordered on (updated, id), and
+        the marker is the id of the last backup of the previous page. Pages
+        are selected on those columns rather than with an offset so that
+        every page is equally cheap and rows do not shift between pages.
         """
-        marker = int(context.marker or 0)
         limit = int(context.limit or CONF.backups_page_size)
-        # order by 'updated DESC' to show the most recent backups first
-        query = query.order_by(desc(DBBackup.updated))
-        # Apply limit/offset
-        query = query.limit(limit)
-        query = query.offset(marker)
+        backups = get_db_api().paginate_query(
+            query, DBBackup, limit + 1, context.marker,
+            sort_keys=['updated', 'id'], sort_dirs=['desc', 'desc'])
         # check if we need to send a marker for the next page
-        if query.count() < limit:
-            marker = None
-        else:
-            marker += limit
-        return query.all(), marker
+        if len(backups) > limit:
+            return backups[:limit], backups[limit - 1].id
+        return backups, None
 
     @classmethod
     def list(cls, context, datastore=None):
@@ -216,17 +226,16 @@ class Backup(object):
         :param include_incremental:
         :return:
         """
-        last_backup = None
-        backups, marker = cls.list_for_instance(context, instance_id)
-        # we don't care about the marker since we only want the first backup
-        # and they are ordered descending based on date (what we want)
-        for backup in backups:
-            if backup.state == BackupState.COMPLETED and (
-                    include_incremental or not backup.parent_id):
-                if not last_backup or backup.updated > last_backup.updated:
-                    last_backup = backup
-
-        return last_backup
+        query = DBBackup.query()
+        query = query.filter_by(instance_id=instance_id,
+                                state=BackupState.COMPLETED,
+                                deleted=False)
+        if not context.is_admin:
+            query = query.filter_by(tenant_id=context.tenant)
+        if not include_incremental:
+            query = query.filter(DBBackup.parent_id.is_(None))
+        query = query.order_by(desc(DBBackup.updated), desc(DBBackup.id))
+        return query.first()
 
     @classmethod
     def fail_for_instance(cls, instance_id):
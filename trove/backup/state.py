@@ -22,5 +22,6 @@ class BackupState(object):
     COMPLETED = "COMPLETED"
     FAILED = "FAILED"
     DELETE_FAILED = "DELETE_FAILED"
+    DELETING = "DELETING"
     RUNNING_STATES = [NEW, BUILDING, SAVING]
     END_STATES = [COMPLETED, FAILED, DELETE_FAILED]
@@ -127,6 +127,21 @@ common_opts = [
                help='Page size for listing backups.'),
     cfg.IntOpt('configurations_page_size', default=20,
                help='Page size for listing configurations.'),
+    cfg.IntOpt('configuration_rules_cache_size', default=100,
+               help='Number of datastore versions whose configuration '
+                    'parameters are kept compiled for validating '
+                    'configuration groups.'),
+    cfg.IntOpt('configuration_rules_cache_ttl', default=60,
+               help='Time (in seconds) after which the compiled '
+                    'configuration parameters of a datastore version are '
+                    'reloaded, to pick up changes made by other processes.'),
+    cfg.IntOpt('configuration_update_batch_size', default=100,
+               help='Number of instances loaded at a time when the task '
+                    'manager pushes a configuration group update to the '
+                    'instances it is attached to.'),
+    cfg.IntOpt('configuration_update_concurrency', default=10,
+               help='Number of instances a configuration group update is '
+                    'pushed to concurrently.'),
     cfg.ListOpt('ignore_users', default=['os_admin', 'root'],
                 help='Users to exclude when listing users.'),
     cfg.ListOpt('ignore_dbs',
@@ -142,6 +157,27 @@ common_opts = [
     cfg.IntOpt('agent_replication_snapshot_timeout', default=36000,
                help='Maximum time (in seconds) to wait for taking a Guest '
                     'Agent replication snapshot.'),
+    cfg.IntOpt('replication_stream_port', default=0,
+               help='Port on which replication sources stream their snapshot '
+                    'straight to new replicas, instead of through a backup '
+                    'in Swift. The port must be open between instances (see '
+                    'tcp_ports). 0 always uses Swift, which also remains the '
+                    'fallback for datastores that cannot stream.'),
+    cfg.IntOpt('replication_stream_max_offers', default=1,
+               help='Maximum number of new replicas of one batch to which a '
+                    'replication source streams its snapshot at the same '
+                    'time. Each stream runs its own backup on the source, so '
+                    'the other replicas wait until one is restored.'),
+    cfg.IntOpt('replication_stream_max_rate', default=0,
+               help='Maximum rate (in bytes per second) at which a '
+                    'replication source streams its snapshot to each replica. '
+                    '0 does not limit it.'),
+    cfg.IntOpt('replication_stream_accept_timeout', default=3600,
+               help='Maximum time (in seconds) a replication source waits '
+                    'for the new replica to start receiving its snapshot.'),
+    cfg.IntOpt('replication_stream_timeout', default=600,
+               help='Maximum time (in seconds) without progress on a '
+                    'snapshot stream before it is abandoned.'),
     # The guest_id opt definition must match the one in cmd/guest.py
     cfg.StrOpt('guest_id', default=None, help="ID of the Guest Instance."),
     cfg.IntOpt('state_change_wait_time', default=3 * 60,
@@ -152,6 +188,18 @@ common_opts = [
     cfg.IntOpt('agent_heartbeat_expiry', default=60,
                help='Time (in seconds) after which a guest is considered '
                     'unreachable'),
+    cfg.IntOpt('agent_heartbeat_keepalive', default=180,
+               help='Maximum time (in seconds) between two heartbeats of a '
+                    'guest whose status does not change. Guests always send '
+                    'a heartbeat when their status changes. A status is '
+                    'considered stale once no heartbeat was received for '
+                    'agent_heartbeat_keepalive plus agent_heartbeat_expiry '
+                    'seconds. Set to 0 to send a heartbeat on every status '
+                    'check.'),
+    cfg.FloatOpt('agent_heartbeat_keepalive_jitter', default=0.2,
+                 help='Fraction of agent_heartbeat_keepalive by which each '
+                      'keepalive heartbeat is randomly brought forward, so '
+                      'guests started together do not send them together.'),
     cfg.IntOpt('num_tries', default=3,
                help='Number of times to check if a volume exists.'),
     cfg.StrOpt('volume_fstype', default='ext3',
@@ -182,6 +230,19 @@ common_opts = [
     cfg.IntOpt('trove_conductor_workers',
                help='Number of workers for the Conductor service. The default '
                'will be the number of CPUs available.'),
+    cfg.FloatOpt('conductor_heartbeat_batch_interval', default=0,
+                 help='Interval (in seconds) over which the Conductor buffers '
+                 'guest heartbeats, keeping only the newest per instance, '
+                 'before saving them to the database in bulk. A value of 0 '
+                 'saves every heartbeat as it arrives.'),
+    cfg.IntOpt('conductor_last_seen_cache_size', default=10000,
+               help='Number of (instance, message type) pairs for which the '
+               'Conductor caches the time of the last message it accepted, '
+               'to discard messages arriving out of order without reading '
+               'the database.'),
+    cfg.IntOpt('conductor_last_seen_cache_ttl', default=600,
+               help='Time (in seconds) after which the Conductor reloads a '
+               'cached last message time from the database.'),
     cfg.BoolOpt('use_nova_server_config_drive', default=False,
                 help='Use config drive for file injection when booting '
                 'instance.'),
@@ -196,6 +257,13 @@ common_opts = [
                help='The default datastore id or name to use if one is not '
                'provided by the user. If the default value is None, the field '
                'becomes required in the instance create request.'),
+    cfg.IntOpt('datastore_cache_size', default=1000,
+               help='Number of datastores, datastore versions and datastore '
+               'version capabilities each kept in the in-process caches.'),
+    cfg.IntOpt('datastore_cache_ttl', default=60,
+               help='Time (in seconds) after which a cached datastore, '
+               'datastore version or capability is reloaded, to pick up '
+               'changes made by other processes.'),
     cfg.StrOpt('datastore_manager', default=None,
                help='Manager class in the Guest Agent, set up by the '
                'Taskmanager on instance provision.'),
@@ -219,6 +287,9 @@ common_opts = [
                     'revert.'),
     cfg.IntOpt('cluster_delete_time_out', default=60 * 3,
                help='Maximum time (in seconds) to wait for a cluster delete.'),
+    cfg.IntOpt('cluster_guest_call_concurrency', default=10,
+               help='Maximum number of cluster instances the task manager '
+                    'calls at once while building or growing a cluster.'),
     cfg.ListOpt('root_grant', default=['ALL'],
                 help="Permissions to grant to the 'root' user."),
     cfg.BoolOpt('root_grant_option', default=True,
@@ -274,6 +345,40 @@ common_opts = [
                 help='Encrypt backups using OpenSSL.'),
     cfg.StrOpt('backup_aes_cbc_key', default='default_aes_cbc_key',
                help='Default OpenSSL aes_cbc key.'),
+    cfg.StrOpt('backup_aes_cbc_digest', default='md5',
+               help='Digest the in-process codecs derive the OpenSSL aes_cbc '
+               'key with. It must match the default of the openssl command '
+               'on the guests for backups to be restored either way, md5 '
+               'before OpenSSL 1.1.0 and sha256 since.'),
+    cfg.BoolOpt('backup_use_inprocess_codecs', default=False,
+                help='Compress and encrypt backups (and decompress and '
+                'decrypt them on restore) inside the guest agent instead of '
+                'piping the stream through gzip and openssl processes. The '
+                'stream format is unchanged.'),
+    cfg.IntOpt('backup_compression_level', default=6,
+               help='Compression level (1-9) used by the in-process gzip '
+               'codec.'),
+    cfg.IntOpt('backup_compression_threads', default=4,
+               help='Number of blocks the in-process gzip codec compresses '
+               'in parallel.'),
+    cfg.IntOpt('backup_compression_block_size', default=1024 ** 2,
+               help='Size (in bytes) of the blocks the in-process gzip codec '
+               'compresses independently.'),
+    cfg.BoolOpt('guest_root_helper', default=False,
+                help='Run the privileged file operations of the guest agent '
+                'in a long-lived root helper process, started once with '
+                'sudo, instead of a sudo command each. Falls back to sudo '
+                'commands if the helper cannot be started.'),
+    cfg.StrOpt('guest_root_helper_dir', default='/var/run/trove',
+               help='Directory of the root helper socket of the guest '
+               'agent.'),
+    cfg.IntOpt('guest_root_helper_start_timeout', default=10,
+               help='Maximum time (in seconds) to wait for the root helper '
+               'of the guest agent to start.'),
+    cfg.FloatOpt('guest_status_probe_timeout', default=3.0,
+                 help='Maximum time (in seconds) the guest agent waits for '
+                 'the database to answer its in-process status ping before '
+                 'falling back to status commands.'),
     cfg.BoolOpt('backup_use_snet', default=False,
                 help='Send backup files over snet.'),
     cfg.IntOpt('backup_chunk_size', default=2 ** 16,
@@ -285,6 +390,44 @@ common_opts = [
     cfg.IntOpt('backup_segment_max_size', default=2 * (1024 ** 3),
                help='Maximum size (in bytes) of each segment of the backup '
                'file.'),
+    cfg.IntOpt('backup_upload_concurrency', default=1,
+               help='Number of backup segments to upload to the Swift '
+               'container concurrently. A value of 1 streams each segment '
+               'directly from the backup process without buffering.'),
+    cfg.IntOpt('backup_upload_buffer_size', default=512 * (1024 ** 2),
+               help='Maximum amount of memory (in bytes) used to buffer '
+               'backup segments when backup_upload_concurrency is greater '
+               'than 1. Segments are sized so that all in-flight uploads '
+               'fit within this limit.'),
+    cfg.IntOpt('backup_download_concurrency', default=1,
+               help='Number of ranged requests used to download the '
+               'segments of a backup from the Swift container concurrently '
+               'during restore. A value of 1 streams the backup manifest '
+               'with a single request.'),
+    cfg.IntOpt('backup_download_range_size', default=32 * (1024 ** 2),
+               help='Size (in bytes) of each ranged request used when '
+               'backup_download_concurrency is greater than 1. At most '
+               'backup_download_concurrency ranges are held in memory.'),
+    cfg.IntOpt('backup_delete_concurrency', default=10,
+               help='Number of backup segments the task manager deletes '
+               'from the Swift container concurrently.'),
+    cfg.IntOpt('backup_dedup_min_chunk_size', default=1024 ** 2,
+               help='Minimum size (in bytes) of the content-defined chunks '
+               'the SwiftDedupStorage strategy splits backups into.'),
+    cfg.IntOpt('backup_dedup_avg_chunk_size', default=4 * (1024 ** 2),
+               help='Expected size (in bytes), beyond the minimum, of the '
+               'content-defined chunks the SwiftDedupStorage strategy splits '
+               'backups into. Rounded down to a power of 2.'),
+    cfg.IntOpt('backup_dedup_max_chunk_size', default=16 * (1024 ** 2),
+               help='Maximum size (in bytes) of the content-defined chunks '
+               'the SwiftDedupStorage strategy splits backups into. Each '
+               'chunk in flight is held in memory.'),
+    cfg.IntOpt('backup_dedup_gc_interval', default=3600,
+               help='Minimum time (in seconds) between two passes of the '
+               'task manager collecting the deduplicated backup chunks no '
+               'longer referenced in a container. Unreferenced chunks are '
+               'deleted by the first pass after the one which found them, '
+               'when a backup is deleted.'),
     cfg.StrOpt('remote_dns_client',
                default='trove.common.remote.dns_client',
                help='Client to send DNS calls to.'),
@@ -310,6 +453,9 @@ common_opts = [
                help='Transformer for exists notifications.'),
     cfg.IntOpt('exists_notification_interval', default=3600,
                help='Seconds to wait between pushing events.'),
+    cfg.IntOpt('exists_notification_batch_size', default=200,
+               help='Number of instances loaded, transformed and published '
+                    'at a time when pushing exists events.'),
     cfg.DictOpt('notification_service_id',
                 default={'mysql': '2f3ff068-2bfb-4f70-9a9d-a6bb65bc084b',
                          'percona': 'fd1723f5-68d2-409c-994f-a4a197892a17',
@@ -389,6 +535,12 @@ common_opts = [
     cfg.IntOpt('cluster_usage_timeout', default=36000,
                help='Maximum time (in seconds) to wait for a cluster to '
                     'become active.'),
+    cfg.FloatOpt('cluster_ready_poll_interval', default=0.5,
+                 help='Initial time (in seconds) to wait between checks of '
+                      'the services of cluster instances becoming ready. '
+                      'It doubles after each check up to usage_sleep_time, '
+                      'and a status update saved by this process triggers '
+                      'the next check early.'),
     cfg.IntOpt('timeout_wait_for_service', default=120,
                help='Maximum time (in seconds) to wait for a service to '
                     'become alive.'),
@@ -422,6 +574,22 @@ database_opts = [
                 default=False,
                 deprecated_name='sql_query_log',
                 deprecated_group='DEFAULT'),
+    cfg.IntOpt('max_pool_size',
+               default=5,
+               help='Maximum number of connections kept open in the pool.'),
+    cfg.IntOpt('max_overflow',
+               default=10,
+               help='Number of connections that may be opened beyond '
+                    'max_pool_size when the pool is exhausted.'),
+    cfg.IntOpt('pool_timeout',
+               default=30,
+               help='Seconds to wait for a connection from the pool before '
+                    'giving up.'),
+    cfg.BoolOpt('pool_pre_ping',
+                default=False,
+                help='Check connections are alive before using them, so '
+                     'that connections dropped by the server are replaced '
+                     'transparently.'),
 ]
 
 
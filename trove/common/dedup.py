@@ -0,0 +1,126 @@
+# Copyright 2015 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Layout of the deduplicated backup chunk store in Swift.
+
+A deduplicated backup is a manifest object listing, in order, the chunks
+that make up the backup stream. Each chunk is stored once under
+CHUNK_PREFIX, named after the SHA-256 of its contents, and is shared by
+every backup in the container that contains it.
+
+Chunks no manifest references anymore are collected in two passes. A pass
+first marks them in UNREFERENCED_OBJECT, and new backups upload marked
+chunks again rather than rely on them. A later pass deletes the marked
+chunks that are still unreferenced and were not uploaded again since.
+"""
+
+import collections
+import json
+
+from swiftclient.client import ClientException
+
+from trove.common.i18n import _
+
+MANIFEST_CONTENT_TYPE = 'application/x-trove-dedup-manifest'
+MANIFEST_VERSION = 1
+CHUNK_PREFIX = 'chunks/'
+UNREFERENCED_OBJECT = 'dedup-unreferenced-chunks'
+
+
+class ManifestError(Exception):
+    """The manifest of a deduplicated backup could not be read."""
+
+
+def chunk_name(digest):
+    """Name of the object holding the chunk with the given digest."""
+    return CHUNK_PREFIX + digest
+
+
+def dump_manifest(chunks):
+    """Serialize an ordered list of (digest, size) chunks."""
+    return json.dumps({'version': MANIFEST_VERSION,
+                       'chunks': [[digest, size]
+                                  for digest, size in chunks]})
+
+
+def load_manifest(body):
+    """Return the ordered list of (digest, size) chunks of a manifest."""
+    try:
+        manifest = json.loads(body)
+        if manifest['version'] != MANIFEST_VERSION:
+            raise ManifestError(_("Unsupported manifest version: %s.")
+                                % manifest['version'])
+        return [(digest, size) for digest, size in manifest['chunks']]
+    except (ValueError, TypeError, KeyError):
+        raise ManifestError(_("Malformed deduplicated backup manifest."))
+
+
+def is_manifest(headers):
+    """Whether the object headers belong to a deduplicated backup."""
+    content_type = headers.get('content-type', '').split(';')[0]
+    return content_type.strip() == MANIFEST_CONTENT_TYPE
+
+
+def list_chunks(client, container):
+    """Map the digest of each chunk stored in the container to the time it
+    was last modified, as listed by swift.
+    """
+    headers, objects = client.get_container(container, prefix=CHUNK_PREFIX,
+                                            full_listing=True)
+    return dict((obj['name'][len(CHUNK_PREFIX):], obj.get('last_modified'))
+                for obj in objects if obj['name'].startswith(CHUNK_PREFIX))
+
+
+def stored_chunks(client, container):
+    """Digests of all the chunks stored in the container."""
+    return set(list_chunks(client, container))
+
+
+def load_unreferenced(client, container):
+    """Return the time of the last collection pass on the container and the
+    chunks it marked as unreferenced, as returned by list_chunks.
+    """
+    try:
+        headers, body = client.get_object(container, UNREFERENCED_OBJECT)
+    except ClientException as e:
+        if e.http_status == 404:
+            return None, {}
+        raise
+    try:
+        unreferenced = json.loads(body)
+        return unreferenced['collected_at'], unreferenced['chunks']
+    except (ValueError, TypeError, KeyError):
+        raise ManifestError(_("Malformed list of unreferenced chunks."))
+
+
+def save_unreferenced(client, container, collected_at, chunks):
+    """Record a collection pass and the unreferenced chunks it marked."""
+    client.put_object(container, UNREFERENCED_OBJECT,
+                      json.dumps({'collected_at': collected_at,
+                                  'chunks': chunks}),
+                      content_type='application/json')
+
+
+def chunk_references(client, container):
+    """Count the references to each chunk from the manifests in container."""
+    headers, objects = client.get_container(container, full_listing=True)
+    references = collections.Counter()
+    for obj in objects:
+        if obj.get('content_type') != MANIFEST_CONTENT_TYPE:
+            continue
+        headers, body = client.get_object(container, obj['name'])
+        for digest, size in load_manifest(body):
+            references[digest] += 1
+    return references
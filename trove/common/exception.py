@@ -537,6 +537,18 @@ class ClusterDatastoreNotSupported(TroveError):
                 "%(datastore)s-%(datastore_version)s.")
 
 
+class ClusterInstancesOperationError(TroveError):
+    message = _("Operation failed on cluster instances: %(failures)s.")
+
+    def __init__(self, errors):
+        """:param errors: Map of instance id to the error raised for it."""
+        self.errors = errors
+        failures = ", ".join("%s (%s)" % (instance_id, error)
+                             for instance_id, error in sorted(errors.items()))
+        super(ClusterInstancesOperationError, self).__init__(
+            failures=failures)
+
+
 class BackupTooLarge(TroveError):
     message = _("Backup is too large for given flavor or volume. "
                 "Backup size: %(backup_size)s GBs. "
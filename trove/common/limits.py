@@ -19,8 +19,11 @@ Module dedicated functions/classes dealing with rate limiting requests.
 
 import collections
 import copy
+import ctypes
+import hashlib
 import httplib
 import math
+import multiprocessing
 import re
 import time
 
@@ -96,28 +99,40 @@ class Limit(object):
         @param verb: string http verb (POST, GET, etc.)
         @param url: string URL
         """
-        if self.verb != verb or not re.match(self.regex, url):
+        if not self.matches(verb, url):
             return
+        return self.record_request()
 
+    def record_request(self):
+        """
+        Count a request against this limit.
+
+        @return: The delay (in seconds) before the request could be made, or
+                 None if it can be made now.
+        """
         now = self._get_time()
 
         if self.last_request is None:
             self.last_request = now
 
-        leak_value = now - self.last_request
+        water_level, delay = leak_bucket(self.water_level, self.last_request,
+                                         now, self.capacity,
+                                         self.request_value)
+        self.set_level(water_level, now, delay)
+        return delay
 
-        self.water_level -= leak_value
-        self.water_level = max(self.water_level, 0)
-        self.water_level += self.request_value
-
-        difference = self.water_level - self.capacity
+    def matches(self, verb, url):
+        """Whether a request with this verb and url counts against this."""
+        return self.verb == verb and re.match(self.regex, url) is not None
 
+    def set_level(self, water_level, now, delay=None):
+        """Record the bucket level after a request made at now."""
+        self.water_level = water_level
         self.last_request = now
 
-        if difference > 0:
-            self.water_level -= self.request_value
-            self.next_request = now + difference
-            return difference
+        if delay:
+            self.next_request = now + delay
+            return
 
         cap = self.capacity
         water = self.water_level
@@ -146,6 +161,25 @@ class Limit(object):
             "resetTime": int(self.next_request or self._get_time()),
         }
 
+
+def leak_bucket(water_level, last_request, now, capacity, request_value):
+    """Add a request to a leaky bucket.
+
+    The bucket drains one unit per second since the last request, and each
+    request adds request_value to it unless that overflows the capacity.
+
+    @return: Tuple of the new water level and the delay (in seconds) before
+             the request could be made, or None if it can be made now.
+    """
+    # Clocks of different API nodes may disagree slightly.
+    leak_value = max(now - last_request, 0)
+    water_level = max(water_level - leak_value, 0) + request_value
+
+    difference = water_level - capacity
+    if difference > 0:
+        return water_level - request_value, difference
+    return water_level, None
+
 # "Limit" format is a dictionary with the HTTP verb, human-readable URI,
 # a regular-expression to match, value and unit of measure (PER_DAY, etc.)
 DEFAULT_LIMITS = [
@@ -157,6 +191,50 @@ DEFAULT_LIMITS = [
 ]
 
 
+class LimitMatcher(object):
+    """
+    Finds the limits a request counts against without trying each of them.
+
+    Limits are indexed by verb. Those matching any url, or any url starting
+    with a literal prefix, are found by lookups; only the limits with other
+    regular expressions are tried in turn, with precompiled patterns.
+    """
+
+    REGEX_CHARS = frozenset('.^$*+?{}[]|()\\')
+
+    def __init__(self, limits):
+        self._any_url = collections.defaultdict(list)
+        self._prefixes = collections.defaultdict(dict)
+        self._prefix_lengths = collections.defaultdict(set)
+        self._patterns = collections.defaultdict(list)
+
+        for index, limit in enumerate(limits):
+            verb = limit.verb
+            # re.match is anchored, with or without the caret.
+            regex = limit.regex[1:] if limit.regex[:1] == '^' else limit.regex
+            if regex in ('', '.*'):
+                self._any_url[verb].append(index)
+            elif not self.REGEX_CHARS.intersection(regex):
+                self._prefixes[verb].setdefault(regex, []).append(index)
+                self._prefix_lengths[verb].add(len(regex))
+            else:
+                self._patterns[verb].append((index,
+                                             re.compile(limit.regex)))
+
+    def match(self, verb, url):
+        """Return the indexes of the limits matching the request, in order."""
+        indexes = list(self._any_url.get(verb, ()))
+        prefixes = self._prefixes.get(verb)
+        if prefixes:
+            for length in self._prefix_lengths[verb]:
+                indexes.extend(prefixes.get(url[:length], ()))
+        for index, pattern in self._patterns.get(verb, ()):
+            if pattern.match(url):
+                indexes.append(index)
+        indexes.sort()
+        return indexes
+
+
 class RateLimitingMiddleware(wsgi.TroveMiddleware):
     """
     Rate-limits requests passing through this middleware. All limit information
@@ -234,12 +312,16 @@ class Limiter(object):
         """
         self.limits = copy.deepcopy(limits)
         self.levels = collections.defaultdict(lambda: copy.deepcopy(limits))
+        self._matcher = LimitMatcher(limits)
+        self._user_matchers = {}
 
         # Pick up any per-user limit information
         for key, value in kwargs.items():
             if key.startswith('user:'):
                 username = key[5:]
                 self.levels[username] = self.parse_limits(value)
+                self._user_matchers[username] = LimitMatcher(
+                    self.levels[username])
 
     def get_limits(self, username=None):
         """
@@ -255,8 +337,8 @@ class Limiter(object):
         """
         delays = []
 
-        for limit in self.levels[username]:
-            delay = limit(verb, url)
+        for limit in self.matching_limits(verb, url, username):
+            delay = limit.record_request()
             if delay:
                 delays.append((delay, limit.error_message))
 
@@ -266,6 +348,14 @@ class Limiter(object):
 
         return None, None
 
+    def matching_limits(self, verb, url, username=None):
+        """
+        Return the limits of the user the request counts against.
+        """
+        levels = self.levels[username]
+        matcher = self._user_matchers.get(username, self._matcher)
+        return [levels[index] for index in matcher.match(verb, url)]
+
     # This was ported from nova.
     # Keeping it as a static method for the sake of consistency
     #
@@ -330,6 +420,188 @@ class Limiter(object):
         return result
 
 
+class SharedLimiter(Limiter):
+    """
+    Rate-limit checking class which keeps the limit levels in a backend
+    shared by all the API workers, so the limits hold for the whole API
+    tier rather than for each worker.
+
+    The backend class is given by the 'backend' option of the middleware
+    and defaults to `SharedMemoryBackend`. Options prefixed with 'backend_'
+    are passed on to its constructor.
+    """
+
+    def __init__(self, limits, backend=None, **kwargs):
+        super(SharedLimiter, self).__init__(limits, **kwargs)
+        if backend is None:
+            backend = SharedMemoryBackend
+        else:
+            backend = importutils.import_class(backend)
+        backend_args = dict((key[len('backend_'):], value)
+                            for key, value in kwargs.items()
+                            if key.startswith('backend_'))
+        self.backend = backend(**backend_args)
+
+    @staticmethod
+    def _bucket_key(username, limit):
+        return "%s:%s:%s:%s" % (username or '', limit.verb, limit.regex,
+                                limit.unit)
+
+    def check_for_delay(self, verb, url, username=None):
+        """
+        Check the given verb/user/user triplet for limit.
+
+        All the buckets the request counts against are updated in a single
+        call to the backend.
+
+        @return: Tuple of delay (in seconds) and error message (or None, None)
+        """
+        limits = self.matching_limits(verb, url, username)
+        if not limits:
+            return None, None
+
+        now = time.time()
+        buckets = [(self._bucket_key(username, limit), limit.capacity,
+                    limit.request_value) for limit in limits]
+        levels = self.backend.consume(buckets, now)
+
+        delays = []
+        for limit, (water_level, delay) in zip(limits, levels):
+            # Keep the local copy current for get_limits.
+            limit.set_level(water_level, now, delay)
+            if delay:
+                delays.append((delay, limit.error_message))
+
+        if delays:
+            delays.sort()
+            return delays[0]
+
+        return None, None
+
+
+class SharedMemoryBackend(object):
+    """
+    Leaky buckets in memory shared by the API workers of a host.
+
+    The memory is allocated when the middleware is built, which happens
+    before the API workers are forked. Buckets live in a fixed size table
+    of slots indexed by a hash of their key. A drained bucket is the same
+    as an empty one, so its slot is reused freely; if all the slots a key
+    may use hold running buckets, the one idle the longest is recycled.
+    """
+
+    PROBES = 8
+
+    def __init__(self, slots=65536):
+        slots = int(slots)
+        self._lock = multiprocessing.Lock()
+        self._keys = multiprocessing.RawArray(ctypes.c_uint64, slots)
+        self._levels = multiprocessing.RawArray(ctypes.c_double, slots)
+        self._last_requests = multiprocessing.RawArray(ctypes.c_double,
+                                                       slots)
+
+    @staticmethod
+    def _hash(key):
+        # Zero marks a free slot.
+        return int(hashlib.md5(key).hexdigest()[:16], 16) or 1
+
+    def _slot(self, key_hash, now):
+        """Return the slot of the bucket, claiming one if needed."""
+        slots = len(self._keys)
+        candidates = [(key_hash + probe) % slots
+                      for probe in range(self.PROBES)]
+        for slot in candidates:
+            if self._keys[slot] == key_hash:
+                return slot
+
+        def _idle(slot):
+            return now - self._last_requests[slot] - self._levels[slot]
+
+        slot = max(candidates, key=_idle)
+        self._keys[slot] = key_hash
+        self._levels[slot] = 0
+        self._last_requests[slot] = now
+        return slot
+
+    def consume(self, buckets, now):
+        """
+        Add a request made at now to each of the buckets.
+
+        @param buckets: List of (key, capacity, request_value) tuples
+        @return: List of (water level, delay) tuples, as `leak_bucket`
+        """
+        results = []
+        with self._lock:
+            for key, capacity, request_value in buckets:
+                slot = self._slot(self._hash(key), now)
+                water_level, delay = leak_bucket(
+                    self._levels[slot], self._last_requests[slot], now,
+                    capacity, request_value)
+                self._levels[slot] = water_level
+                self._last_requests[slot] = max(
+                    now, self._last_requests[slot])
+                results.append((water_level, delay))
+        return results
+
+
+class RedisBackend(object):
+    """
+    Leaky buckets kept in a Redis protocol store shared by the API nodes.
+
+    Each bucket is updated atomically by a server side script, and the
+    buckets of a request are all sent in one pipelined round trip. Buckets
+    expire from the store once they have drained.
+    """
+
+    SCRIPT = """
+local now = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local request_value = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'level', 'last')
+local level = tonumber(bucket[1]) or 0
+local last = tonumber(bucket[2]) or now
+level = math.max(level - math.max(now - last, 0), 0) + request_value
+local delay = level - capacity
+if delay > 0 then
+    level = level - request_value
+else
+    delay = 0
+end
+redis.call('HMSET', KEYS[1], 'level', tostring(level),
+           'last', tostring(math.max(now, last)))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity) + 1)
+return {tostring(level), tostring(delay)}
+"""
+
+    def __init__(self, url='redis://localhost:6379/0',
+                 prefix='trove-limits:', client=None):
+        if client is None:
+            # Only needed by deployments using this backend.
+            import redis
+            client = redis.StrictRedis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(self.SCRIPT)
+
+    def consume(self, buckets, now):
+        """
+        Add a request made at now to each of the buckets.
+
+        @param buckets: List of (key, capacity, request_value) tuples
+        @return: List of (water level, delay) tuples, as `leak_bucket`
+        """
+        pipeline = self.client.pipeline(transaction=False)
+        for key, capacity, request_value in buckets:
+            self._script(keys=[self.prefix + key],
+                         args=[repr(now), repr(capacity),
+                               repr(request_value)],
+                         client=pipeline)
+        results = []
+        for water_level, delay in pipeline.execute():
+            results.append((float(water_level), float(delay) or None))
+        return results
+
+
 class WsgiLimiter(object):
     """
     Rate-limit checking from a WSGI application. Uses an in-memory `Limiter`.
@@ -13,7 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import bisect
+import heapq
 try:
     from collections import OrderedDict
 except ImportError:
@@ -37,16 +37,17 @@ def paginate_list(li, limit=None, marker=None, include_marker=False):
     :param bool include_marker: Include the marker value itself in the sublist.
     :return:
     """
-    li.sort()
+    # Only the page (and the next marker) needs sorting, not the whole list.
     if include_marker:
-        pos = bisect.bisect_left(li, marker)
+        li = [item for item in li if not item < marker]
     else:
-        pos = bisect.bisect(li, marker)
+        li = [item for item in li if marker < item]
 
-    if limit and pos + limit < len(li):
-        return li[pos:pos + limit], li[pos + limit]
+    if limit and limit < len(li):
+        page = heapq.nsmallest(limit + 1, li)
+        return page[:limit], page[limit]
     else:
-        return li[pos:], None
+        return sorted(li), None
 
 
 class PaginatedDataView(object):
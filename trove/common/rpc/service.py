@@ -16,6 +16,7 @@
 #    under the License.
 #
 
+import functools
 import inspect
 import os
 
@@ -29,6 +30,7 @@ from osprofiler import profiler
 from trove.common import cfg
 from trove.common.i18n import _
 from trove.common import profile
+from trove import db
 from trove import rpc
 
 
@@ -36,6 +38,28 @@ CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
 
+class RequestScopedEndpoint(object):
+    """Run each RPC of the wrapped manager in a database request scope.
+
+    All the database calls of one RPC share a single connection, which is
+    given back once the RPC returns.
+    """
+
+    def __init__(self, manager):
+        self._manager = manager
+
+    def __getattr__(self, name):
+        attr = getattr(self._manager, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def scoped(*args, **kwargs):
+            with db.get_db_api().request_scope():
+                return attr(*args, **kwargs)
+        return scoped
+
+
 class RpcService(service.Service):
 
     def __init__(self, host=None, binary=None, topic=None, manager=None,
@@ -59,7 +83,7 @@ class RpcService(service.Service):
         if not hasattr(self.manager_impl, 'target'):
             self.manager_impl.target = target
 
-        endpoints = [self.manager_impl]
+        endpoints = [RequestScopedEndpoint(self.manager_impl)]
         self.rpcserver = rpc.get_server(target, endpoints)
         self.rpcserver.start()
 
@@ -81,4 +105,13 @@ class RpcService(service.Service):
             LOG.info(_("Failed to stop RPC server before shutdown. "))
             pass
 
+        # Let the manager finish what it holds from the calls it got, looked
+        # up on the class since some managers resolve unknown attributes.
+        if getattr(type(self.manager_impl), 'cleanup', None):
+            try:
+                self.manager_impl.cleanup()
+            except Exception:
+                LOG.exception(_("Failed to clean up the %s manager.")
+                              % self.topic)
+
         super(RpcService, self).stop()
@@ -76,8 +76,7 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
 
             LOG.debug("all instances in cluster %s ready." % cluster_id)
 
-            instances = [Instance.load(context, instance_id) for instance_id
-                         in instance_ids]
+            instances = self._load_instances(context, instance_ids)
 
             # filter query routers in instances into a new list: query_routers
             query_routers = [instance for instance in instances if
@@ -108,28 +107,17 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
             # the password to the same value.
             LOG.debug("calling add_config_servers on, and sending admin user "
                       "password to, query_routers")
-            try:
-                admin_created = False
-                admin_password = utils.generate_random_password()
-                for query_router in query_routers:
-                    guest = self.get_guest(query_router)
-                    guest.add_config_servers(config_server_ips)
-                    if admin_created:
-                        guest.store_admin_password(admin_password)
-                    else:
-                        guest.create_admin_user(admin_password)
-                        admin_created = True
-            except Exception:
-                LOG.exception(_("error adding config servers"))
-                self.update_statuses_on_failure(cluster_id)
+            if not self._add_query_routers(query_routers, config_server_ips,
+                                           new_cluster=True):
                 return
 
             if not self._create_shard(query_routers[0], members):
                 return
 
             # call to start checking status
-            for instance in instances:
-                self.get_guest(instance).cluster_complete()
+            self._call_concurrently(
+                lambda instance: self.get_guest(instance).cluster_complete(),
+                instances)
 
         cluster_usage_timeout = CONF.cluster_usage_timeout
         timeout = Timeout(cluster_usage_timeout)
@@ -163,20 +151,21 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
                                              shard_id):
                 return
 
-            members = [Instance.load(context, instance_id)
-                       for instance_id in instance_ids]
+            members = self._load_instances(context, instance_ids)
 
             db_query_routers = DBInstance.find_all(cluster_id=cluster_id,
                                                    type='query_router',
                                                    deleted=False).all()
-            query_routers = [Instance.load(context, db_query_router.id)
-                             for db_query_router in db_query_routers]
+            query_routers = self._load_instances(
+                context, [db_query_router.id
+                          for db_query_router in db_query_routers])
 
             if not self._create_shard(query_routers[0], members):
                 return
 
-            for member in members:
-                self.get_guest(member).cluster_complete()
+            self._call_concurrently(
+                lambda member: self.get_guest(member).cluster_complete(),
+                members)
 
         cluster_usage_timeout = CONF.cluster_usage_timeout
         timeout = Timeout(cluster_usage_timeout)
@@ -220,8 +209,7 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
                         member_ids, cluster_id, shard_id
                     ):
                         return
-                    members = [Instance.load(context, member_id)
-                               for member_id in member_ids]
+                    members = self._load_instances(context, member_ids)
                     query_router = Instance.load(context, query_router_id)
                     if not self._create_shard(query_router, members):
                         return
@@ -239,18 +227,19 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
                     query_router_ids, cluster_id
                 ):
                     return
-                query_routers = [Instance.load(context, instance_id)
-                                 for instance_id in query_router_ids]
+                query_routers = self._load_instances(context,
+                                                     query_router_ids)
                 config_servers_ips = [
-                    self.get_ip(Instance.load(context, config_server_id))
-                    for config_server_id in config_servers_ids
+                    self.get_ip(config_server) for config_server
+                    in self._load_instances(context, config_servers_ids)
                 ]
                 if not self._add_query_routers(query_routers,
                                                config_servers_ips):
                     return
                 instances.extend(query_routers)
-            for instance in instances:
-                self.get_guest(instance).cluster_complete()
+            self._call_concurrently(
+                lambda instance: self.get_guest(instance).cluster_complete(),
+                instances)
 
         cluster_usage_timeout = CONF.cluster_usage_timeout
         timeout = Timeout(cluster_usage_timeout)
@@ -321,11 +310,12 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
         add_members.
         """
         LOG.debug('initializing replica set on %s' % primary_member.id)
-        other_members_ips = []
         try:
-            for member in other_members:
-                other_members_ips.append(self.get_ip(member))
-                self.get_guest(member).restart()
+            other_members_ips = [self.get_ip(member)
+                                 for member in other_members]
+            self._call_concurrently(
+                lambda member: self.get_guest(member).restart(),
+                other_members)
             self.get_guest(primary_member).prep_primary()
             self.get_guest(primary_member).add_members(other_members_ips)
         except Exception:
@@ -380,23 +370,28 @@ class MongoDbClusterTasks(task_models.ClusterTasks):
                               config_server_ips))
         admin_password = utils.generate_random_password() if new_cluster \
             else self.get_cluster_admin_password()
-        need_to_create_admin = new_cluster
-        for query_router in query_routers:
-            try:
-                LOG.debug("calling add_config_servers on query router %s"
-                          % query_router.id)
-                guest = self.get_guest(query_router)
-                guest.add_config_servers(config_server_ips)
-                if need_to_create_admin:
-                    LOG.debug("creating cluster admin user")
-                    guest.create_admin_user(admin_password)
-                    need_to_create_admin = False
-                else:
-                    guest.store_admin_password(admin_password)
-            except Exception:
-                LOG.exception(_("error adding config servers"))
-                self.update_statuses_on_failure(self.id)
-                return False
+
+        def _add_query_router(query_router, create_admin):
+            LOG.debug("calling add_config_servers on query router %s"
+                      % query_router.id)
+            guest = self.get_guest(query_router)
+            guest.add_config_servers(config_server_ips)
+            if create_admin:
+                LOG.debug("creating cluster admin user")
+                guest.create_admin_user(admin_password)
+            else:
+                guest.store_admin_password(admin_password)
+
+        # The first query router of a new cluster creates the admin user and
+        # the others only store its password.
+        create_admin = [new_cluster] + [False] * (len(query_routers) - 1)
+        try:
+            self._call_concurrently(_add_query_router, query_routers,
+                                    create_admin)
+        except Exception:
+            LOG.exception(_("error adding config servers"))
+            self.update_statuses_on_failure(self.id)
+            return False
         return True
 
 
@@ -21,7 +21,6 @@ from trove.common.strategies.cluster import base
 from trove.common.template import ClusterConfigTemplate
 from trove.common import utils
 from trove.instance.models import DBInstance
-from trove.instance.models import Instance
 from trove.taskmanager import api as task_api
 import trove.taskmanager.models as task_models
 
@@ -77,8 +76,7 @@ class PXCClusterTasks(task_models.ClusterTasks):
                 return
 
             LOG.debug("All members ready, proceeding for cluster setup.")
-            instances = [Instance.load(context, instance_id) for instance_id
-                         in instance_ids]
+            instances = self._load_instances(context, instance_ids)
 
             cluster_ips = [self.get_ip(instance) for instance in instances]
             instance_guests = [self.get_guest(instance)
@@ -103,9 +101,12 @@ class PXCClusterTasks(task_models.ClusterTasks):
                 # password in the my.cnf will be wrong after the joiner
                 # instances syncs with the donor instance.
                 admin_password = str(utils.generate_random_password())
-                for guest in instance_guests:
-                    guest.reset_admin_password(admin_password)
+                self._call_concurrently(
+                    lambda guest: guest.reset_admin_password(admin_password),
+                    instance_guests)
 
+                # The first instance bootstraps the cluster and the others
+                # join it one at a time.
                 bootstrap = True
                 for instance in instances:
                     guest = self.get_guest(instance)
@@ -124,8 +125,8 @@ class PXCClusterTasks(task_models.ClusterTasks):
                     bootstrap = False
 
                 LOG.debug("Finalizing cluster configuration.")
-                for guest in instance_guests:
-                    guest.cluster_complete()
+                self._call_concurrently(
+                    lambda guest: guest.cluster_complete(), instance_guests)
             except Exception:
                 LOG.exception(_("Error creating cluster."))
                 self.update_statuses_on_failure(cluster_id)
@@ -56,34 +56,42 @@ class RedisClusterTasks(task_models.ClusterTasks):
                 return
 
             LOG.debug("All members ready, proceeding for cluster setup.")
-            instances = [Instance.load(context, instance_id) for instance_id
-                         in instance_ids]
-
-            # Connect nodes to the first node
-            guests = [self.get_guest(instance) for instance in instances]
             try:
+                instances = self._load_instances(context, instance_ids)
+
+                # Connect nodes to the first node
+                guests = [self.get_guest(instance) for instance in instances]
                 cluster_head = instances[0]
                 cluster_head_port = '6379'
                 cluster_head_ip = self.get_ip(cluster_head)
-                for guest in guests[1:]:
-                    guest.cluster_meet(cluster_head_ip, cluster_head_port)
+                self._call_concurrently(
+                    lambda guest: guest.cluster_meet(cluster_head_ip,
+                                                     cluster_head_port),
+                    guests[1:])
 
                 num_nodes = len(instances)
                 total_slots = 16384
                 slots_per_node = total_slots / num_nodes
                 leftover_slots = total_slots % num_nodes
                 first_slot = 0
+                first_slots = []
+                last_slots = []
                 for guest in guests:
                     last_slot = first_slot + slots_per_node
                     if leftover_slots > 0:
                         leftover_slots -= 1
                     else:
                         last_slot -= 1
-                    guest.cluster_addslots(first_slot, last_slot)
+                    first_slots.append(first_slot)
+                    last_slots.append(last_slot)
                     first_slot = last_slot + 1
+                self._call_concurrently(
+                    lambda guest, first, last: guest.cluster_addslots(first,
+                                                                      last),
+                    guests, first_slots, last_slots)
 
-                for guest in guests:
-                    guest.cluster_complete()
+                self._call_concurrently(
+                    lambda guest: guest.cluster_complete(), guests)
             except Exception:
                 LOG.exception(_("Error creating cluster."))
                 self.update_statuses_on_failure(cluster_id)
@@ -123,16 +131,17 @@ class RedisClusterTasks(task_models.ClusterTasks):
                 return
 
             LOG.debug("All members ready, proceeding for cluster setup.")
-            new_insts = [Instance.load(context, instance_id)
-                         for instance_id in new_instance_ids]
+            new_insts = self._load_instances(context, new_instance_ids)
             new_guests = map(self.get_guest, new_insts)
 
             # Connect nodes to the cluster head
-            for guest in new_guests:
-                guest.cluster_meet(cluster_head_ip, cluster_head_port)
+            self._call_concurrently(
+                lambda guest: guest.cluster_meet(cluster_head_ip,
+                                                 cluster_head_port),
+                new_guests)
 
-            for guest in new_guests:
-                guest.cluster_complete()
+            self._call_concurrently(
+                lambda guest: guest.cluster_complete(), new_guests)
 
         timeout = Timeout(CONF.cluster_usage_timeout)
         try:
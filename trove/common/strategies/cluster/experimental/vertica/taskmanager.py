@@ -18,7 +18,6 @@ from trove.common import cfg
 from trove.common.i18n import _
 from trove.common.strategies.cluster import base
 from trove.instance.models import DBInstance
-from trove.instance.models import Instance
 from trove.taskmanager import api as task_api
 import trove.taskmanager.models as task_models
 
@@ -55,33 +54,36 @@ class VerticaClusterTasks(task_models.ClusterTasks):
                 return
 
             LOG.debug("All members ready, proceeding for cluster setup.")
-            instances = [Instance.load(context, instance_id) for instance_id
-                         in instance_ids]
+            try:
+                instances = self._load_instances(context, instance_ids)
 
-            member_ips = [self.get_ip(instance) for instance in instances]
-            guests = [self.get_guest(instance) for instance in instances]
+                member_ips = [self.get_ip(instance) for instance in instances]
+                guests = [self.get_guest(instance) for instance in instances]
 
-            # Users to be configured for password-less SSH.
-            authorized_users_without_password = ['root', 'dbadmin']
+                # Users to be configured for password-less SSH.
+                authorized_users_without_password = ['root', 'dbadmin']
 
-            # Configuring password-less SSH for cluster members.
-            # Strategy for setting up SSH:
-            # get public keys for user from member-instances in cluster,
-            # combine them, finally push it back to all instances,
-            # and member instances add them to authorized keys.
-            LOG.debug("Configuring password-less SSH on cluster members.")
-            try:
+                # Configuring password-less SSH for cluster members.
+                # Strategy for setting up SSH:
+                # get public keys for user from member-instances in cluster,
+                # combine them, finally push it back to all instances,
+                # and member instances add them to authorized keys.
+                LOG.debug("Configuring password-less SSH on cluster "
+                          "members.")
                 for user in authorized_users_without_password:
-                    pub_key = [guest.get_public_keys(user) for guest in guests]
-                    for guest in guests:
-                        guest.authorize_public_keys(user, pub_key)
+                    pub_key = self._call_concurrently(
+                        lambda guest: guest.get_public_keys(user), guests)
+                    self._call_concurrently(
+                        lambda guest: guest.authorize_public_keys(user,
+                                                                  pub_key),
+                        guests)
 
                 LOG.debug("Installing cluster with members: %s." % member_ips)
                 guests[0].install_cluster(member_ips)
 
                 LOG.debug("Finalizing cluster configuration.")
-                for guest in guests:
-                    guest.cluster_complete()
+                self._call_concurrently(
+                    lambda guest: guest.cluster_complete(), guests)
             except Exception:
                 LOG.exception(_("Error creating cluster."))
                 self.update_statuses_on_failure(cluster_id)
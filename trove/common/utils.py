@@ -140,6 +140,45 @@ class cached_property(object):
         return value
 
 
+class LRUCache(object):
+    """A bounded mapping evicting the least recently used entries.
+
+    Entries also expire 'ttl' seconds after they were set, unless ttl is
+    None.
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            value, expires = self._entries.pop(key)
+        except KeyError:
+            return default
+        if expires is not None and expires <= time.time():
+            return default
+        self._entries[key] = (value, expires)
+        return value
+
+    def set(self, key, value):
+        self._entries.pop(key, None)
+        expires = time.time() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (value, expires)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
 class MethodInspector(object):
 
     def __init__(self, func):
@@ -203,7 +242,9 @@ def poll_until(retriever, condition=lambda value: value,
     amount of time is eclipsed.
 
     """
-
+    # The request's database connection is not needed while sleeping.
+    from trove import db
+    db.get_db_api().release_connection()
     return build_polling_task(retriever, condition=condition,
                               sleep_time=sleep_time, time_out=time_out).wait()
 
@@ -37,6 +37,7 @@ from trove.common import exception
 from trove.common.i18n import _
 from trove.common import pastedeploy
 from trove.common import utils
+from trove import db
 
 CONTEXT_KEY = 'trove.context'
 Router = base_wsgi.Router
@@ -244,10 +245,12 @@ class Resource(base_wsgi.Resource):
             return Fault(webob.exc.HTTPNotFound())
         try:
             self.controller.validate_request(action, action_args)
-            result = super(Resource, self).execute_action(
-                action,
-                request,
-                **action_args)
+            # The database calls of the request share one connection.
+            with db.get_db_api().request_scope():
+                result = super(Resource, self).execute_action(
+                    action,
+                    request,
+                    **action_args)
             if type(result) is dict:
                 result = Result(result)
             return result
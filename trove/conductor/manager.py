@@ -14,6 +14,7 @@
 
 from oslo_log import log as logging
 import oslo_messaging as messaging
+from oslo_service import loopingcall
 from oslo_service import periodic_task
 
 from trove.backup import models as bkup_models
@@ -22,7 +23,9 @@ from trove.common import exception
 from trove.common.i18n import _
 from trove.common.instance import ServiceStatus
 from trove.common.rpc import version as rpc_version
+from trove.common import utils
 from trove.conductor.models import LastSeen
+from trove.db import get_db_api
 from trove.extensions.mysql import models as mysql_models
 from trove.instance import models as t_models
 
@@ -36,6 +39,12 @@ class Manager(periodic_task.PeriodicTasks):
 
     def __init__(self):
         super(Manager, self).__init__(CONF)
+        # Newest (sent, status) heartbeat of each instance not saved yet.
+        self._heartbeats = {}
+        self._heartbeat_flush = None
+        # (instance_id, method_name) -> last sent time recorded.
+        self._last_seen = utils.LRUCache(CONF.conductor_last_seen_cache_size,
+                                         CONF.conductor_last_seen_cache_ttl)
 
     def _message_too_old(self, instance_id, method_name, sent):
         fields = {
@@ -51,39 +60,144 @@ class Manager(periodic_task.PeriodicTasks):
                         "compare.") % instance_id)
             return False
 
-        seen = None
-        try:
-            seen = LastSeen.load(instance_id=instance_id,
-                                 method_name=method_name)
-        except exception.NotFound:
-            # This is fine.
-            pass
-
-        if seen is None:
-            LOG.debug("[Instance %s] Did not find any previous message. "
-                      "Creating." % instance_id)
-            seen = LastSeen.create(instance_id=instance_id,
-                                   method_name=method_name,
-                                   sent=sent)
-            seen.save()
-            return False
+        # The cached time never gets ahead of the database, since the
+        # recorded time only ever increases, so it can discard old
+        # messages on its own.
+        key = (instance_id, method_name)
+        last_sent = self._last_seen.get(key)
+        if last_sent is None:
+            seen = None
+            try:
+                seen = LastSeen.load(instance_id=instance_id,
+                                     method_name=method_name)
+            except exception.NotFound:
+                # This is fine.
+                pass
+
+            if seen is None:
+                LOG.debug("[Instance %s] Did not find any previous message. "
+                          "Creating." % instance_id)
+                LastSeen.create(instance_id=instance_id,
+                                method_name=method_name,
+                                sent=sent)
+                self._last_seen.set(key, sent)
+                return False
+
+            last_sent = float(seen.sent)
+            self._last_seen.set(key, last_sent)
 
-        last_sent = float(seen.sent)
-        if last_sent < sent:
+        if last_sent < sent and LastSeen.update_if_newer(
+                instance_id, method_name, sent):
             LOG.debug("[Instance %s] Rec'd message is younger than last "
                       "seen. Updating." % instance_id)
-            seen.sent = sent
-            seen.save()
+            self._last_seen.set(key, sent)
             return False
 
         else:
+            # Another conductor may have recorded a newer message; read it
+            # back next time.
+            if last_sent < sent:
+                self._last_seen.delete(key)
             LOG.info(_("[Instance %s] Rec'd message is older than last seen. "
                        "Discarding.") % instance_id)
             return True
 
+    def _buffer_heartbeat(self, instance_id, payload, sent):
+        status = None
+        if payload.get('service_status') is not None:
+            status = ServiceStatus.from_description(payload['service_status'])
+        buffered = self._heartbeats.get(instance_id)
+        if buffered is not None:
+            buffered_sent, buffered_status = buffered
+            if (sent is not None and buffered_sent is not None and
+                    sent <= buffered_sent):
+                LOG.info(_("[Instance %s] Rec'd message is older than last "
+                           "seen. Discarding.") % instance_id)
+                return
+            # A heartbeat without a status leaves the previous one in place.
+            if status is None:
+                status = buffered_status
+            if sent is None:
+                sent = buffered_sent
+        self._heartbeats[instance_id] = (sent, status)
+
+        if self._heartbeat_flush is None:
+            # Started on first use so it runs in the worker process.
+            self._heartbeat_flush = loopingcall.FixedIntervalLoopingCall(
+                self._flush_heartbeats)
+            self._heartbeat_flush.start(
+                interval=CONF.conductor_heartbeat_batch_interval)
+
+    def _flush_heartbeats(self):
+        heartbeats, self._heartbeats = self._heartbeats, {}
+        if not heartbeats:
+            return
+        try:
+            self._save_heartbeats(heartbeats)
+        except Exception:
+            # Keep flushing; the next heartbeats supersede the lost ones.
+            LOG.exception(_("Failed to save %d heartbeats.") %
+                          len(heartbeats))
+
+    def cleanup(self):
+        """Save the heartbeats still buffered when the service stops."""
+        if self._heartbeat_flush is not None:
+            self._heartbeat_flush.stop()
+            self._heartbeat_flush = None
+        self._flush_heartbeats()
+
+    def _save_heartbeats(self, heartbeats):
+        LOG.debug("Saving %d heartbeats." % len(heartbeats))
+        last_seen = {}
+        for instance_id in heartbeats:
+            cached = self._last_seen.get((instance_id, 'heartbeat'))
+            if cached is not None:
+                last_seen[instance_id] = cached
+        missing = [instance_id for instance_id in heartbeats
+                   if instance_id not in last_seen]
+        if missing:
+            last_seen.update(LastSeen.load_all(missing, 'heartbeat'))
+        statuses = {}
+        sent = {}
+        for instance_id, (instance_sent, status) in heartbeats.items():
+            if instance_sent is None:
+                LOG.error(_("[Instance %s] sent field not present. Cannot "
+                            "compare.") % instance_id)
+            elif (instance_id in last_seen and
+                    float(last_seen[instance_id]) >= instance_sent):
+                LOG.info(_("[Instance %s] Rec'd message is older than last "
+                           "seen. Discarding.") % instance_id)
+                continue
+            else:
+                sent[instance_id] = instance_sent
+            statuses[instance_id] = status
+        # The rows of last seen times stay locked until the statuses are
+        # saved, so other conductor workers cannot interleave theirs.
+        with get_db_api().session_scope(transactional=True):
+            LastSeen.save_all('heartbeat', sent, last_seen)
+            if sent:
+                # Another worker may have recorded a newer heartbeat since
+                # the last seen times were loaded; keep its status then.
+                recorded = LastSeen.load_all(list(sent), 'heartbeat')
+                for instance_id, instance_sent in list(sent.items()):
+                    if float(recorded.get(instance_id) or 0) != instance_sent:
+                        LOG.info(_("[Instance %s] Rec'd message is older "
+                                   "than last seen. Discarding.")
+                                 % instance_id)
+                        del sent[instance_id]
+                        del statuses[instance_id]
+            changed = t_models.InstanceServiceStatus.update_all(
+                statuses, notify=False)
+        t_models.ServiceStatusWatch.notify(changed)
+        for instance_id, instance_sent in sent.items():
+            self._last_seen.set((instance_id, 'heartbeat'), instance_sent)
+
     def heartbeat(self, context, instance_id, payload, sent=None):
         LOG.debug("Instance ID: %s" % str(instance_id))
         LOG.debug("Payload: %s" % str(payload))
+        if CONF.conductor_heartbeat_batch_interval > 0:
+            self._buffer_heartbeat(instance_id, payload, sent)
+            return
         status = t_models.InstanceServiceStatus.find_by(
             instance_id=instance_id)
         if self._message_too_old(instance_id, 'heartbeat', sent):
@@ -134,5 +248,13 @@ class Manager(periodic_task.PeriodicTasks):
                 setattr(backup, k, v)
         backup.save()
 
+    @periodic_task.periodic_task
+    def expire_stale_statuses(self, context):
+        """Stop trusting statuses of guests that missed their keepalives."""
+        expired = t_models.InstanceServiceStatus.expire_stale()
+        if expired:
+            LOG.warn(_("Marked %d instance statuses without a recent "
+                       "heartbeat as unknown.") % expired)
+
     def report_root(self, context, instance_id, user):
         mysql_models.RootHistory.create(context, instance_id, user)
@@ -14,6 +14,7 @@
 
 from oslo_log import log as logging
 
+from trove.common import exception
 from trove.db import get_db_api
 
 LOG = logging.getLogger(__name__)
@@ -51,3 +52,50 @@ class LastSeen(object):
     def create(cls, instance_id, method_name, sent):
         seen = LastSeen(instance_id, method_name, sent)
         return seen.save()
+
+    @classmethod
+    def load_all(cls, instance_ids, method_name):
+        """Return the last sent time of method_name for each instance."""
+        seen = get_db_api().find_all_in(cls, 'instance_id', instance_ids,
+                                        method_name=method_name)
+        return dict((row.instance_id, row.sent) for row in seen)
+
+    @classmethod
+    def save_all(cls, method_name, sent, existing):
+        """Record the last sent time of method_name for many instances.
+
+        :param sent: Map of instance id to sent time.
+        :param existing: Ids of the instances that already have a row.
+        """
+        db_api = get_db_api()
+        updates = [{'instance_id': instance_id, 'method_name': method_name,
+                    'sent': instance_sent}
+                   for instance_id, instance_sent in sent.items()
+                   if instance_id in existing]
+        inserts = [{'instance_id': instance_id, 'method_name': method_name,
+                    'sent': instance_sent}
+                   for instance_id, instance_sent in sent.items()
+                   if instance_id not in existing]
+        try:
+            db_api.insert_many(cls, inserts)
+        except exception.DBConstraintError:
+            # Another conductor created some of the rows in the meantime.
+            LOG.debug("Conflict recording %s, inserting one at a time." %
+                      method_name)
+            for insert in inserts:
+                try:
+                    db_api.insert_many(cls, [insert])
+                except exception.DBConstraintError:
+                    updates.append(insert)
+        db_api.update_many(cls, ['instance_id', 'method_name'], updates,
+                           increasing_column='sent')
+
+    @classmethod
+    def update_if_newer(cls, instance_id, method_name, sent):
+        """Record sent unless a newer message was already recorded.
+
+        :returns: Whether the row was updated.
+        """
+        return get_db_api().update_if_greater(
+            cls, 'sent', sent, instance_id=instance_id,
+            method_name=method_name) > 0
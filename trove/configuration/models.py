@@ -45,14 +45,9 @@ class Configurations(object):
 
         if context.is_admin:
             db_info = DBConfiguration.find_all(deleted=False)
-            if db_info.count() == 0:
-                LOG.debug("No configurations found for admin user")
         else:
             db_info = DBConfiguration.find_all(tenant_id=context.tenant,
                                                deleted=False)
-            if db_info.count() == 0:
-                LOG.debug("No configurations found for tenant %s"
-                          % context.tenant)
 
         limit = utils.pagination_limit(context.limit,
                                        Configurations.DEFAULT_LIMIT)
@@ -104,10 +99,11 @@ class Configuration(object):
     @staticmethod
     def delete(context, group):
         deleted_at = datetime.utcnow()
-        Configuration.remove_all_items(context, group.id, deleted_at)
-        group.deleted = True
-        group.deleted_at = deleted_at
-        group.save()
+        with get_db_api().session_scope(transactional=True):
+            Configuration.remove_all_items(context, group.id, deleted_at)
+            group.deleted = True
+            group.deleted_at = deleted_at
+            group.save()
 
     @staticmethod
     def remove_all_items(context, id, deleted_at):
@@ -139,13 +135,6 @@ class Configuration(object):
             msg = _("Configuration group with ID %s could not be found.") % id
             raise ModelNotFoundError(msg)
 
-    @staticmethod
-    def find_parameter_details(name, detail_list):
-        for item in detail_list:
-            if item.name == name:
-                return item
-        return None
-
     @staticmethod
     def load_items(context, id):
         datastore_v = Configuration.load_configuration_datastore_version(
@@ -154,20 +143,14 @@ class Configuration(object):
         config_items = DBConfigurationParameter.find_all(
             configuration_id=id, deleted=False).all()
 
-        detail_list = DatastoreConfigurationParameters.load_parameters(
+        validator = DatastoreConfigurationParameters.load_validator(
             datastore_v.id)
 
         for item in config_items:
-            rule = Configuration.find_parameter_details(
-                str(item.configuration_key), detail_list)
+            rule = validator.rule(str(item.configuration_key))
             if not rule:
                 continue
-            if rule.data_type == 'boolean':
-                item.configuration_value = bool(int(item.configuration_value))
-            elif rule.data_type == 'integer':
-                item.configuration_value = int(item.configuration_value)
-            else:
-                item.configuration_value = str(item.configuration_value)
+            item.configuration_value = rule.convert(item.configuration_value)
         return config_items
 
     def get_configuration_overrides(self):
@@ -188,19 +171,10 @@ class Configuration(object):
         config_items = Configuration.load_items(self.context,
                                                 id=self.configuration_id)
         LOG.debug("config_items: %s" % config_items)
-        detail_list = DatastoreConfigurationParameters.load_parameters(
-            datastore_v.id, show_deleted=True)
-
-        for i in config_items:
-            LOG.debug("config item: %s" % i)
-            details = Configuration.find_parameter_details(
-                i.configuration_key, detail_list)
-            LOG.debug("parameter details: %s" % details)
-            if not details:
-                raise exception.NotFound(uuid=i.configuration_key)
-            if bool(details.restart_required):
-                return True
-        return False
+        validator = DatastoreConfigurationParameters.load_validator(
+            datastore_v.id)
+        return validator.needs_restart(i.configuration_key
+                                       for i in config_items)
 
     @staticmethod
     def save(configuration, configuration_items):
@@ -255,10 +229,190 @@ class DBDatastoreConfigurationParameters(dbmodels.DatabaseModelBase):
     preserve_on_delete = True
 
 
+# Placeholder for a bound of a configuration parameter that is not an
+# integer, reported when a value is checked against it.
+_INVALID_BOUND = object()
+
+
+class ConfigurationRule(object):
+    """A configuration parameter of a datastore version, compiled to check
+    and convert its values.
+    """
+
+    TYPES = {
+        'boolean': bool,
+        'string': basestring,
+        'integer': (int, long),
+    }
+
+    def __init__(self, param):
+        self.name = param.name
+        self.data_type = param.data_type
+        self.restart_required = bool(param.restart_required)
+        self.value_type = self.TYPES.get(param.data_type)
+        self.min_value = self._parse_bound(param.min_size)
+        self.max_value = self._parse_bound(param.max_size)
+
+    @staticmethod
+    def _parse_bound(bound):
+        if bound is None:
+            return None
+        try:
+            return int(bound)
+        except ValueError:
+            return _INVALID_BOUND
+
+    def validate(self, key, value):
+        """Check that value is an allowed value for the parameter key."""
+        if self.value_type is None:
+            raise exception.TroveError(_(
+                "Invalid or unsupported type defined in the "
+                "configuration-parameters configuration file."))
+
+        # type checking
+        if not isinstance(value, self.value_type):
+            output = {"key": key, "type": self.data_type}
+            msg = _("The value provided for the configuration "
+                    "parameter %(key)s is not of type %(type)s.") % output
+            raise exception.UnprocessableEntity(message=msg)
+
+        # integer min/max checking
+        if isinstance(value, (int, long)) and not isinstance(value, bool):
+            if self.min_value is _INVALID_BOUND:
+                raise exception.TroveError(_(
+                    "Invalid or unsupported min value defined in the "
+                    "configuration-parameters configuration file. "
+                    "Expected integer."))
+            if self.min_value is not None and value < self.min_value:
+                output = {"key": key, "min": self.min_value}
+                message = _(
+                    "The value for the configuration parameter "
+                    "%(key)s is less than the minimum allowed: "
+                    "%(min)s") % output
+                raise exception.UnprocessableEntity(message=message)
+
+            if self.max_value is _INVALID_BOUND:
+                raise exception.TroveError(_(
+                    "Invalid or unsupported max value defined in the "
+                    "configuration-parameters configuration file. "
+                    "Expected integer."))
+            if self.max_value is not None and value > self.max_value:
+                output = {"key": key, "max": self.max_value}
+                message = _(
+                    "The value for the configuration parameter "
+                    "%(key)s is greater than the maximum "
+                    "allowed: %(max)s") % output
+                raise exception.UnprocessableEntity(message=message)
+
+    def convert(self, value):
+        """Convert a value stored in the database to the parameter type."""
+        if self.data_type == 'boolean':
+            return bool(int(value))
+        elif self.data_type == 'integer':
+            return int(value)
+        return str(value)
+
+
+class ConfigurationValidator(object):
+    """The compiled configuration parameters of a datastore version.
+
+    Parameters are looked up by name; the deleted ones are only used to
+    tell whether existing configuration values need a restart.
+    """
+
+    def __init__(self, params, deleted_params=()):
+        self._rules = {}
+        self._deleted_rules = {}
+        # Parameter names are matched case-insensitively on validation.
+        self._lookup = {}
+        for param in params:
+            rule = ConfigurationRule(param)
+            self._rules[rule.name] = rule
+            self._lookup[rule.name.lower()] = rule
+        for param in deleted_params:
+            rule = ConfigurationRule(param)
+            self._deleted_rules[rule.name] = rule
+
+    def __len__(self):
+        return len(self._rules)
+
+    def rule(self, name, show_deleted=False):
+        """The rule of the named parameter, or None if there is none."""
+        rule = self._rules.get(name)
+        if rule is None and show_deleted:
+            rule = self._deleted_rules.get(name)
+        return rule
+
+    def validate(self, values, datastore_version):
+        """Check that the values are allowed for the datastore version."""
+        # checking if there are any rules for the datastore
+        if not self._lookup:
+            output = {"version": datastore_version.name,
+                      "name": datastore_version.datastore_name}
+            msg = _("Configuration groups are not supported for this "
+                    "datastore: %(name)s %(version)s") % output
+            raise exception.UnprocessableEntity(message=msg)
+
+        for k, v in values.iteritems():
+            # parameter name validation
+            rule = self._lookup.get(k.lower())
+            if rule is None:
+                output = {"key": k,
+                          "version": datastore_version.name,
+                          "name": datastore_version.datastore_name}
+                msg = _("The configuration parameter %(key)s is not "
+                        "supported for this datastore: "
+                        "%(name)s %(version)s.") % output
+                raise exception.UnprocessableEntity(message=msg)
+            rule.validate(k, v)
+
+    def needs_restart(self, keys):
+        """Whether any of the named parameters requires a restart."""
+        for key in keys:
+            rule = self.rule(key, show_deleted=True)
+            LOG.debug("parameter details: %s" % rule)
+            if not rule:
+                raise exception.NotFound(uuid=key)
+            if rule.restart_required:
+                return True
+        return False
+
+
 class DatastoreConfigurationParameters(object):
+    # Compiled parameters of the datastore versions, by version id. Other
+    # processes pick up changes once their entry expires.
+    _validators = None
+
     def __init__(self, db_info):
         self.db_info = db_info
 
+    @classmethod
+    def load_validator(cls, datastore_version_id):
+        """The compiled configuration parameters of a datastore version."""
+        if cls._validators is None:
+            cls._validators = utils.LRUCache(
+                CONF.configuration_rules_cache_size,
+                CONF.configuration_rules_cache_ttl)
+        validator = cls._validators.get(datastore_version_id)
+        if validator is None:
+            params = []
+            deleted_params = []
+            for param in cls.load_parameters(datastore_version_id,
+                                             show_deleted=True):
+                if param.deleted:
+                    deleted_params.append(param)
+                else:
+                    params.append(param)
+            validator = ConfigurationValidator(params, deleted_params)
+            cls._validators.set(datastore_version_id, validator)
+        return validator
+
+    @classmethod
+    def invalidate_validator(cls, datastore_version_id):
+        """Recompile the parameters of a datastore version on next use."""
+        if cls._validators is not None:
+            cls._validators.delete(datastore_version_id)
+
     @staticmethod
     def create(**kwargs):
         """Create a configuration parameter for a datastore version."""
@@ -281,6 +435,7 @@ class DatastoreConfigurationParameters(object):
                 param.min_size = kwargs.get('min_size')
                 param.deleted = 0
                 param.save()
+                DatastoreConfigurationParameters.invalidate_validator(ds_v_id)
                 return param
             else:
                 raise exception.ConfigurationParameterAlreadyExists(
@@ -290,6 +445,7 @@ class DatastoreConfigurationParameters(object):
             pass
         config_param = DBDatastoreConfigurationParameters.create(
             **kwargs)
+        DatastoreConfigurationParameters.invalidate_validator(ds_v_id)
         return config_param
 
     @staticmethod
@@ -299,6 +455,7 @@ class DatastoreConfigurationParameters(object):
         config_param.deleted = True
         config_param.deleted_at = datetime.utcnow()
         config_param.save()
+        DatastoreConfigurationParameters.invalidate_validator(version_id)
 
     @classmethod
     def load_parameters(cls, datastore_version_id, show_deleted=False):
@@ -377,6 +534,8 @@ def create_or_update_datastore_configuration_parameter(name,
             deleted=False,
         )
         get_db_api().save(config)
+    DatastoreConfigurationParameters.invalidate_validator(
+        datastore_version.id)
 
 
 def load_datastore_configuration_parameters(datastore,
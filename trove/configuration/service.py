@@ -27,7 +27,9 @@ from trove.configuration import models
 from trove.configuration.models import DBConfigurationParameter
 from trove.configuration import views
 from trove.datastore import models as ds_models
+from trove.db import get_db_api
 from trove.instance import models as instances_models
+from trove.taskmanager import api as task_api
 
 
 CONF = cfg.CONF
@@ -103,7 +105,7 @@ class ConfigurationsController(wsgi.Controller):
             ConfigurationsController._validate_configuration(
                 body['configuration']['values'],
                 datastore_version,
-                models.DatastoreConfigurationParameters.load_parameters(
+                models.DatastoreConfigurationParameters.load_validator(
                     datastore_version.id))
 
             for k, v in values.iteritems():
@@ -111,11 +113,12 @@ class ConfigurationsController(wsgi.Controller):
                     configuration_key=k,
                     configuration_value=v))
 
-        cfg_group = models.Configuration.create(name, description, tenant_id,
-                                                datastore.id,
-                                                datastore_version.id)
-        cfg_group_items = models.Configuration.create_items(cfg_group.id,
-                                                            values)
+        with get_db_api().session_scope(transactional=True):
+            cfg_group = models.Configuration.create(name, description,
+                                                    tenant_id, datastore.id,
+                                                    datastore_version.id)
+            cfg_group_items = models.Configuration.create_items(cfg_group.id,
+                                                                values)
         view_data = views.DetailedConfigurationView(cfg_group,
                                                     cfg_group_items)
         return wsgi.Result(view_data.data(), 200)
@@ -154,8 +157,10 @@ class ConfigurationsController(wsgi.Controller):
 
         items = self._configuration_items_list(group, body['configuration'])
         deleted_at = datetime.utcnow()
-        models.Configuration.remove_all_items(context, group.id, deleted_at)
-        models.Configuration.save(group, items)
+        with get_db_api().session_scope(transactional=True):
+            models.Configuration.remove_all_items(context, group.id,
+                                                  deleted_at)
+            models.Configuration.save(group, items)
         self._refresh_on_all_instances(context, id)
         return wsgi.Result(None, 202)
 
@@ -168,22 +173,12 @@ class ConfigurationsController(wsgi.Controller):
 
     def _refresh_on_all_instances(self, context, configuration_id):
         """Refresh a configuration group on all its instances.
-        """
-        dbinstances = instances_models.DBInstance.find_all(
-            tenant_id=context.tenant,
-            configuration_id=configuration_id,
-            deleted=False).all()
-
-        LOG.debug(
-            "All instances with configuration group '%s' on tenant '%s': %s"
-            % (configuration_id, context.tenant, dbinstances))
 
-        config = models.Configuration(context, configuration_id)
-        for dbinstance in dbinstances:
-            LOG.debug("Applying configuration group '%s' to instance: %s"
-                      % (configuration_id, dbinstance.id))
-            instance = instances_models.Instance.load(context, dbinstance.id)
-            instance.update_overrides(config)
+        The instances are updated asynchronously by the task manager.
+        """
+        LOG.debug("Refreshing configuration group '%s' on tenant '%s'."
+                  % (configuration_id, context.tenant))
+        task_api.API(context).refresh_configuration(configuration_id)
 
     def _configuration_items_list(self, group, configuration):
         ds_version_id = group.datastore_version_id
@@ -194,7 +189,7 @@ class ConfigurationsController(wsgi.Controller):
             ConfigurationsController._validate_configuration(
                 configuration['values'],
                 ds_version,
-                models.DatastoreConfigurationParameters.load_parameters(
+                models.DatastoreConfigurationParameters.load_validator(
                     ds_version.id))
             for k, v in configuration['values'].iteritems():
                 items.append(DBConfigurationParameter(
@@ -206,91 +201,16 @@ class ConfigurationsController(wsgi.Controller):
 
     @staticmethod
     def _validate_configuration(values, datastore_version, config_rules):
-        LOG.info(_("Validating configuration values"))
+        """Check the values against the rules of the datastore version.
 
-        # create rules dictionary based on parameter name
-        rules_lookup = {}
-        for item in config_rules:
-            rules_lookup[item.name.lower()] = item
-
-        # checking if there are any rules for the datastore
-        if not rules_lookup:
-            output = {"version": datastore_version.name,
-                      "name": datastore_version.datastore_name}
-            msg = _("Configuration groups are not supported for this "
-                    "datastore: %(name)s %(version)s") % output
-            raise exception.UnprocessableEntity(message=msg)
-
-        for k, v in values.iteritems():
-            key = k.lower()
-            # parameter name validation
-            if key not in rules_lookup:
-                output = {"key": k,
-                          "version": datastore_version.name,
-                          "name": datastore_version.datastore_name}
-                msg = _("The configuration parameter %(key)s is not "
-                        "supported for this datastore: "
-                        "%(name)s %(version)s.") % output
-                raise exception.UnprocessableEntity(message=msg)
-
-            rule = rules_lookup[key]
-
-            # type checking
-            value_type = rule.data_type
-
-            if not isinstance(v, ConfigurationsController._find_type(
-                    value_type)):
-                output = {"key": k, "type": value_type}
-                msg = _("The value provided for the configuration "
-                        "parameter %(key)s is not of type %(type)s.") % output
-                raise exception.UnprocessableEntity(message=msg)
-
-            # integer min/max checking
-            if isinstance(v, (int, long)) and not isinstance(v, bool):
-                if rule.min_size is not None:
-                    try:
-                        min_value = int(rule.min_size)
-                    except ValueError:
-                        raise exception.TroveError(_(
-                            "Invalid or unsupported min value defined in the "
-                            "configuration-parameters configuration file. "
-                            "Expected integer."))
-                    if v < min_value:
-                        output = {"key": k, "min": min_value}
-                        message = _(
-                            "The value for the configuration parameter "
-                            "%(key)s is less than the minimum allowed: "
-                            "%(min)s") % output
-                        raise exception.UnprocessableEntity(message=message)
-
-                if rule.max_size is not None:
-                    try:
-                        max_value = int(rule.max_size)
-                    except ValueError:
-                        raise exception.TroveError(_(
-                            "Invalid or unsupported max value defined in the "
-                            "configuration-parameters configuration file. "
-                            "Expected integer."))
-                    if v > max_value:
-                        output = {"key": k, "max": max_value}
-                        message = _(
-                            "The value for the configuration parameter "
-                            "%(key)s is greater than the maximum "
-                            "allowed: %(max)s") % output
-                        raise exception.UnprocessableEntity(message=message)
+        config_rules is a ConfigurationValidator, or the parameters of the
+        datastore version to compile one from.
+        """
+        LOG.info(_("Validating configuration values"))
 
-    @staticmethod
-    def _find_type(value_type):
-        if value_type == "boolean":
-            return bool
-        elif value_type == "string":
-            return basestring
-        elif value_type == "integer":
-            return (int, long)
-        else:
-            raise exception.TroveError(_(
-                "Invalid or unsupported type defined in the "
-                "configuration-parameters configuration file."))
+        if not isinstance(config_rules, models.ConfigurationValidator):
+            config_rules = models.ConfigurationValidator(config_rules)
+        config_rules.validate(values, datastore_version)
 
     @staticmethod
     def _get_item(key, dictList):
@@ -30,6 +30,34 @@ LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
 db_api = get_db_api()
 
+# In-process caches of the datastore tables, which change rarely, by table.
+# Changes made by other processes are seen once the entries expire.
+_caches = {}
+
+
+def _cache(name):
+    cache = _caches.get(name)
+    if cache is None:
+        cache = _caches[name] = utils.LRUCache(CONF.datastore_cache_size,
+                                               CONF.datastore_cache_ttl)
+    return cache
+
+
+def _cached(name, key, load):
+    """Return the cached value of key, calling load to fill it in."""
+    cache = _cache(name)
+    value = cache.get(key)
+    if value is None:
+        value = load()
+        cache.set(key, value)
+    return value
+
+
+def invalidate_cache():
+    """Forget the cached datastores, versions and capabilities."""
+    for cache in _caches.values():
+        cache.clear()
+
 
 def persisted_models():
     return {
@@ -41,22 +69,47 @@ def persisted_models():
     }
 
 
-class DBDatastore(dbmodels.DatabaseModelBase):
+class CachedModelBase(dbmodels.DatabaseModelBase):
+    """A model of a table kept in the in-process datastore caches.
+
+    Any change made through the model invalidates the caches.
+    """
+
+    def save(self):
+        try:
+            return super(CachedModelBase, self).save()
+        finally:
+            invalidate_cache()
+
+    def delete(self):
+        try:
+            return super(CachedModelBase, self).delete()
+        finally:
+            invalidate_cache()
+
+    def update(self, **values):
+        try:
+            return super(CachedModelBase, self).update(**values)
+        finally:
+            invalidate_cache()
+
+
+class DBDatastore(CachedModelBase):
 
     _data_fields = ['id', 'name', 'default_version_id']
 
 
-class DBCapabilities(dbmodels.DatabaseModelBase):
+class DBCapabilities(CachedModelBase):
 
     _data_fields = ['id', 'name', 'description', 'enabled']
 
 
-class DBCapabilityOverrides(dbmodels.DatabaseModelBase):
+class DBCapabilityOverrides(CachedModelBase):
 
     _data_fields = ['id', 'capability_id', 'datastore_version_id', 'enabled']
 
 
-class DBDatastoreVersion(dbmodels.DatabaseModelBase):
+class DBDatastoreVersion(CachedModelBase):
 
     _data_fields = ['id', 'datastore_id', 'name', 'manager', 'image_id',
                     'packages', 'active']
@@ -104,32 +157,34 @@ class Capabilities(object):
         Bulk load and override default capabilities with configured
         datastore version specific settings.
         """
-        capability_defaults = [Capability(c)
-                               for c in DBCapabilities.find_all()]
+        capability_defaults = _cached(
+            'capabilities', 'all',
+            lambda: DBCapabilities.find_all().all())
 
-        capability_overrides = []
+        capability_overrides = {}
         if self.datastore_version_id is not None:
             # This should always happen but if there is any future case where
             # we don't have a datastore version id number it won't stop
             # defaults from rendering.
-            capability_overrides = [
-                CapabilityOverride(ce)
-                for ce in DBCapabilityOverrides.find_all(
-                    datastore_version_id=self.datastore_version_id)
-            ]
+            capability_overrides = _cached(
+                'capability_overrides', self.datastore_version_id,
+                lambda: dict(
+                    (ce.capability_id, ce)
+                    for ce in DBCapabilityOverrides.find_all(
+                        datastore_version_id=self.datastore_version_id)))
 
         def override(cap):
             # This logic is necessary to apply datastore version specific
             # capability overrides when they are present in the database.
-            for capability_override in capability_overrides:
-                if cap.id == capability_override.capability_id:
-                    # we have a mapped entity that indicates this datastore
-                    # version has an override so we honor that.
-                    return capability_override
+            capability_override = capability_overrides.get(cap.id)
+            if capability_override is not None:
+                # we have a mapped entity that indicates this datastore
+                # version has an override so we honor that.
+                return CapabilityOverride(capability_override, cap)
 
             # There were no overrides for this capability so we just hand it
             # right back.
-            return cap
+            return Capability(cap)
 
         self.capabilities = map(override, capability_defaults)
 
@@ -206,11 +261,14 @@ class CapabilityOverride(BaseCapability):
     specific datastore version that overrides the default setting in the
     base capability's entry for Trove.
     """
-    def __init__(self, db_info):
+    def __init__(self, db_info, parent_db_info=None):
         super(CapabilityOverride, self).__init__(db_info)
         # This *may* be better solved with a join in the SQLAlchemy model but
         # I was unable to get our query object to work properly for this.
-        parent_capability = Capability.load(db_info.capability_id)
+        if parent_db_info is not None:
+            parent_capability = Capability(parent_db_info)
+        else:
+            parent_capability = Capability.load(db_info.capability_id)
         if parent_capability:
             self.parent_name = parent_capability.name
             self.parent_description = parent_capability.description
@@ -338,11 +396,16 @@ class Datastore(object):
 
     @classmethod
     def load(cls, id_or_name):
+        return cls(_cached('datastores', id_or_name,
+                           lambda: cls._find(id_or_name)))
+
+    @staticmethod
+    def _find(id_or_name):
         try:
-            return cls(DBDatastore.find_by(id=id_or_name))
+            return DBDatastore.find_by(id=id_or_name)
         except exception.ModelNotFoundError:
             try:
-                return cls(DBDatastore.find_by(name=id_or_name))
+                return DBDatastore.find_by(name=id_or_name)
             except exception.ModelNotFoundError:
                 raise exception.DatastoreNotFound(datastore=id_or_name)
 
@@ -389,9 +452,14 @@ class DatastoreVersion(object):
 
     @classmethod
     def load(cls, datastore, id_or_name):
+        return cls(_cached('datastore_versions', (datastore.id, id_or_name),
+                           lambda: cls._find(datastore, id_or_name)))
+
+    @staticmethod
+    def _find(datastore, id_or_name):
         try:
-            return cls(DBDatastoreVersion.find_by(datastore_id=datastore.id,
-                                                  id=id_or_name))
+            return DBDatastoreVersion.find_by(datastore_id=datastore.id,
+                                              id=id_or_name)
         except exception.ModelNotFoundError:
             versions = DBDatastoreVersion.find_all(datastore_id=datastore.id,
                                                    name=id_or_name)
@@ -399,12 +467,17 @@ class DatastoreVersion(object):
                 raise exception.DatastoreVersionNotFound(version=id_or_name)
             if versions.count() > 1:
                 raise exception.NoUniqueMatch(name=id_or_name)
-            return cls(versions.first())
+            return versions.first()
 
     @classmethod
     def load_by_uuid(cls, uuid):
+        return cls(_cached('datastore_versions', uuid,
+                           lambda: cls._find_by_uuid(uuid)))
+
+    @staticmethod
+    def _find_by_uuid(uuid):
         try:
-            return cls(DBDatastoreVersion.find_by(id=uuid))
+            return DBDatastoreVersion.find_by(id=uuid)
         except exception.ModelNotFoundError:
             raise exception.DatastoreVersionNotFound(version=uuid)
 
@@ -524,6 +597,7 @@ def update_datastore(name, default_version):
         datastore.default_version_id = None
 
     db_api.save(datastore)
+    invalidate_cache()
 
 
 def update_datastore_version(datastore, name, manager, image_id, packages,
@@ -545,6 +619,7 @@ def update_datastore_version(datastore, name, manager, image_id, packages,
     version.active = active
 
     db_api.save(version)
+    invalidate_cache()
 
 
 class DatastoreVersionMetadata(object):
@@ -67,17 +67,28 @@ class Query(object):
         self.db_api.delete_all(self._query_func, self._model,
                                **self._conditions)
 
-    def limit(self, limit=200, marker=None, marker_column=None):
+    def limit(self, limit=200, marker=None, marker_column=None,
+              sort_keys=None, sort_dirs=None):
         return self.db_api.find_all_by_limit(
             self._query_func,
             self._model,
             self._conditions,
             limit=limit,
             marker=marker,
-            marker_column=marker_column)
-
-    def paginated_collection(self, limit=200, marker=None, marker_column=None):
-        collection = self.limit(int(limit) + 1, marker, marker_column)
+            marker_column=marker_column,
+            sort_keys=sort_keys,
+            sort_dirs=sort_dirs)
+
+    def paginated_collection(self, limit=200, marker=None, marker_column=None,
+                             sort_keys=None, sort_dirs=None):
+        """Return a page of the collection and the marker of the next one.
+
+        With sort_keys the page is ordered on those columns (and the id) and
+        the marker is the id of the last row of the previous page, whatever
+        the sort order.
+        """
+        collection = self.limit(int(limit) + 1, marker, marker_column,
+                                sort_keys, sort_dirs)
         if len(collection) > int(limit):
             return (collection[0:-1], collection[-2]['id'])
         return (collection, None)
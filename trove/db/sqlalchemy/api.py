@@ -13,7 +13,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import sqlalchemy
 import sqlalchemy.exc
+from sqlalchemy import orm
+from sqlalchemy.sql import bindparam
 
 from trove.common import exception
 from trove.db.sqlalchemy import migration
@@ -41,9 +44,14 @@ def find_all(model, **conditions):
 
 
 def find_all_by_limit(query_func, model, conditions, limit, marker=None,
-                      marker_column=None):
+                      marker_column=None, sort_keys=None, sort_dirs=None):
     return _limits(query_func, model, conditions, limit, marker,
-                   marker_column).all()
+                   marker_column, sort_keys, sort_dirs).all()
+
+
+def paginate_query(query, model, limit, marker, sort_keys, sort_dirs=None):
+    return _keyset_limits(query, model, limit, marker, sort_keys,
+                          sort_dirs).all()
 
 
 def find_by(model, **kwargs):
@@ -81,6 +89,70 @@ def update_all(query_func, model, conditions, values):
     query_func(model, **conditions).update(values)
 
 
+def find_all_in(model, column, values, **conditions):
+    return _query_by(model, **conditions).filter(
+        getattr(model, column).in_(values)).all()
+
+
+def update_many(model, key_columns, rows, increasing_column=None):
+    """Update a batch of rows, matched on key_columns, in one executemany.
+
+    Every row must provide the same columns. Rows whose increasing_column
+    is already at least the new value are left alone.
+    """
+    if not rows:
+        return
+    table = orm.class_mapper(model).mapped_table
+    statement = table.update()
+    # Bind parameters cannot share the names of the columns being set.
+    for column in key_columns:
+        statement = statement.where(
+            table.c[column] == bindparam('match_' + column))
+    if increasing_column:
+        statement = statement.where(
+            table.c[increasing_column] < bindparam(increasing_column))
+    statement = statement.values(
+        dict((column, bindparam(column)) for column in rows[0]
+             if column not in key_columns))
+    params = []
+    for row in rows:
+        row = dict(row)
+        for column in key_columns:
+            row['match_' + column] = row.pop(column)
+        params.append(row)
+    session.get_session().execute(statement, params)
+
+
+def update_if_greater(model, column, value, **conditions):
+    """Set column to value where it is lower; return the rows updated."""
+    query = _query_by(model, **conditions).filter(
+        getattr(model, column) < value)
+    return query.update({column: value}, synchronize_session=False)
+
+
+def insert_many(model, rows):
+    if not rows:
+        return
+    table = orm.class_mapper(model).mapped_table
+    try:
+        session.get_session().execute(table.insert(), rows)
+    except sqlalchemy.exc.IntegrityError as error:
+        raise exception.DBConstraintError(model_name=model.__name__,
+                                          error=str(error.orig))
+
+
+def session_scope(transactional=False):
+    return session.session_scope(transactional)
+
+
+def request_scope():
+    return session.request_scope()
+
+
+def release_connection():
+    session.release_connection()
+
+
 def configure_db(options, *plugins):
     session.configure_db(options)
     configure_db_for_plugins(options, *plugins)
@@ -128,9 +200,55 @@ def _query_by(cls, **conditions):
     return query
 
 
-def _limits(query_func, model, conditions, limit, marker, marker_column=None):
+def _limits(query_func, model, conditions, limit, marker, marker_column=None,
+            sort_keys=None, sort_dirs=None):
     query = query_func(model, **conditions)
+    if sort_keys:
+        return _keyset_limits(query, model, limit, marker, sort_keys,
+                              sort_dirs)
     marker_column = marker_column or model.id
     if marker:
         query = query.filter(marker_column > marker)
     return query.order_by(marker_column).limit(limit)
+
+
+def _keyset_limits(query, model, limit, marker, sort_keys, sort_dirs=None):
+    """Limit the query to the page following the row whose id is marker.
+
+    Rows are ordered on the sort_keys columns, in the matching sort_dirs
+    ('asc' or 'desc'), with the id as the final tie breaker so the order is
+    total and markers are stable. The page is selected with a condition on
+    the sort columns rather than an offset, so an index on them keeps every
+    page equally cheap.
+    """
+    # Copies, since 'list' is shadowed in this module.
+    sort_dirs = [direction for direction in
+                 sort_dirs or ['asc'] * len(sort_keys)]
+    sort_keys = [key for key in sort_keys]
+    if 'id' not in sort_keys:
+        sort_keys.append('id')
+        sort_dirs.append(sort_dirs[-1])
+    columns = [getattr(model, key) for key in sort_keys]
+
+    if marker:
+        marker_row = _base_query(model).filter(model.id == marker).first()
+        if marker_row is None:
+            # Nothing follows a marker that is unknown or no longer exists.
+            return query.filter(sqlalchemy.false())
+        # (a, b) > (x, y) is written as a > x OR (a = x AND b > y).
+        criteria = []
+        for position, (column, direction) in enumerate(zip(columns,
+                                                           sort_dirs)):
+            value = getattr(marker_row, sort_keys[position])
+            if direction == 'desc':
+                after = column < value
+            else:
+                after = column > value
+            ties = [columns[tied] == getattr(marker_row, sort_keys[tied])
+                    for tied in range(position)]
+            criteria.append(sqlalchemy.and_(*(ties + [after])))
+        query = query.filter(sqlalchemy.or_(*criteria))
+
+    order = [column.desc() if direction == 'desc' else column.asc()
+             for column, direction in zip(columns, sort_dirs)]
+    return query.order_by(*order).limit(limit)
@@ -0,0 +1,53 @@
+# Copyright 2015 Tesora Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_log import log as logging
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import Index
+from sqlalchemy.schema import MetaData
+
+from trove.db.sqlalchemy.migrate_repo.schema import Table
+
+logger = logging.getLogger('trove.db.sqlalchemy.migrate_repo.schema')
+
+
+def _indexes(meta):
+    configurations = Table('configurations', meta, autoload=True)
+    instances = Table('instances', meta, autoload=True)
+    # Listing pages are filtered on these columns and ordered on the id.
+    return [Index("configurations_tenant_id_id",
+                  configurations.c.tenant_id, configurations.c.id),
+            Index("instances_tenant_id_id",
+                  instances.c.tenant_id, instances.c.id),
+            Index("instances_configuration_id_id",
+                  instances.c.configuration_id, instances.c.id)]
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    for index in _indexes(meta):
+        try:
+            index.create()
+        except OperationalError as e:
+            logger.info(e)
+
+
+def downgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    for index in _indexes(meta):
+        index.drop()
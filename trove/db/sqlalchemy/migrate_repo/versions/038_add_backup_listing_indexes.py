@@ -0,0 +1,57 @@
+# Copyright 2015 Tesora Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_log import log as logging
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import Index
+from sqlalchemy.schema import MetaData
+
+from trove.db.sqlalchemy.migrate_repo.schema import Table
+
+logger = logging.getLogger('trove.db.sqlalchemy.migrate_repo.schema')
+
+
+def _indexes(meta):
+    backups = Table('backups', meta, autoload=True)
+    # Listing pages are filtered on the tenant or the instance and ordered
+    # on (updated, id), and the last completed backup of an instance is
+    # looked up on its state.
+    return [Index("backups_tenant_id_deleted_updated_id",
+                  backups.c.tenant_id, backups.c.deleted,
+                  backups.c.updated, backups.c.id),
+            Index("backups_instance_id_deleted_updated_id",
+                  backups.c.instance_id, backups.c.deleted,
+                  backups.c.updated, backups.c.id),
+            Index("backups_instance_id_state_deleted_updated",
+                  backups.c.instance_id, backups.c.state,
+                  backups.c.deleted, backups.c.updated)]
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    for index in _indexes(meta):
+        try:
+            index.create()
+        except OperationalError as e:
+            logger.info(e)
+
+
+def downgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    for index in _indexes(meta):
+        index.drop()
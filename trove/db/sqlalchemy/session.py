@@ -15,10 +15,13 @@
 
 import contextlib
 
+from eventlet import corolocal
 from oslo_log import log as logging
 import osprofiler.sqlalchemy
 import sqlalchemy
 from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy import exc
 from sqlalchemy import MetaData
 from sqlalchemy.orm import sessionmaker
 
@@ -28,6 +31,10 @@ from trove.db.sqlalchemy import mappers
 
 _ENGINE = None
 _MAKER = None
+# Connection of the current request or session scope, kept per green thread
+# whether or not the thread module is monkey patched (it is not with
+# debug_utils).
+_SCOPE = corolocal.local()
 
 
 LOG = logging.getLogger(__name__)
@@ -75,17 +82,48 @@ def configure_db(options, models_mapper=None):
 
 
 def _create_engine(options):
+    connection = options['database']['connection']
     engine_args = {
         "pool_recycle": CONF.database.idle_timeout,
         "echo": CONF.database.query_log
     }
+    # The sqlite pools are not sized.
+    if not connection.startswith('sqlite'):
+        engine_args.update({
+            "pool_size": CONF.database.max_pool_size,
+            "max_overflow": CONF.database.max_overflow,
+            "pool_timeout": CONF.database.pool_timeout
+        })
     LOG.info(_("Creating SQLAlchemy engine with args: %s") % engine_args)
-    db_engine = create_engine(options['database']['connection'], **engine_args)
+    db_engine = create_engine(connection, **engine_args)
+    if CONF.database.pool_pre_ping:
+        event.listen(db_engine, "engine_connect", _ping_connection)
     if CONF.profiler.enabled and CONF.profiler.trace_sqlalchemy:
         osprofiler.sqlalchemy.add_tracing(sqlalchemy, db_engine, "db")
     return db_engine
 
 
+def _ping_connection(connection, branch):
+    """Check a connection is alive before it is used.
+
+    A connection dropped by the server is invalidated by the failed ping
+    and the pool reconnects on the second attempt, instead of the statement
+    failing.
+    """
+    if branch:
+        return
+    should_close_with_result = connection.should_close_with_result
+    connection.should_close_with_result = False
+    try:
+        connection.scalar(sqlalchemy.select([1]))
+    except exc.DBAPIError as error:
+        if not error.connection_invalidated:
+            raise
+        connection.scalar(sqlalchemy.select([1]))
+    finally:
+        connection.should_close_with_result = should_close_with_result
+
+
 def get_session(autocommit=True, expire_on_commit=False):
     """Helper method to grab session."""
     global _MAKER, _ENGINE
@@ -97,9 +135,93 @@ def get_session(autocommit=True, expire_on_commit=False):
         _MAKER = sessionmaker(bind=_ENGINE,
                               autocommit=autocommit,
                               expire_on_commit=expire_on_commit)
+    connection = getattr(_SCOPE, 'connection', None)
+    if (connection is None and _ENGINE and
+            getattr(_SCOPE, 'request', False)):
+        # First database call of the request since the connection was
+        # checked out or given back.
+        connection = _ENGINE.connect()
+        _SCOPE.connection = connection
+        _SCOPE.request_connection = True
+    if connection is not None:
+        return _MAKER(bind=connection)
     return _MAKER()
 
 
+@contextlib.contextmanager
+def session_scope(transactional=False):
+    """Run the enclosed database calls on a single connection.
+
+    The sessions handed out within the scope share one pooled connection
+    instead of checking one out for every call. If transactional, the
+    changes flushed within the scope are committed together when it exits,
+    or rolled back if it raises. A nested scope joins the enclosing one.
+
+    The connection is held until the scope exits, so keep calls to other
+    services, such as guest RPCs, out of it.
+    """
+    connection = getattr(_SCOPE, 'connection', None)
+    owner = connection is None
+    if owner:
+        if not _ENGINE:
+            # Nothing to share in services without a database.
+            yield
+            return
+        connection = _ENGINE.connect()
+        _SCOPE.connection = connection
+    _SCOPE.depth = getattr(_SCOPE, 'depth', 0) + 1
+    try:
+        transaction = connection.begin() if transactional else None
+        try:
+            yield
+        except Exception:
+            if transaction:
+                transaction.rollback()
+            raise
+        if transaction:
+            transaction.commit()
+    finally:
+        _SCOPE.depth -= 1
+        if owner:
+            _SCOPE.connection = None
+            _SCOPE.request_connection = False
+            connection.close()
+
+
+@contextlib.contextmanager
+def request_scope():
+    """Share one connection among the database calls of a request or RPC.
+
+    Unlike session_scope, the connection is only checked out by the first
+    database call, and release_connection() gives it back while the
+    request waits on something else; the next database call checks out
+    another one. A nested scope joins the enclosing one.
+    """
+    if getattr(_SCOPE, 'request', False):
+        yield
+        return
+    _SCOPE.request = True
+    try:
+        yield
+    finally:
+        _SCOPE.request = False
+        release_connection()
+
+
+def release_connection():
+    """Give back the connection checked out by the request scope, if any.
+
+    The connection of an enclosing session scope is kept until it exits.
+    """
+    if (getattr(_SCOPE, 'depth', 0) or
+            not getattr(_SCOPE, 'request_connection', False)):
+        return
+    connection = _SCOPE.connection
+    _SCOPE.connection = None
+    _SCOPE.request_connection = False
+    connection.close()
+
+
 def raw_query(model, autocommit=True, expire_on_commit=False):
     return get_session(autocommit, expire_on_commit).query(model)
 
@@ -12,17 +12,18 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import datetime
+import time
 
 from oslo_log import log as logging
 
 from trove.common import cfg
-from trove.common import exception
 from trove.common import remote
 from trove.common import utils
 from trove.extensions.mysql import models as mysql_models
 from trove.instance import models as imodels
 from trove.instance import models as instance_models
 from trove.instance.models import load_instance, InstanceServiceStatus
+from trove.instance.tasks import InstanceTasks
 from trove import rpc
 
 LOG = logging.getLogger(__name__)
@@ -174,11 +175,27 @@ def _load_servers(instances, find_server):
 
 def publish_exist_events(transformer, admin_context):
     notifier = rpc.get_notifier("taskmanager")
-    notifications = transformer()
     # clear out admin_context.auth_token so it does not get logged
     admin_context.auth_token = None
-    for notification in notifications:
-        notifier.info(admin_context, "trove.instance.exists", notification)
+    # Transformers providing batches are published as they go.
+    batches = getattr(transformer, 'batches', None)
+    batches = batches() if batches else iter([transformer()])
+    published = 0
+    while True:
+        started = time.time()
+        notifications = next(batches, None)
+        if notifications is None:
+            break
+        loaded = time.time()
+        for notification in notifications:
+            notifier.info(admin_context, "trove.instance.exists",
+                          notification)
+        published += len(notifications)
+        LOG.debug("Published %(count)d exists notifications (loaded in "
+                  "%(load).2fs, sent in %(send).2fs)." %
+                  {'count': len(notifications), 'load': loaded - started,
+                   'send': time.time() - loaded})
+    LOG.info("Published %d exists notifications." % published)
 
 
 class NotificationTransformer(object):
@@ -224,27 +241,48 @@ class NotificationTransformer(object):
             instance.datastore_version.manager, CONF.notification_service_id)
         return payload
 
-    def __call__(self):
+    @staticmethod
+    def _instance_batches(**conditions):
+        """Yield the instances matching conditions, a batch at a time.
+
+        Each batch is one query for the instances and one for their
+        service statuses.
+        """
+        query = instance_models.DBInstance.find_all(**conditions)
+        marker = None
+        while True:
+            db_infos, marker = query.paginated_collection(
+                limit=CONF.exists_notification_batch_size, marker=marker)
+            statuses = InstanceServiceStatus.find_all_by_instance_ids(
+                [db_info.id for db_info in db_infos])
+            instances = []
+            for db_info in db_infos:
+                service_status = statuses.get(db_info.id)
+                if service_status is None:
+                    # There is a small window of opportunity during when the
+                    # db resource for an instance exists, but no
+                    # InstanceServiceStatus for it has yet been created. We
+                    # skip sending the notification message for all such
+                    # instances. These instance are too new and will get
+                    # picked up the next round of notifications.
+                    LOG.debug("InstanceServiceStatus not found for %s. "
+                              "Will wait to send notification." % db_info.id)
+                    continue
+                instances.append(
+                    SimpleMgmtInstance(None, db_info, None, service_status))
+            yield instances
+            if marker is None:
+                return
+
+    def batches(self):
+        """Yield the exists messages, a batch of instances at a time."""
         audit_start, audit_end = NotificationTransformer._get_audit_period()
-        messages = []
-        db_infos = instance_models.DBInstance.find_all(deleted=False)
-        for db_info in db_infos:
-            try:
-                service_status = InstanceServiceStatus.find_by(
-                    instance_id=db_info.id)
-            except exception.ModelNotFoundError:
-                # There is a small window of opportunity during when the db
-                # resource for an instance exists, but no InstanceServiceStatus
-                # for it has yet been created. We skip sending the notification
-                # message for all such instances. These instance are too new
-                # and will get picked up the next round of notifications.
-                LOG.debug("InstanceServiceStatus not found for %s. "
-                          "Will wait to send notification." % db_info.id)
-                continue
-            instance = SimpleMgmtInstance(None, db_info, None, service_status)
-            message = self.transform_instance(instance, audit_start, audit_end)
-            messages.append(message)
-        return messages
+        for instances in self._instance_batches(deleted=False):
+            yield [self.transform_instance(instance, audit_start, audit_end)
+                   for instance in instances]
+
+    def __call__(self):
+        return [message for batch in self.batches() for message in batch]
 
 
 class NovaNotificationTransformer(NotificationTransformer):
@@ -254,6 +292,16 @@ class NovaNotificationTransformer(NotificationTransformer):
         self.nova_client = remote.create_admin_nova_client(self.context)
         self._flavor_cache = {}
 
+    def _load_flavors(self):
+        """Fill the flavor cache with a single listing of the flavors."""
+        try:
+            flavors = self.nova_client.flavors.list(is_public=None)
+        except Exception:
+            LOG.exception("Error listing the flavors.")
+            return
+        for flavor in flavors:
+            self._flavor_cache[flavor.id] = flavor.name
+
     def _lookup_flavor(self, flavor_id):
         if flavor_id in self._flavor_cache:
             LOG.debug("Flavor cache hit for %s" % flavor_id)
@@ -264,20 +312,50 @@ class NovaNotificationTransformer(NotificationTransformer):
         self._flavor_cache[flavor_id] = flavor.name if flavor else 'unknown'
         return self._flavor_cache[flavor_id]
 
-    def __call__(self):
+    def _load_servers(self):
+        """Map the id of every nova server to its user id and status.
+
+        The servers are listed a page at a time, and only their user and
+        status are kept.
+        """
+        servers_info = {}
+        marker = None
+        while True:
+            servers = self.nova_client.servers.list(
+                search_opts={'all_tenants': 1}, marker=marker,
+                limit=CONF.exists_notification_batch_size)
+            if not servers:
+                break
+            for server in servers:
+                servers_info[server.id] = (server.user_id, server.status)
+            marker = servers[-1].id
+        LOG.info("Found %d servers in Nova" % len(servers_info))
+        return servers_info
+
+    def batches(self):
+        """Yield the exists messages, a batch of instances at a time."""
         audit_start, audit_end = NotificationTransformer._get_audit_period()
-        instances = load_mgmt_instances(self.context, deleted=False,
-                                        client=self.nova_client)
-        messages = []
-        for instance in filter(
-                lambda inst: inst.status != 'SHUTDOWN' and inst.server,
-                instances):
-            message = {
-                'instance_type': self._lookup_flavor(instance.flavor_id),
-                'user_id': instance.server.user_id
-            }
-            message.update(self.transform_instance(instance,
-                                                   audit_start,
-                                                   audit_end))
-            messages.append(message)
-        return messages
+        self._load_flavors()
+        servers_info = self._load_servers()
+        for instances in self._instance_batches(deleted=False,
+                                                cluster_id=None):
+            messages = []
+            for instance in instances:
+                db_info = instance.db_info
+                user_id, server_status = servers_info.get(
+                    db_info.compute_instance_id, (None, "SHUTDOWN"))
+                if InstanceTasks.BUILDING == db_info.task_status:
+                    db_info.server_status = "BUILD"
+                else:
+                    db_info.server_status = server_status
+                if instance.status == 'SHUTDOWN' or user_id is None:
+                    continue
+                message = {
+                    'instance_type': self._lookup_flavor(instance.flavor_id),
+                    'user_id': user_id
+                }
+                message.update(self.transform_instance(instance,
+                                                       audit_start,
+                                                       audit_end))
+                messages.append(message)
+            yield messages
@@ -26,6 +26,7 @@ from trove.common import cfg
 from trove.common import exception
 from trove.common.i18n import _
 import trove.common.rpc.version as rpc_version
+from trove import db
 from trove import rpc
 
 CONF = cfg.CONF
@@ -57,6 +58,8 @@ class API(object):
 
     def _call(self, method_name, timeout_sec, version, **kwargs):
         LOG.debug("Calling %s with timeout %s" % (method_name, timeout_sec))
+        # Do not hold a database connection while the guest works.
+        db.get_db_api().release_connection()
         try:
             cctxt = self.client.prepare(version=version, timeout=timeout_sec)
             result = cctxt.call(self.context, method_name, **kwargs)
@@ -74,6 +77,7 @@ class API(object):
 
     def _cast(self, method_name, version, **kwargs):
         LOG.debug("Casting %s" % method_name)
+        db.get_db_api().release_connection()
         try:
             cctxt = self.client.prepare(version=version)
             cctxt.cast(self.context, method_name, **kwargs)
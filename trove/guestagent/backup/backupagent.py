@@ -20,6 +20,7 @@ from trove.backup.state import BackupState
 from trove.common import cfg
 from trove.common.i18n import _
 from trove.conductor import api as conductor_api
+from trove.guestagent.backup import peer
 from trove.guestagent.common import timeutils
 from trove.guestagent.dbaas import get_filesystem_volume_stats
 from trove.guestagent.strategies.backup.base import BackupError
@@ -158,10 +159,14 @@ class BackupAgent(object):
             LOG.debug("Getting Restore Runner %(type)s.", backup_info)
             restore_runner = self._get_restore_runner(backup_info['type'])
 
-            LOG.debug("Getting Storage Strategy.")
-            storage = get_storage_strategy(
-                CONF.storage_strategy,
-                CONF.storage_namespace)(context)
+            if backup_info.get('stream'):
+                LOG.debug("Restoring from the stream of a peer.")
+                storage = peer.PeerStorage(backup_info['stream'])
+            else:
+                LOG.debug("Getting Storage Strategy.")
+                storage = get_storage_strategy(
+                    CONF.storage_strategy,
+                    CONF.storage_namespace)(context)
 
             runner = restore_runner(storage, location=backup_info['location'],
                                     checksum=backup_info['checksum'],
@@ -0,0 +1,292 @@
+# Copyright 2015 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Stream a backup straight from one guest to another.
+
+A replication source offers a backup to a single replica under a random
+offer id and secret, handed to the replica with its replication snapshot
+over RPC. The secret never goes over the stream connection: separate
+authentication, MAC and encryption keys are derived from it.
+
+The replica connects to replication_stream_port on the source and sends
+the offer id. The source answers with a random challenge, and the replica
+proves it knows the secret by sending the HMAC-SHA256 of the challenge
+keyed with the authentication key. The source then runs the backup,
+encrypts its output with the encryption key and sends it, and the replica
+restores it as it arrives.
+
+The stream is a series of chunks, each preceded by its length as a 4 byte
+big-endian integer. An empty chunk ends it and is followed by the
+HMAC-SHA256 of the challenge and of the encrypted data keyed with the MAC
+key, which the replica checks before decrypting the last block. A stream
+closed before its end means the backup failed.
+
+hmac.compare_digest needs Python 2.7.7 or later.
+"""
+
+import binascii
+import hashlib
+import hmac
+import os
+import signal
+import socket
+import struct
+import time
+
+import eventlet
+from oslo_log import log as logging
+from oslo_utils import netutils
+
+from trove.common import cfg
+from trove.common import exception
+from trove.common.i18n import _
+from trove.guestagent.common import backup_codecs
+
+LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+
+CHUNK_SIZE = CONF.backup_chunk_size
+HEADER = struct.Struct('!I')
+OFFER_ID_SIZE = 16  # bytes, before hex encoding.
+SECRET_SIZE = 32  # bytes, before hex encoding.
+CHALLENGE_SIZE = 32  # bytes.
+ACCEPT_POLL_INTERVAL = 5  # seconds.
+
+
+class PeerStreamError(exception.TroveError):
+    message = _("Replication snapshot stream failed: %(reason)s")
+
+
+def _derive_key(secret, purpose):
+    return hmac.new(str(secret), purpose, hashlib.sha256).digest()
+
+
+def _auth_response(secret, challenge):
+    return hmac.new(_derive_key(secret, 'auth'), challenge,
+                    hashlib.sha256).digest()
+
+
+def _digest(secret, challenge):
+    return hmac.new(_derive_key(secret, 'mac'), challenge, hashlib.sha256)
+
+
+def _passphrase(secret):
+    return binascii.hexlify(_derive_key(secret, 'encryption'))
+
+
+def _read(stream, size):
+    data = stream.read(size)
+    if len(data) < size:
+        raise PeerStreamError(reason=_("Stream ended early."))
+    return data
+
+
+class Throttle(object):
+    """Sleep as needed to keep to a maximum average rate."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.start = time.time()
+        self.sent = 0
+
+    def __call__(self, size):
+        if not self.rate:
+            return
+        self.sent += size
+        delay = self.sent / float(self.rate) - (time.time() - self.start)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class PeerStreamServer(object):
+    """Serve each offered backup to the first peer knowing its secret.
+
+    The server only listens while it has offers pending.
+    """
+
+    def __init__(self, port):
+        self.port = port
+        self._offers = {}
+        self._socket = None
+
+    def offer(self, runner, filename, extra_opts=''):
+        """Offer a backup made with runner to one peer.
+
+        :returns: The endpoint the peer connects to.
+        """
+        if self._socket is None:
+            self._socket = eventlet.listen(('0.0.0.0', self.port))
+            self._socket.settimeout(ACCEPT_POLL_INTERVAL)
+            eventlet.spawn_n(self._serve)
+        offer_id = binascii.hexlify(os.urandom(OFFER_ID_SIZE))
+        secret = binascii.hexlify(os.urandom(SECRET_SIZE))
+        expiry = time.time() + CONF.replication_stream_accept_timeout
+        self._offers[offer_id] = (runner, filename, extra_opts, expiry,
+                                  secret)
+        port = self._socket.getsockname()[1]
+        LOG.debug("Offered backup %(filename)s on port %(port)d." %
+                  {'filename': filename, 'port': port})
+        return {'host': netutils.get_my_ipv4(),
+                'port': port,
+                'offer': offer_id,
+                'key': secret,
+                'type': runner.__name__}
+
+    def _expire(self):
+        now = time.time()
+        for offer_id, offer in list(self._offers.items()):
+            if offer[3] < now:
+                LOG.error(_("No replica fetched backup %s in time.") %
+                          offer[1])
+                del self._offers[offer_id]
+
+    def _serve(self):
+        try:
+            while self._offers:
+                try:
+                    connection, address = self._socket.accept()
+                except socket.timeout:
+                    self._expire()
+                    continue
+                eventlet.spawn_n(self._handle, connection, address)
+        except Exception:
+            LOG.exception(_("Error serving replication snapshots."))
+            self._offers.clear()
+        finally:
+            self._socket.close()
+            self._socket = None
+
+    def _claim(self, connection, stream):
+        """Authenticate the peer and take the offer it asks for.
+
+        :returns: The offer, or None if the peer failed to authenticate.
+        """
+        offer_id = stream.readline(OFFER_ID_SIZE * 2 + 1).strip()
+        offer = self._offers.get(offer_id)
+        if offer is None:
+            return None
+        challenge = os.urandom(CHALLENGE_SIZE)
+        connection.sendall(challenge)
+        response = _read(stream, hashlib.sha256().digest_size)
+        if not hmac.compare_digest(_auth_response(offer[4], challenge),
+                                   response):
+            return None
+        # Another connection may have claimed it meanwhile.
+        if self._offers.pop(offer_id, None) is None:
+            return None
+        return offer + (challenge,)
+
+    def _handle(self, connection, address):
+        connection.settimeout(CONF.replication_stream_timeout)
+        try:
+            offer = self._claim(connection, connection.makefile('rb'))
+            if offer is None:
+                LOG.warn(_("Refused snapshot stream to %s: authentication "
+                           "failed.") % address[0])
+                return
+            runner, filename, extra_opts, expiry, secret, challenge = offer
+            LOG.info(_("Streaming backup %(filename)s to %(peer)s.") %
+                     {'filename': filename, 'peer': address[0]})
+            self._stream(connection, secret, challenge, runner, filename,
+                         extra_opts)
+            LOG.info(_("Streamed backup %s.") % filename)
+        except Exception:
+            LOG.exception(_("Error streaming a replication snapshot to "
+                            "%s.") % address[0])
+        finally:
+            connection.close()
+
+    def _stream(self, connection, secret, challenge, runner, filename,
+                extra_opts):
+        digest = _digest(secret, challenge)
+        throttle = Throttle(CONF.replication_stream_max_rate)
+        with runner(filename=filename, extra_opts=extra_opts) as bkup:
+            encrypted = backup_codecs.EncodedStream(
+                bkup, [backup_codecs.OpenSSLAESEncoder(_passphrase(secret),
+                                                       'sha256')])
+            try:
+                while True:
+                    chunk = encrypted.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    connection.sendall(HEADER.pack(len(chunk)) + chunk)
+                    throttle(len(chunk))
+            except Exception:
+                # Do not leave the backup blocked on its output.
+                try:
+                    os.killpg(bkup.process.pid, signal.SIGTERM)
+                except OSError:
+                    pass
+                raise
+        # Only end the stream once the backup is known to have succeeded.
+        connection.sendall(HEADER.pack(0) + digest.digest())
+
+
+_server = None
+
+
+def offer_backup(runner, filename, extra_opts=''):
+    """Offer a backup to one peer on replication_stream_port."""
+    global _server
+    if _server is None:
+        _server = PeerStreamServer(CONF.replication_stream_port)
+    return _server.offer(runner, filename, extra_opts)
+
+
+class PeerStorage(object):
+    """Storage strategy loading a backup streamed by a peer.
+
+    Only loading is supported, from the endpoint returned by offer_backup;
+    the location and checksum are not used.
+    """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+
+    def load(self, location, checksum):
+        host = self.endpoint['host']
+        port = self.endpoint['port']
+        secret = str(self.endpoint['key'])
+        LOG.debug("Fetching backup stream from %(host)s:%(port)s." %
+                  {'host': host, 'port': port})
+        connection = socket.create_connection(
+            (host, port), CONF.replication_stream_timeout)
+        try:
+            connection.sendall(str(self.endpoint['offer']) + '\n')
+            stream = connection.makefile('rb')
+            challenge = _read(stream, CHALLENGE_SIZE)
+            connection.sendall(_auth_response(secret, challenge))
+            digest = _digest(secret, challenge)
+            decoder = backup_codecs.OpenSSLAESDecoder(_passphrase(secret),
+                                                      'sha256')
+            while True:
+                size = HEADER.unpack(_read(stream, HEADER.size))[0]
+                if not size:
+                    break
+                chunk = _read(stream, size)
+                digest.update(chunk)
+                data = decoder.update(chunk)
+                if data:
+                    yield data
+            expected = _read(stream, digest.digest_size)
+            if not hmac.compare_digest(digest.digest(), expected):
+                raise PeerStreamError(reason=_("Checksum mismatch."))
+            data = decoder.finalize()
+            if data:
+                yield data
+        finally:
+            connection.close()
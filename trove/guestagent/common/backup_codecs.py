@@ -0,0 +1,294 @@
+# Copyright 2015 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""In-process compression and encryption of backup streams.
+
+The encoded output is compatible with the 'gzip' and
+'openssl enc -aes-256-cbc -salt' commands the backup and restore runners
+would otherwise pipe the stream through, so backups taken either way can
+be restored either way as long as backup_aes_cbc_digest matches the
+default digest of the guest's openssl.
+"""
+
+import abc
+import collections
+import hashlib
+import os
+import zlib
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import ciphers
+from cryptography.hazmat.primitives.ciphers import algorithms
+from cryptography.hazmat.primitives.ciphers import modes
+from cryptography.hazmat.primitives import padding
+from eventlet import greenpool
+from eventlet import tpool
+import six
+
+from trove.common import cfg
+
+CONF = cfg.CONF
+
+
+class CodecError(Exception):
+    """Error decoding a backup stream."""
+
+
+@six.add_metaclass(abc.ABCMeta)
+class StreamCodec(object):
+    """Incrementally transform a byte stream.
+
+    'update' returns the output that is ready for the given input and
+    'finalize' returns whatever remains once the input is exhausted.
+    """
+
+    @abc.abstractmethod
+    def update(self, data):
+        """Transform a chunk of the stream."""
+
+    @abc.abstractmethod
+    def finalize(self):
+        """Flush the remaining output at the end of the stream."""
+
+
+def _compress_block(block, level):
+    # Every block is written as a complete gzip member; a concatenation
+    # of members is itself a valid gzip stream.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(block) + compressor.flush()
+
+
+class GzipEncoder(StreamCodec):
+    """Compress fixed size blocks on several threads.
+
+    zlib releases the GIL while compressing, so the blocks are handed to
+    the eventlet thread pool and compressed in parallel. At most 'threads'
+    blocks are in flight and the output is returned in input order.
+    """
+
+    def __init__(self, level=None, threads=None, block_size=None):
+        self.level = level or CONF.backup_compression_level
+        self.threads = threads or CONF.backup_compression_threads
+        self.block_size = block_size or CONF.backup_compression_block_size
+        self._pool = greenpool.GreenPool(size=self.threads)
+        self._pending = collections.deque()
+        self._buffer = []
+        self._buffer_length = 0
+
+    def _dispatch(self, block):
+        self._pending.append(self._pool.spawn(tpool.execute, _compress_block,
+                                              block, self.level))
+
+    def _collect(self, wait_for=0):
+        """Return the finished blocks from the front of the queue.
+
+        Blocks until no more than 'wait_for' blocks are still in flight.
+        """
+        output = []
+        while self._pending and (len(self._pending) > wait_for or
+                                 self._pending[0].dead):
+            output.append(self._pending.popleft().wait())
+        return ''.join(output)
+
+    def update(self, data):
+        self._buffer.append(data)
+        self._buffer_length += len(data)
+        if self._buffer_length >= self.block_size:
+            data = ''.join(self._buffer)
+            offset = 0
+            while len(data) - offset >= self.block_size:
+                self._dispatch(data[offset:offset + self.block_size])
+                offset += self.block_size
+            self._buffer = [data[offset:]]
+            self._buffer_length = len(data) - offset
+        return self._collect(wait_for=self.threads)
+
+    def finalize(self):
+        if self._buffer_length or not self._pending:
+            self._dispatch(''.join(self._buffer))
+            self._buffer = []
+            self._buffer_length = 0
+        return self._collect()
+
+
+class GzipDecoder(StreamCodec):
+    """Decompress a gzip stream made of one or more members."""
+
+    def __init__(self):
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def update(self, data):
+        output = []
+        while data:
+            try:
+                output.append(self._decompressor.decompress(data))
+            except zlib.error as e:
+                raise CodecError(str(e))
+            data = self._decompressor.unused_data
+            if data:
+                # Start of the next gzip member.
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return ''.join(output)
+
+    def finalize(self):
+        return self._decompressor.flush()
+
+
+class OpenSSLAESCodec(StreamCodec):
+    """Base for the 'openssl enc -aes-256-cbc -salt' stream format.
+
+    The stream starts with 'Salted__' and an 8 byte salt from which the
+    key and IV are derived from the passphrase with EVP_BytesToKey, using
+    the backup_aes_cbc_digest digest.
+    """
+
+    MAGIC = 'Salted__'
+    SALT_LENGTH = 8
+    KEY_LENGTH = 32
+    IV_LENGTH = 16
+
+    def __init__(self, passphrase=None, digest=None):
+        self.passphrase = passphrase or CONF.backup_aes_cbc_key
+        self.digest = digest or CONF.backup_aes_cbc_digest
+
+    def _derive_cipher(self, salt):
+        derived = ''
+        block = ''
+        while len(derived) < self.KEY_LENGTH + self.IV_LENGTH:
+            block = hashlib.new(self.digest,
+                                block + self.passphrase + salt).digest()
+            derived += block
+        key = derived[:self.KEY_LENGTH]
+        iv = derived[self.KEY_LENGTH:self.KEY_LENGTH + self.IV_LENGTH]
+        return ciphers.Cipher(algorithms.AES(key), modes.CBC(iv),
+                              backend=default_backend())
+
+
+class OpenSSLAESEncoder(OpenSSLAESCodec):
+    """Encrypt a stream in the 'openssl enc' format."""
+
+    def __init__(self, passphrase=None, digest=None):
+        super(OpenSSLAESEncoder, self).__init__(passphrase, digest)
+        salt = os.urandom(self.SALT_LENGTH)
+        self._header = self.MAGIC + salt
+        self._encryptor = self._derive_cipher(salt).encryptor()
+        self._padder = padding.PKCS7(algorithms.AES.block_size).padder()
+
+    def _take_header(self):
+        header, self._header = self._header, ''
+        return header
+
+    def update(self, data):
+        return self._take_header() + self._encryptor.update(
+            self._padder.update(data))
+
+    def finalize(self):
+        return (self._take_header() +
+                self._encryptor.update(self._padder.finalize()) +
+                self._encryptor.finalize())
+
+
+class OpenSSLAESDecoder(OpenSSLAESCodec):
+    """Decrypt a stream in the 'openssl enc' format."""
+
+    def __init__(self, passphrase=None, digest=None):
+        super(OpenSSLAESDecoder, self).__init__(passphrase, digest)
+        self._header = ''
+        self._decryptor = None
+        self._unpadder = padding.PKCS7(algorithms.AES.block_size).unpadder()
+
+    def update(self, data):
+        if self._decryptor is None:
+            self._header += data
+            header_length = len(self.MAGIC) + self.SALT_LENGTH
+            if len(self._header) < header_length:
+                return ''
+            if not self._header.startswith(self.MAGIC):
+                raise CodecError("Backup stream is not salted as expected.")
+            salt = self._header[len(self.MAGIC):header_length]
+            data = self._header[header_length:]
+            self._decryptor = self._derive_cipher(salt).decryptor()
+        return self._unpadder.update(self._decryptor.update(data))
+
+    def finalize(self):
+        if self._decryptor is None:
+            raise CodecError("Backup stream ended before the salt header.")
+        try:
+            return self._unpadder.update(self._decryptor.finalize()) + \
+                self._unpadder.finalize()
+        except ValueError as e:
+            raise CodecError(str(e))
+
+
+def encode(data, codecs):
+    for codec in codecs:
+        data = codec.update(data)
+    return data
+
+
+def finalize(codecs):
+    data = ''
+    for codec in codecs:
+        data = codec.update(data) + codec.finalize()
+    return data
+
+
+class EncodedStream(object):
+    """File-like wrapper that runs a stream through a chain of codecs."""
+
+    def __init__(self, stream, codecs):
+        self.stream = stream
+        self.codecs = codecs
+        self._pieces = collections.deque()
+        self._offset = 0
+        self._length = 0
+        self._finished = False
+
+    def read(self, chunk_size):
+        while self._length < chunk_size and not self._finished:
+            data = self.stream.read(chunk_size)
+            if data:
+                data = encode(data, self.codecs)
+            else:
+                data = finalize(self.codecs)
+                self._finished = True
+            if data:
+                self._pieces.append(data)
+                self._length += len(data)
+
+        output = []
+        needed = chunk_size
+        while needed and self._pieces:
+            piece = self._pieces[0]
+            chunk = piece[self._offset:self._offset + needed]
+            self._offset += len(chunk)
+            if self._offset == len(piece):
+                self._pieces.popleft()
+                self._offset = 0
+            output.append(chunk)
+            needed -= len(chunk)
+        self._length -= chunk_size - needed
+        return ''.join(output)
+
+
+def decode_stream(chunks, codecs):
+    """Run an iterable of chunks through a chain of codecs."""
+    for chunk in chunks:
+        data = encode(chunk, codecs)
+        if data:
+            yield data
+    data = finalize(codecs)
+    if data:
+        yield data
@@ -328,14 +328,16 @@ class ImportOverrideStrategy(ConfigurationOverrideStrategy):
                 revision_file, codec=self._codec)
             options = guestagent_utils.update_dict(options, current)
 
-        operating_system.write_file(
-            revision_file, options, codec=self._codec,
-            as_root=self._requires_root)
-        operating_system.chown(
-            revision_file, self._owner, self._group,
-            as_root=self._requires_root)
-        operating_system.chmod(
-            revision_file, FileMode.ADD_READ_ALL, as_root=self._requires_root)
+        with operating_system.batched_as_root():
+            operating_system.write_file(
+                revision_file, options, codec=self._codec,
+                as_root=self._requires_root)
+            operating_system.chown(
+                revision_file, self._owner, self._group,
+                as_root=self._requires_root)
+            operating_system.chmod(
+                revision_file, FileMode.ADD_READ_ALL,
+                as_root=self._requires_root)
 
     def remove(self, group_name, change_id=None):
         removed = set()
@@ -348,9 +350,10 @@ class ImportOverrideStrategy(ConfigurationOverrideStrategy):
             # Remove the entire group.
             removed = self._collect_revision_files(group_name)
 
-        for path in removed:
-            operating_system.remove(path, force=True,
-                                    as_root=self._requires_root)
+        with operating_system.batched_as_root():
+            for path in removed:
+                operating_system.remove(path, force=True,
+                                        as_root=self._requires_root)
 
     def parse_updates(self):
         parsed_options = {}
@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
 import inspect
 import operator
 import os
@@ -27,6 +28,7 @@ from trove.common import exception
 from trove.common.i18n import _
 from trove.common.stream_codecs import IdentityCodec
 from trove.common import utils
+from trove.guestagent.common import root_helper
 
 REDHAT = 'redhat'
 DEBIAN = 'debian'
@@ -70,6 +72,9 @@ def _read_file_as_root(path, codec):
     :param codec:              A codec used to serialize the data.
     :type codec:               StreamCodec
     """
+    helper = root_helper.get_client()
+    if helper:
+        return codec.deserialize(helper.read_file(path))
     with tempfile.NamedTemporaryFile() as fp:
         copy(path, fp.name, force=True, as_root=True)
         chmod(fp.name, FileMode.ADD_READ_ALL(), as_root=True)
@@ -118,6 +123,10 @@ def _write_file_as_root(path, data, codec):
     :param codec:              A codec used to serialize the data.
     :type codec:               StreamCodec
     """
+    helper = root_helper.get_client()
+    if helper:
+        helper.write_file(path, codec.serialize(data))
+        return
     # The files gets removed automatically once the managing object goes
     # out of scope.
     with tempfile.NamedTemporaryFile('w', 0, delete=False) as fp:
@@ -413,6 +422,11 @@ def chown(path, user, group, recursive=True, force=False, **kwargs):
         raise exception.UnprocessableEntity(
             _("Please specify owner or group, or both."))
 
+    helper = _root_helper(kwargs)
+    if helper:
+        helper.call('chown', path, user, group, recursive=recursive,
+                    force=force)
+        return
     owner_group_modifier = _build_user_group_pair(user, group)
     options = (('f', force), ('R', recursive))
     _execute_shell_cmd('chown', options, owner_group_modifier, path, **kwargs)
@@ -433,6 +447,10 @@ def _create_directory(dir_path, force=True, **kwargs):
     :type force:            boolean
     """
 
+    helper = _root_helper(kwargs)
+    if helper:
+        helper.call('create_directory', dir_path, force=force)
+        return
     options = (('p', force),)
     _execute_shell_cmd('mkdir', options, dir_path, **kwargs)
 
@@ -464,6 +482,14 @@ def chmod(path, mode, recursive=True, force=False, **kwargs):
     if path:
         options = (('f', force), ('R', recursive))
         shell_modes = _build_shell_chmod_mode(mode)
+        helper = _root_helper(kwargs)
+        if helper:
+            if inspect.ismethod(mode):
+                mode = mode()
+            helper.call('chmod', path, mode.get_reset_mode(),
+                        mode.get_add_mode(), mode.get_remove_mode(),
+                        recursive=recursive, force=force)
+            return
         _execute_shell_cmd('chmod', options, shell_modes, path, **kwargs)
     else:
         raise exception.UnprocessableEntity(
@@ -518,6 +544,10 @@ def remove(path, force=False, recursive=True, **kwargs):
     """
 
     if path:
+        helper = _root_helper(kwargs)
+        if helper:
+            helper.call('remove', path, force=force, recursive=recursive)
+            return
         options = (('f', force), ('R', recursive))
         _execute_shell_cmd('rm', options, path, **kwargs)
     else:
@@ -549,6 +579,10 @@ def move(source, destination, force=False, **kwargs):
     elif not destination:
         raise exception.UnprocessableEntity(_("Missing destination path."))
 
+    helper = _root_helper(kwargs)
+    if helper:
+        helper.call('move', source, destination, force=force)
+        return
     options = (('f', force),)
     _execute_shell_cmd('mv', options, source, destination, **kwargs)
 
@@ -598,6 +632,31 @@ def get_bytes_free_on_fs(path):
     return v.f_bsize * v.f_bavail
 
 
+@contextlib.contextmanager
+def batched_as_root():
+    """Send the privileged operations of the block to the root helper in
+    as few requests as possible.
+
+    Errors of operations without a result may only be raised when the block
+    exits. Without the root helper the operations run one by one as usual.
+    """
+    helper = root_helper.get_client()
+    if helper:
+        with helper.batch():
+            yield
+    else:
+        yield
+
+
+def _root_helper(kwargs):
+    """The root helper client if an operation called with the given
+    keyword arguments should run in it, None to execute a command.
+    """
+    if not kwargs.get('as_root') or set(kwargs) - {'as_root', 'timeout'}:
+        return None
+    return root_helper.get_client()
+
+
 def _execute_shell_cmd(cmd, options, *args, **kwargs):
     """Execute a given shell command passing it
     given options (flags) and arguments.
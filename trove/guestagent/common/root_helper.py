@@ -0,0 +1,402 @@
+# Copyright 2015 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Long-lived root helper process of the guest agent.
+
+Running every privileged file operation through 'sudo' costs a process
+launch each time. With guest_root_helper enabled the agent instead starts
+this module once as root (with 'sudo') and sends it the operations over a
+UNIX socket only the agent user may use, where they are carried out with
+native system calls.
+
+Requests and responses are single lines of JSON. A request is a list of
+[name, args, kwargs] operations which are run in order until one fails. The
+response holds either the results of all the operations or the error of
+the one that failed.
+"""
+
+import base64
+import contextlib
+import errno
+import grp
+import json
+import os
+import pwd
+import shutil
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+from eventlet import corolocal
+from eventlet import semaphore
+from oslo_log import log as logging
+from six.moves import socketserver
+
+from trove.common import cfg
+from trove.common import exception
+from trove.common.i18n import _
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+# From <asm-generic/socket.h>, not exposed by the Python 2 socket module.
+SO_PEERCRED = getattr(socket, 'SO_PEERCRED', 17)
+AGENT_CHECK_INTERVAL = 5  # seconds.
+
+
+def _walk(path, recursive):
+    """Yield path and, if recursive, everything below it.
+
+    Like the '-R' option of the core utilities, symbolic links below path
+    are not followed.
+    """
+    yield path
+    if recursive and os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            for name in dirs + files:
+                yield os.path.join(root, name)
+
+
+def read_file(path):
+    with open(path, 'rb') as fp:
+        return base64.b64encode(fp.read())
+
+
+def write_file(path, data):
+    with open(path, 'wb') as fp:
+        fp.write(base64.b64decode(data))
+
+
+def chown(path, user, group, recursive=True, force=False):
+    uid = pwd.getpwnam(user).pw_uid if user else -1
+    gid = grp.getgrnam(group).gr_gid if group else -1
+    for item in _walk(path, recursive):
+        try:
+            if item == path:
+                os.chown(item, uid, gid)
+            else:
+                os.lchown(item, uid, gid)
+        except OSError:
+            if not force:
+                raise
+
+
+def chmod(path, reset, add, remove, recursive=True, force=False):
+    for item in _walk(path, recursive):
+        if item != path and os.path.islink(item):
+            continue
+        try:
+            mode = stat.S_IMODE(os.stat(item).st_mode)
+            if reset is not None:
+                mode = reset
+            mode = (mode | (add or 0)) & ~(remove or 0)
+            os.chmod(item, mode)
+        except OSError:
+            if not force:
+                raise
+
+
+def stat_file(path):
+    result = os.stat(path)
+    return {'mode': result.st_mode, 'uid': result.st_uid,
+            'gid': result.st_gid, 'size': result.st_size,
+            'mtime': result.st_mtime}
+
+
+def remove(path, force=False, recursive=True):
+    try:
+        if recursive and os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except OSError as e:
+        if not (force and e.errno == errno.ENOENT):
+            raise
+
+
+def move(source, destination, force=False):
+    shutil.move(source, destination)
+
+
+def create_directory(path, force=True):
+    try:
+        if force:
+            os.makedirs(path)
+        else:
+            os.mkdir(path)
+    except OSError as e:
+        if not (force and e.errno == errno.EEXIST and os.path.isdir(path)):
+            raise
+
+
+OPERATIONS = {
+    'read_file': read_file,
+    'write_file': write_file,
+    'chown': chown,
+    'chmod': chmod,
+    'stat': stat_file,
+    'remove': remove,
+    'move': move,
+    'create_directory': create_directory,
+}
+
+# Operations with a result the caller waits for, which cannot be batched.
+READ_OPERATIONS = frozenset(['read_file', 'stat'])
+
+
+def run_operations(operations):
+    """Run the operations of a request, in order, until one fails."""
+    results = []
+    for index, (name, args, kwargs) in enumerate(operations):
+        try:
+            results.append(OPERATIONS[name](*args, **kwargs))
+        except Exception as e:
+            return {'results': results,
+                    'error': {'index': index, 'operation': name,
+                              'errno': getattr(e, 'errno', None),
+                              'message': str(e)}}
+    return {'results': results}
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in iter(self.rfile.readline, ''):
+            response = run_operations(json.loads(line))
+            self.wfile.write(json.dumps(response) + '\n')
+            self.wfile.flush()
+
+
+class RootHelperServer(socketserver.ThreadingMixIn,
+                       socketserver.UnixStreamServer):
+    """Serve the operations of the agent with the given pid and uid."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, agent_uid, agent_pid=None):
+        self.agent_uid = agent_uid
+        self.agent_pid = agent_pid
+        socket_dir = os.path.dirname(socket_path)
+        if not os.path.isdir(socket_dir):
+            os.makedirs(socket_dir, 0o755)
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        socketserver.UnixStreamServer.__init__(self, socket_path,
+                                               RequestHandler)
+        os.chmod(socket_path, 0o600)
+        os.chown(socket_path, agent_uid, -1)
+
+    def verify_request(self, request, client_address):
+        """Only serve the agent user, whatever the socket permissions."""
+        credentials = request.getsockopt(socket.SOL_SOCKET, SO_PEERCRED,
+                                         struct.calcsize('3i'))
+        pid, uid, gid = struct.unpack('3i', credentials)
+        return uid == self.agent_uid
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        try:
+            os.remove(self.server_address)
+        except OSError:
+            pass
+
+    def _watch_agent(self):
+        """Shut down once the agent process is gone."""
+        while True:
+            time.sleep(AGENT_CHECK_INTERVAL)
+            try:
+                os.kill(self.agent_pid, 0)
+            except OSError as e:
+                if e.errno == errno.ESRCH:
+                    self.shutdown()
+                    return
+
+    def serve(self):
+        if self.agent_pid:
+            watcher = threading.Thread(target=self._watch_agent)
+            watcher.daemon = True
+            watcher.start()
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+
+
+class RootHelperClient(object):
+    """Client of the root helper daemon owned by this agent process.
+
+    The daemon is started on first use and again if it went away. Calls
+    from concurrent green threads are serialized over the one connection.
+    """
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.pid = os.getpid()
+        self._lock = semaphore.Semaphore()
+        self._local = corolocal.local()
+        self._socket = None
+        self._file = None
+        self._process = None
+
+    def start(self):
+        """Start the daemon, unless it is already running, and connect."""
+        with self._lock:
+            self._connect()
+
+    def _launch(self):
+        LOG.debug("Starting the root helper on %s." % self.socket_path)
+        self._process = subprocess.Popen(
+            ['sudo', '-n', sys.executable, '-m', __name__,
+             self.socket_path, str(os.getuid()), str(os.getpid())],
+            close_fds=True)
+
+    def _connect(self):
+        if self._socket is not None:
+            return
+        deadline = time.time() + CONF.guest_root_helper_start_timeout
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+                break
+            except socket.error:
+                sock.close()
+                if self._process is None or self._process.poll() is not None:
+                    self._launch()
+                if time.time() > deadline:
+                    raise exception.TroveError(
+                        _("Timeout starting the root helper on %s.")
+                        % self.socket_path)
+                time.sleep(0.1)
+        self._socket = sock
+        self._file = sock.makefile('rb')
+
+    def _close(self):
+        if self._socket is not None:
+            self._file.close()
+            self._socket.close()
+        self._socket = None
+        self._file = None
+
+    def run(self, operations):
+        """Run the [name, args, kwargs] operations and return the results.
+
+        :raises: ProcessExecutionError if an operation failed.
+        """
+        request = json.dumps(operations) + '\n'
+        with self._lock:
+            self._connect()
+            try:
+                self._socket.sendall(request)
+                line = self._file.readline()
+                if not line:
+                    raise socket.error(_("Connection closed."))
+            except socket.error as e:
+                # Not retried since the operations may have been run; the
+                # daemon is started again on the next call.
+                self._close()
+                raise exception.ProcessExecutionError(
+                    description=_("Lost the root helper: %s") % e)
+        response = json.loads(line)
+        error = response.get('error')
+        if error:
+            raise exception.ProcessExecutionError(
+                cmd=error['operation'], exit_code=error['errno'],
+                stderr=error['message'],
+                description=_("Root helper operation failed."))
+        return response['results']
+
+    def call(self, name, *args, **kwargs):
+        """Run a single operation, or queue it if in a batch."""
+        queue = getattr(self._local, 'queue', None)
+        operation = [name, args, kwargs]
+        if queue is None:
+            return self.run([operation])[0]
+        if name not in READ_OPERATIONS:
+            queue.append(operation)
+            return None
+        # The result is needed now, so the queued operations go first.
+        operations = queue + [operation]
+        del queue[:]
+        return self.run(operations)[-1]
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Send the operations called in the block in as few requests as
+        possible.
+
+        Operations with no result are queued and sent when the block exits
+        or along with the next operation returning one, so their errors
+        may only be raised then. Queued operations are dropped if the block
+        raises.
+        """
+        if getattr(self._local, 'queue', None) is not None:
+            # Already batching.
+            yield
+            return
+        self._local.queue = []
+        try:
+            yield
+            if self._local.queue:
+                self.run(self._local.queue)
+        finally:
+            self._local.queue = None
+
+    def read_file(self, path):
+        return base64.b64decode(self.call('read_file', path))
+
+    def write_file(self, path, data):
+        self.call('write_file', path, base64.b64encode(data))
+
+
+_client = None
+_unavailable = False
+
+
+def get_client():
+    """The root helper client of this process, None if not in use.
+
+    If the daemon cannot be started privileged operations keep running
+    through 'sudo'.
+    """
+    global _client, _unavailable
+    if not CONF.guest_root_helper or _unavailable:
+        return None
+    if _client is None or _client.pid != os.getpid():
+        client = RootHelperClient(os.path.join(
+            CONF.guest_root_helper_dir,
+            'root-helper-%d.sock' % os.getpid()))
+        try:
+            client.start()
+        except Exception:
+            LOG.exception(_("Could not start the root helper, running "
+                            "privileged operations with sudo."))
+            _unavailable = True
+            return None
+        _client = client
+    return _client
+
+
+def main():
+    socket_path, agent_uid, agent_pid = sys.argv[1:4]
+    RootHelperServer(socket_path, int(agent_uid), int(agent_pid)).serve()
+
+
+if __name__ == '__main__':
+    main()
@@ -14,6 +14,7 @@
 #    under the License.
 
 import os
+import socket
 import tempfile
 
 from oslo_log import log as logging
@@ -225,7 +226,19 @@ class CassandraApp(object):
 
 class CassandraAppStatus(service.BaseDbStatus):
 
+    def _ping(self):
+        # Cassandra only listens for clients once it has fully started.
+        sock = socket.create_connection(
+            ('localhost', system.CASSANDRA_NATIVE_PORT),
+            CONF.guest_status_probe_timeout)
+        sock.close()
+        return True
+
     def _get_actual_db_status(self):
+        status = self._get_pinged_db_status()
+        if status is not None:
+            return status
+
         try:
             # If status check would be successful,
             # bot stdin and stdout would contain nothing
@@ -30,6 +30,7 @@ START_CASSANDRA = "sudo service cassandra start"
 STOP_CASSANDRA = "sudo service cassandra stop"
 
 CASSANDRA_STATUS = """echo "use system;" > /tmp/check; cqlsh -f /tmp/check"""
+CASSANDRA_NATIVE_PORT = 9042
 
 CASSANDRA_KILL = "sudo killall java  || true"
 SERVICE_STOP_TIMEOUT = 60
@@ -189,6 +189,13 @@ class BaseMySqlManager(periodic_task.PeriodicTasks):
             # (see MySqlApp.secure()) and restart.
             app.set_data_dir(mount_point + '/data')
             app.start_mysql()
+        if snapshot and snapshot.get('stream') and not backup_info:
+            # Seeded straight from the replication source.
+            backup_info = {'id': snapshot['dataset']['snapshot_id'],
+                           'type': snapshot['stream']['type'],
+                           'location': None,
+                           'checksum': None,
+                           'stream': snapshot['stream']}
         if backup_info:
             self._perform_restore(backup_info, context,
                                   mount_point + "/data", app)
@@ -287,6 +294,9 @@ class BaseMySqlManager(periodic_task.PeriodicTasks):
         replication = self.replication_strategy_class(context)
         replication.enable_as_master(app, replica_source_config)
 
+        stream = None
+        if snapshot_info.get('stream'):
+            stream = replication.stream_snapshot(context, snapshot_info)
         snapshot_id, log_position = (
             replication.snapshot_for_replication(context, app, None,
                                                  snapshot_info))
@@ -305,6 +315,8 @@ class BaseMySqlManager(periodic_task.PeriodicTasks):
             'master': replication.get_master_ref(app, snapshot_info),
             'log_position': log_position
         }
+        if stream is not None:
+            replication_snapshot['stream'] = stream
 
         return replication_snapshot
 
@@ -18,6 +18,7 @@
 
 import abc
 from collections import defaultdict
+import math
 import os
 import re
 import six
@@ -50,6 +51,9 @@ ADMIN_USER_NAME = "os_admin"
 LOG = logging.getLogger(__name__)
 FLUSH = text(sql_query.FLUSH)
 ENGINE = None
+# Engine of the status ping, with short timeouts.
+PING_ENGINE = None
+PING = text("SELECT 1")
 DATADIR = None
 PREPARING = False
 UUID = False
@@ -140,7 +144,42 @@ class BaseMySqlAppStatus(service.BaseDbStatus):
             cls._instance = BaseMySqlAppStatus()
         return cls._instance
 
+    def _get_ping_engine(self):
+        global PING_ENGINE
+        if PING_ENGINE:
+            return PING_ENGINE
+
+        pwd = BaseMySqlApp.get_auth_password()
+        timeout = int(math.ceil(CONF.guest_status_probe_timeout))
+        PING_ENGINE = sqlalchemy.create_engine(
+            "mysql://%s:%s@localhost:3306" % (ADMIN_USER_NAME, pwd.strip()),
+            pool_size=1, max_overflow=0, pool_recycle=7200,
+            connect_args={'connect_timeout': timeout,
+                          'read_timeout': timeout},
+            listeners=[BaseKeepAliveConnection()])
+        return PING_ENGINE
+
+    def _ping(self):
+        global PING_ENGINE
+        try:
+            connection = self._get_ping_engine().connect()
+            try:
+                connection.execute(PING)
+            finally:
+                connection.close()
+        except Exception:
+            # Connect again next time, the password may have changed.
+            if PING_ENGINE:
+                PING_ENGINE.dispose()
+                PING_ENGINE = None
+            raise
+        return True
+
     def _get_actual_db_status(self):
+        status = self._get_pinged_db_status()
+        if status is not None:
+            return status
+
         try:
             out, err = utils.execute_with_timeout(
                 "/usr/bin/mysqladmin",
@@ -225,21 +264,35 @@ class BaseMySqlAdmin(object):
     def mysql_app(self):
         return self._mysql_app
 
-    def _associate_dbs(self, user):
-        """Internal. Given a MySQLUser, populate its databases attribute."""
-        LOG.debug("Associating dbs to user %s at %s." %
-                  (user.name, user.host))
+    def _associate_dbs(self, *users):
+        """Internal. Given MySQLUsers, populate their databases attribute.
+
+        The grants of all the users are read in a single query.
+        """
+        if not users:
+            return
+        grantees = {}
+        params = {}
+        for index, user in enumerate(users):
+            grantee = "'%s'@'%s'" % (user.name, user.host)
+            grantees[grantee] = user
+            params['grantee%d' % index] = grantee
+        placeholders = ", ".join(":grantee%d" % index
+                                 for index in range(len(users)))
+        LOG.debug("Associating dbs to users %s." % sorted(grantees))
         with self.local_sql_client(self.mysql_app.get_engine()) as client:
             q = sql_query.Query()
             q.columns = ["grantee", "table_schema"]
             q.tables = ["information_schema.SCHEMA_PRIVILEGES"]
             q.group = ["grantee", "table_schema"]
-            q.where = ["privilege_type != 'USAGE'"]
+            q.where = ["privilege_type != 'USAGE'",
+                       "grantee IN (%s)" % placeholders]
             t = text(str(q))
-            db_result = client.execute(t)
+            db_result = client.execute(t, **params)
             for db in db_result:
                 LOG.debug("\t db: %s." % db)
-                if db['grantee'] == "'%s'@'%s'" % (user.name, user.host):
+                user = grantees.get(db['grantee'])
+                if user is not None:
                     mysql_db = models.MySQLDatabase()
                     mysql_db.name = db['table_schema']
                     user.databases.append(mysql_db.serialize())
@@ -515,9 +568,11 @@ class BaseMySqlAdmin(object):
                 mysql_user = models.MySQLUser()
                 mysql_user.name = row['User']
                 mysql_user.host = row['Host']
-                self._associate_dbs(mysql_user)
                 next_marker = row['Marker']
-                users.append(mysql_user.serialize())
+                users.append(mysql_user)
+        # Read the grants of the whole page at once.
+        self._associate_dbs(*users)
+        users = [user.serialize() for user in users]
         if result.rowcount <= limit:
             next_marker = None
         LOG.debug("users = " + str(users))
@@ -1033,8 +1088,9 @@ class BaseMySqlApp(object):
         with self.local_sql_client(self.get_engine()) as client:
             self._create_admin_user(client, admin_password)
             # reset the ENGINE because the password could have changed
-            global ENGINE
+            global ENGINE, PING_ENGINE
             ENGINE = None
+            PING_ENGINE = None
         self._save_authentication_properties(admin_password)
 
 
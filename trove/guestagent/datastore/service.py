@@ -14,6 +14,7 @@
 #    under the License.
 
 
+import random
 import time
 
 from oslo_log import log as logging
@@ -54,12 +55,16 @@ class BaseDbStatus(object):
     """
 
     _instance = None
+    # Time after which an unchanged status is sent again.
+    _next_keepalive = None
 
     def __init__(self):
         if self._instance is not None:
             raise RuntimeError("Cannot instantiate twice.")
         self.status = None
         self.restart_mode = False
+        # The first report after the agent starts is always sent.
+        self.force_next_heartbeat()
 
     def begin_install(self):
         """Called right before DB is prepared."""
@@ -68,6 +73,7 @@ class BaseDbStatus(object):
     def begin_restart(self):
         """Called before restarting DB server."""
         self.restart_mode = True
+        self.force_next_heartbeat()
 
     def end_install_or_restart(self):
         """Called after DB is installed or restarted.
@@ -83,6 +89,30 @@ class BaseDbStatus(object):
     def _get_actual_db_status(self):
         raise NotImplementedError()
 
+    def _ping(self):
+        """Ping the database with a persistent in-process client.
+
+        Implemented by the datastores with such a client, waiting no longer
+        than guest_status_probe_timeout.
+
+        :returns: True if the database answered.
+        """
+        raise NotImplementedError()
+
+    def _get_pinged_db_status(self):
+        """RUNNING if the database answers a ping, None otherwise.
+
+        This is much cheaper than running status commands on every check,
+        so the datastores only fall back to them if it returns None.
+        """
+        try:
+            if self._ping():
+                LOG.debug("Database answered the status ping.")
+                return instance.ServiceStatuses.RUNNING
+        except Exception as e:
+            LOG.debug("Database status ping failed: %s" % e)
+        return None
+
     @property
     def is_installed(self):
         """
@@ -116,6 +146,12 @@ class BaseDbStatus(object):
             LOG.debug("Prepare has not run yet, skipping heartbeat.")
             return
 
+        if (not force_heartbeat_status and not force and
+                status == self.status and not self._keepalive_due()):
+            LOG.debug("Status is still '%s', skipping heartbeat." %
+                      status.description)
+            return
+
         LOG.debug("Casting set_status message to conductor (status is '%s')." %
                   status.description)
         context = trove_context.TroveContext()
@@ -128,6 +164,32 @@ class BaseDbStatus(object):
                                              sent=timeutils.float_utcnow())
         LOG.debug("Successfully cast set_status.")
         self.status = status
+        self._schedule_keepalive()
+
+    def force_next_heartbeat(self):
+        """Send the next status report even if the status is unchanged.
+
+        The controller overwrites the status during some actions, such as
+        PAUSED while resizing or rebooting, and waits for the guest to
+        report any other status, so it cannot wait for the keepalive.
+        """
+        self._next_keepalive = None
+
+    def _keepalive_due(self):
+        return (CONF.agent_heartbeat_keepalive <= 0 or
+                self._next_keepalive is None or
+                time.time() >= self._next_keepalive)
+
+    def _schedule_keepalive(self):
+        """Plan the next heartbeat of an unchanged status.
+
+        It is brought forward by a random part of the jitter, never pushed
+        back, so the controller may rely on agent_heartbeat_keepalive.
+        """
+        interval = CONF.agent_heartbeat_keepalive
+        jitter = min(max(CONF.agent_heartbeat_keepalive_jitter, 0.0), 1.0)
+        self._next_keepalive = (
+            time.time() + interval * (1.0 - random.uniform(0.0, jitter)))
 
     def update(self):
         """Find and report status of DB on this machine.
@@ -278,6 +340,8 @@ class BaseDbStatus(object):
         specified. Does not update the publicly viewable status Unless
         "update_db" is True.
         """
+        # Started by a stop, start or restart of the database.
+        self.force_next_heartbeat()
         WAIT_TIME = 3
         waited_time = 0
         while waited_time < max_time:
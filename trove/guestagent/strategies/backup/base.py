@@ -20,6 +20,7 @@ from oslo_log import log as logging
 
 from eventlet.green import subprocess
 from trove.common import cfg, utils
+from trove.guestagent.common import backup_codecs
 from trove.guestagent.strategy import Strategy
 
 CONF = cfg.CONF
@@ -45,11 +46,14 @@ class BackupRunner(Strategy):
     is_zipped = CONF.backup_use_gzip_compression
     is_encrypted = CONF.backup_use_openssl_encryption
     encrypt_key = CONF.backup_aes_cbc_key
+    # Compress and encrypt in the agent rather than through a pipeline
+    inprocess_codecs = CONF.backup_use_inprocess_codecs
 
     def __init__(self, filename, **kwargs):
         self.base_filename = filename
         self.process = None
         self.pid = None
+        self.stream = None
         kwargs.update({'filename': filename})
         self.command = self.cmd % kwargs
         super(BackupRunner, self).__init__()
@@ -65,6 +69,12 @@ class BackupRunner(Strategy):
                                         stderr=subprocess.PIPE,
                                         preexec_fn=os.setsid)
         self.pid = self.process.pid
+        codecs = self.codecs
+        if codecs:
+            self.stream = backup_codecs.EncodedStream(self.process.stdout,
+                                                      codecs)
+        else:
+            self.stream = self.process.stdout
 
     def __enter__(self):
         """Start up the process."""
@@ -111,9 +121,22 @@ class BackupRunner(Strategy):
                            self.zip_manifest,
                            self.encrypt_manifest)
 
+    @property
+    def codecs(self):
+        """The in-process codecs the backup stream is run through."""
+        if not self.inprocess_codecs:
+            return []
+        codecs = []
+        if self.is_zipped:
+            codecs.append(backup_codecs.GzipEncoder())
+        if self.is_encrypted:
+            codecs.append(backup_codecs.OpenSSLAESEncoder(self.encrypt_key))
+        return codecs
+
     @property
     def zip_cmd(self):
-        return ' | gzip' if self.is_zipped else ''
+        return (' | gzip' if self.is_zipped and not self.inprocess_codecs
+                else '')
 
     @property
     def zip_manifest(self):
@@ -121,8 +144,10 @@ class BackupRunner(Strategy):
 
     @property
     def encrypt_cmd(self):
-        return (' | openssl enc -aes-256-cbc -salt -pass pass:%s' %
-                self.encrypt_key) if self.is_encrypted else ''
+        if self.is_encrypted and not self.inprocess_codecs:
+            return (' | openssl enc -aes-256-cbc -salt -pass pass:%s' %
+                    self.encrypt_key)
+        return ''
 
     @property
     def encrypt_manifest(self):
@@ -133,7 +158,7 @@ class BackupRunner(Strategy):
         return True
 
     def read(self, chunk_size):
-        return self.process.stdout.read(chunk_size)
+        return self.stream.read(chunk_size)
 
     def _run_pre_backup(self):
         pass
@@ -44,6 +44,14 @@ class Replication(Strategy):
                                  snapshot_info):
         """Capture snapshot of master db."""
 
+    def stream_snapshot(self, context, snapshot_info):
+        """Offer the snapshot to stream straight to the replica.
+
+        Returns the endpoint to fetch it from, or None if the strategy
+        cannot stream snapshots.
+        """
+        return None
+
     @abc.abstractmethod
     def enable_as_master(self, service, master_config):
         """Configure underlying database to act as master for replication."""
@@ -24,6 +24,7 @@ from trove.common import cfg
 from trove.common.i18n import _
 from trove.common import utils
 from trove.guestagent.backup.backupagent import BackupAgent
+from trove.guestagent.backup import peer
 from trove.guestagent.datastore.mysql.service import MySqlAdmin
 from trove.guestagent.db import models
 from trove.guestagent.strategies import backup
@@ -87,8 +88,11 @@ class MysqlReplicationBase(base.Replication):
         replica_number = snapshot_info.get('replica_number', 1)
 
         LOG.debug("Acquiring backup for replica number %d." % replica_number)
+        if snapshot_info.get('stream'):
+            LOG.debug("The backup is streamed to the replica, see "
+                      "stream_snapshot.")
         # Only create a backup if it's the first replica
-        if replica_number == 1:
+        elif replica_number == 1:
             AGENT.execute_backup(
                 context, snapshot_info, runner=REPL_BACKUP_RUNNER,
                 extra_opts=REPL_EXTRA_OPTS,
@@ -108,6 +112,15 @@ class MysqlReplicationBase(base.Replication):
         }
         return snapshot_id, log_position
 
+    def stream_snapshot(self, context, snapshot_info):
+        """Offer a full backup to stream straight to the new replica.
+
+        :returns: The endpoint the replica fetches the backup from.
+        """
+        filename = snapshot_info.get('id') or str(uuid.uuid4())
+        return peer.offer_backup(REPL_BACKUP_RUNNER, filename,
+                                 extra_opts=REPL_EXTRA_OPTS)
+
     def enable_as_master(self, service, master_config):
         if not service.exists_replication_source_overrides():
             service.write_replication_source_overrides(master_config)
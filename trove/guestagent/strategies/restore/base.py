@@ -19,6 +19,7 @@ from oslo_log import log as logging
 
 from trove.common import cfg
 from trove.common import utils
+from trove.guestagent.common import backup_codecs
 from trove.guestagent.strategy import Strategy
 
 LOG = logging.getLogger(__name__)
@@ -27,6 +28,7 @@ CHUNK_SIZE = CONF.backup_chunk_size
 BACKUP_USE_GZIP = CONF.backup_use_gzip_compression
 BACKUP_USE_OPENSSL = CONF.backup_use_openssl_encryption
 BACKUP_DECRYPT_KEY = CONF.backup_aes_cbc_key
+BACKUP_USE_INPROCESS_CODECS = CONF.backup_use_inprocess_codecs
 
 
 class RestoreError(Exception):
@@ -50,6 +52,8 @@ class RestoreRunner(Strategy):
     is_zipped = BACKUP_USE_GZIP
     is_encrypted = BACKUP_USE_OPENSSL
     decrypt_key = BACKUP_DECRYPT_KEY
+    # Decrypt and decompress in the agent rather than through a pipeline
+    inprocess_codecs = BACKUP_USE_INPROCESS_CODECS
 
     def __init__(self, storage, **kwargs):
         self.storage = storage
@@ -78,8 +82,16 @@ class RestoreRunner(Strategy):
     def _run_restore(self):
         return self._unpack(self.location, self.checksum, self.restore_cmd)
 
-    def _unpack(self, location, checksum, command):
+    def _load_stream(self, location, checksum):
+        """Load the backup stream, decoded by any in-process codecs."""
         stream = self.storage.load(location, checksum)
+        codecs = self.codecs
+        if codecs:
+            return backup_codecs.decode_stream(stream, codecs)
+        return stream
+
+    def _unpack(self, location, checksum, command):
+        stream = self._load_stream(location, checksum)
         process = subprocess.Popen(command, shell=True,
                                    stdin=subprocess.PIPE,
                                    stderr=subprocess.PIPE)
@@ -94,8 +106,20 @@ class RestoreRunner(Strategy):
         return content_length
 
     @property
-    def decrypt_cmd(self):
+    def codecs(self):
+        """The in-process codecs the restore stream is run through."""
+        if not self.inprocess_codecs:
+            return []
+        codecs = []
         if self.is_encrypted:
+            codecs.append(backup_codecs.OpenSSLAESDecoder(self.decrypt_key))
+        if self.is_zipped:
+            codecs.append(backup_codecs.GzipDecoder())
+        return codecs
+
+    @property
+    def decrypt_cmd(self):
+        if self.is_encrypted and not self.inprocess_codecs:
             return ('openssl enc -d -aes-256-cbc -salt -pass pass:%s | '
                     % self.decrypt_key)
         else:
@@ -103,4 +127,5 @@ class RestoreRunner(Strategy):
 
     @property
     def unzip_cmd(self):
-        return 'gzip -d -c | ' if self.is_zipped else ''
+        return ('gzip -d -c | ' if self.is_zipped and not self.inprocess_codecs
+                else '')
@@ -50,7 +50,7 @@ class PgDump(base.RestoreRunner):
         # Message 'ERROR:  role "postgres" already exists'
         # is expected and does not pose any problems to the restore operation.
 
-        stream = self.storage.load(self.location, self.checksum)
+        stream = self._load_stream(self.location, self.checksum)
         process = subprocess.Popen(self.restore_cmd, shell=True,
                                    stdin=subprocess.PIPE,
                                    stderr=subprocess.PIPE)
@@ -0,0 +1,319 @@
+# Copyright 2015 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+import collections
+import hashlib
+import random
+import zlib
+
+from eventlet import greenpool
+from eventlet import greenthread
+from oslo_log import log as logging
+from six.moves import range
+from swiftclient.client import ClientException
+
+from trove.common import cfg
+from trove.common import dedup
+from trove.common.i18n import _
+from trove.guestagent.strategies.storage.swift import \
+    SwiftDownloadIntegrityError
+from trove.guestagent.strategies.storage.swift import SwiftStorage
+
+LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+
+CHUNK_SIZE = CONF.backup_chunk_size
+BACKUP_CONTAINER = CONF.backup_swift_container
+UPLOAD_CONCURRENCY = CONF.backup_upload_concurrency
+DOWNLOAD_CONCURRENCY = CONF.backup_download_concurrency
+MIN_CHUNK_SIZE = CONF.backup_dedup_min_chunk_size
+AVG_CHUNK_SIZE = CONF.backup_dedup_avg_chunk_size
+MAX_CHUNK_SIZE = CONF.backup_dedup_max_chunk_size
+
+# Half of the byte values are mapped to 1 and the other half to 0, runs of
+# ones being candidate boundaries. The seed is fixed so every guest cuts
+# identical data at the same places.
+_boundary_random = random.Random(0x74726f76)
+_boundary_bytes = set(_boundary_random.sample(range(256), 128))
+BOUNDARY_TABLE = ''.join('\1' if b in _boundary_bytes else '\0'
+                         for b in range(256))
+# Longest run of ones looked for, about one every 4 KiB of random data.
+MAX_BOUNDARY_RUN = 11
+# Number of bytes before a candidate boundary its hash is computed over.
+WINDOW_SIZE = 64
+
+
+class ContentDefinedChunker(object):
+    """Split a stream into chunks at content-defined boundaries.
+
+    The data is translated to ones and zeros and candidate boundaries are
+    the ends of long runs of ones, which str.find locates without a Python
+    loop over the bytes. A candidate past the minimum chunk size ends the
+    chunk when the CRC of the WINDOW_SIZE bytes before it has its low bits
+    all zero, so an insertion or deletion only changes the chunks around
+    it.
+    """
+
+    def __init__(self, stream, min_size=MIN_CHUNK_SIZE,
+                 avg_size=AVG_CHUNK_SIZE, max_size=MAX_CHUNK_SIZE,
+                 read_size=CHUNK_SIZE):
+        self.stream = stream
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.read_size = read_size
+        # A run of n ones ends at a given byte with a probability of
+        # 2 ** -(n + 1), the mask makes up the rest of the average size.
+        bits = max(avg_size.bit_length() - 1, 1)
+        run = min(bits - 1, MAX_BOUNDARY_RUN)
+        self.run = '\1' * run
+        self.mask = (1 << (bits - run - 1)) - 1
+
+    def _cut_point(self, data):
+        """Length of the chunk at the start of data."""
+        size = min(len(data), self.max_size)
+        if size <= self.min_size:
+            return size
+        # Start a little early so that a run crossing the minimum size is
+        # usually measured from its actual start.
+        offset = max(self.min_size - WINDOW_SIZE, 0)
+        bits = data[offset:size].translate(BOUNDARY_TABLE)
+        position = 0
+        while True:
+            position = bits.find(self.run, position)
+            if position < 0:
+                return size
+            position = bits.find('\0', position + len(self.run))
+            if position < 0:
+                # The run may go on past the window.
+                return size
+            end = offset + position
+            if end <= self.min_size:
+                continue
+            window = data[max(end - WINDOW_SIZE, 0):end]
+            if not zlib.crc32(window) & self.mask:
+                return end
+
+    def __iter__(self):
+        data = ''
+        end_of_file = False
+        while True:
+            # Always look at a full max_size window so the cut point does
+            # not depend on how the stream happened to be read.
+            parts = [data]
+            length = len(data)
+            while not end_of_file and length < self.max_size:
+                part = self.stream.read(self.read_size)
+                if not part:
+                    end_of_file = True
+                    break
+                parts.append(part)
+                length += len(part)
+            data = ''.join(parts)
+            if not data:
+                return
+            cut = self._cut_point(data)
+            yield data[:cut]
+            data = data[cut:]
+
+
+class SwiftDedupStorage(SwiftStorage):
+    """Swift storage keeping each distinct chunk of the backups only once.
+
+    The backup stream is split into content-defined chunks and only the
+    chunks the container does not already hold are uploaded. The object at
+    the backup location is a manifest of the chunks, whose etag is the
+    backup checksum. Chunks are garbage collected by the task manager when
+    no manifest references them anymore; the ones it marked for deletion
+    are uploaded again rather than relied on.
+
+    Encrypted streams never share chunks since every backup is salted
+    differently, so this strategy is only effective with
+    backup_use_openssl_encryption disabled.
+    """
+    __strategy_name__ = 'swiftdedup'
+
+    def save(self, filename, stream):
+        """Persist the chunks of the stream missing from swift.
+
+        The manifest is saved to the location <BACKUP_CONTAINER>/<filename>
+        after all the chunks it lists have been uploaded.
+        """
+        self.connection.put_container(BACKUP_CONTAINER)
+
+        url = self.connection.url
+        location = "%s/%s/%s" % (url, BACKUP_CONTAINER, filename)
+
+        # Index of the chunks already stored, keyed by digest.
+        known_chunks = dedup.stored_chunks(self.connection, BACKUP_CONTAINER)
+        collected_at, unreferenced = dedup.load_unreferenced(
+            self.connection, BACKUP_CONTAINER)
+        known_chunks.difference_update(unreferenced)
+        chunks = self._save_chunks(stream, known_chunks, UPLOAD_CONCURRENCY)
+        if chunks is None:
+            return False, "Error saving data to Swift!", None, location
+
+        manifest = dedup.dump_manifest(chunks)
+        etag = self.connection.put_object(
+            BACKUP_CONTAINER, filename, manifest,
+            content_type=dedup.MANIFEST_CONTENT_TYPE)
+        checksum = hashlib.md5(manifest).hexdigest()
+        if not self._check_segment_etag(etag, checksum):
+            return False, "Error saving data to Swift!", None, location
+        # The marked chunks uploaded again may have been deleted by a
+        # collection pass already under way.
+        revived = set(unreferenced).intersection(
+            digest for digest, size in chunks)
+        if not self._chunks_exist(revived):
+            return False, "Error saving data to Swift!", None, location
+
+        return (True, "Successfully saved data to Swift!", checksum,
+                location)
+
+    def _save_chunks(self, stream, known_chunks, concurrency):
+        """Upload the chunks of the stream that are not in known_chunks.
+
+        Returns the ordered list of (digest, size) chunks of the stream, or
+        None if a chunk failed to upload.
+        """
+        connections = self._connection_pool(concurrency)
+        pool = greenpool.GreenPool(size=concurrency)
+        uploads = []
+        failed = []
+        chunks = []
+        uploaded_bytes = 0
+
+        def _upload(digest, data):
+            if failed:
+                return
+            try:
+                with connections.item() as connection:
+                    etag = connection.put_object(BACKUP_CONTAINER,
+                                                 dedup.chunk_name(digest),
+                                                 data)
+            except Exception:
+                failed.append(digest)
+                raise
+            if not self._check_segment_etag(etag,
+                                            hashlib.md5(data).hexdigest()):
+                failed.append(digest)
+
+        chunker = ContentDefinedChunker(stream, MIN_CHUNK_SIZE,
+                                        AVG_CHUNK_SIZE, MAX_CHUNK_SIZE,
+                                        CHUNK_SIZE)
+        for data in chunker:
+            if failed:
+                break
+            # Let the uploads and the rest of the agent run between chunks.
+            greenthread.sleep(0)
+            digest = hashlib.sha256(data).hexdigest()
+            chunks.append((digest, len(data)))
+            if digest in known_chunks:
+                continue
+            known_chunks.add(digest)
+            uploaded_bytes += len(data)
+            # spawn blocks while all uploaders are busy, which bounds the
+            # number of chunks held in memory.
+            uploads.append(pool.spawn(_upload, digest, data))
+
+        for upload in uploads:
+            upload.wait()
+        if failed:
+            return None
+
+        LOG.info(_("Uploaded %(uploaded)d of %(total)d bytes in "
+                   "%(chunks)d chunks."),
+                 {'uploaded': uploaded_bytes,
+                  'total': sum(size for digest, size in chunks),
+                  'chunks': len(chunks)})
+        return chunks
+
+    def _chunks_exist(self, digests):
+        for digest in digests:
+            try:
+                self.connection.head_object(BACKUP_CONTAINER,
+                                            dedup.chunk_name(digest))
+            except ClientException as e:
+                if e.http_status != 404:
+                    raise
+                LOG.error(_("Backup chunk %s was deleted while saving the "
+                            "backup."), digest)
+                return False
+        return True
+
+    def load(self, location, backup_checksum):
+        """Rebuild the backup stream from the chunks of its manifest."""
+        storage_url, container, filename = self._explodeLocation(location)
+
+        headers, manifest = self.connection.get_object(container, filename)
+
+        if CONF.verify_swift_checksum_on_restore:
+            self._verify_checksum(headers.get('etag', ''), backup_checksum)
+
+        return self._download_chunks(container, dedup.load_manifest(manifest),
+                                     DOWNLOAD_CONCURRENCY)
+
+    def _download_chunks(self, container, chunks, concurrency):
+        """Yield the chunk data in order, fetching ahead concurrently."""
+        connections = self._connection_pool(concurrency)
+        pool = greenpool.GreenPool(size=concurrency)
+        chunks = iter(chunks)
+        pending = collections.deque()
+
+        def _fetch(digest):
+            with connections.item() as connection:
+                headers, body = connection.get_object(
+                    container, dedup.chunk_name(digest))
+            return body
+
+        def _read_ahead():
+            while len(pending) < concurrency:
+                try:
+                    digest, size = next(chunks)
+                except StopIteration:
+                    return
+                pending.append((digest, pool.spawn(_fetch, digest)))
+
+        try:
+            _read_ahead()
+            while pending:
+                digest, download = pending.popleft()
+                _read_ahead()
+                data = download.wait()
+                checksum = hashlib.sha256(data).hexdigest()
+                if checksum != digest:
+                    msg = (_("Backup chunk %(digest)s is corrupted, its "
+                             "checksum is %(checksum)s.") %
+                           {'digest': digest, 'checksum': checksum})
+                    LOG.error(msg)
+                    raise SwiftDownloadIntegrityError(msg)
+                yield data
+        finally:
+            # Stop any read-ahead if the consumer goes away early.
+            for digest, download in pending:
+                download.kill()
+
+    def save_metadata(self, location, metadata={}):
+        """Save metadata to the manifest object."""
+
+        storage_url, container, filename = self._explodeLocation(location)
+
+        # Keep the content type that marks the object as a manifest.
+        headers = {'Content-Type': dedup.MANIFEST_CONTENT_TYPE}
+        for key, value in metadata.iteritems():
+            headers[self._set_attr(key)] = value
+
+        LOG.info(_("Writing metadata: %s"), str(headers))
+        self.connection.post_object(container, filename, headers=headers)
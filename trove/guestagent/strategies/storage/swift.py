@@ -14,8 +14,11 @@
 #    under the License.
 #
 
+import collections
 import hashlib
 
+from eventlet import greenpool
+from eventlet import pools
 from oslo_log import log as logging
 
 from trove.common import cfg
@@ -29,6 +32,10 @@ CONF = cfg.CONF
 CHUNK_SIZE = CONF.backup_chunk_size
 MAX_FILE_SIZE = CONF.backup_segment_max_size
 BACKUP_CONTAINER = CONF.backup_swift_container
+UPLOAD_CONCURRENCY = CONF.backup_upload_concurrency
+UPLOAD_BUFFER_SIZE = CONF.backup_upload_buffer_size
+DOWNLOAD_CONCURRENCY = CONF.backup_download_concurrency
+DOWNLOAD_RANGE_SIZE = CONF.backup_download_range_size
 
 
 class DownloadError(Exception):
@@ -108,32 +115,22 @@ class SwiftStorage(base.Storage):
         # Create the container if it doesn't already exist
         self.connection.put_container(BACKUP_CONTAINER)
 
-        # Swift Checksum is the checksum of the concatenated segment checksums
-        swift_checksum = hashlib.md5()
-
-        # Wrap the output of the backup process to segment it for swift
-        stream_reader = StreamReader(stream, filename)
-
         url = self.connection.url
         # Full location where the backup manifest is stored
         location = "%s/%s/%s" % (url, BACKUP_CONTAINER, filename)
 
-        # Read from the stream and write to the container in swift
-        while not stream_reader.end_of_file:
-            etag = self.connection.put_object(BACKUP_CONTAINER,
-                                              stream_reader.segment,
-                                              stream_reader)
-
-            segment_checksum = stream_reader.segment_checksum.hexdigest()
+        if UPLOAD_CONCURRENCY > 1:
+            segment_checksums, prefix = self._save_segments_parallel(
+                filename, stream, UPLOAD_CONCURRENCY, UPLOAD_BUFFER_SIZE)
+        else:
+            segment_checksums, prefix = self._save_segments(filename, stream)
 
-            # Check each segment MD5 hash against swift etag
-            # Raise an error and mark backup as failed
-            if etag != segment_checksum:
-                LOG.error(_("Error saving data segment to swift. "
-                          "ETAG: %(tag)s Segment MD5: %(checksum)s."),
-                          {'tag': etag, 'checksum': segment_checksum})
-                return False, "Error saving data to Swift!", None, location
+        if segment_checksums is None:
+            return False, "Error saving data to Swift!", None, location
 
+        # Swift Checksum is the checksum of the concatenated segment checksums
+        swift_checksum = hashlib.md5()
+        for segment_checksum in segment_checksums:
             swift_checksum.update(segment_checksum)
 
         # Create the manifest file
@@ -141,7 +138,7 @@ class SwiftStorage(base.Storage):
         # so a partial swift object file can't be downloaded; if the manifest
         # file exists then all segments have been uploaded so the whole backup
         # file can be downloaded.
-        headers = {'X-Object-Manifest': stream_reader.prefix}
+        headers = {'X-Object-Manifest': prefix}
         # The etag returned from the manifest PUT is the checksum of the
         # manifest object (which is empty); this is not the checksum we want
         self.connection.put_object(BACKUP_CONTAINER,
@@ -168,6 +165,103 @@ class SwiftStorage(base.Storage):
         return (True, "Successfully saved data to Swift!",
                 final_swift_checksum, location)
 
+    def _connection_pool(self, size):
+        """Pool of swift connections for concurrent requests."""
+        return pools.Pool(max_size=size,
+                          create=lambda: create_swift_client(self.context))
+
+    def _check_segment_etag(self, etag, segment_checksum):
+        """Check a segment MD5 hash against the etag returned by swift."""
+        if etag != segment_checksum:
+            LOG.error(_("Error saving data segment to swift. "
+                      "ETAG: %(tag)s Segment MD5: %(checksum)s."),
+                      {'tag': etag, 'checksum': segment_checksum})
+            return False
+        return True
+
+    def _save_segments(self, filename, stream):
+        """Stream the segments to swift one at a time.
+
+        Returns the ordered list of segment checksums and the manifest
+        prefix, or None for the checksums if a segment failed to upload.
+        """
+        # Wrap the output of the backup process to segment it for swift
+        stream_reader = StreamReader(stream, filename)
+        segment_checksums = []
+
+        # Read from the stream and write to the container in swift
+        while not stream_reader.end_of_file:
+            etag = self.connection.put_object(BACKUP_CONTAINER,
+                                              stream_reader.segment,
+                                              stream_reader)
+
+            segment_checksum = stream_reader.segment_checksum.hexdigest()
+
+            # Check each segment MD5 hash against swift etag
+            # Raise an error and mark backup as failed
+            if not self._check_segment_etag(etag, segment_checksum):
+                return None, stream_reader.prefix
+
+            segment_checksums.append(segment_checksum)
+
+        return segment_checksums, stream_reader.prefix
+
+    def _save_segments_parallel(self, filename, stream, concurrency,
+                                buffer_size):
+        """Upload up to 'concurrency' segments to swift at the same time.
+
+        Each segment is buffered in memory before it is handed to an
+        uploader, so the segment size is capped to keep all in-flight
+        segments (plus the one being read) within 'buffer_size'.
+        Every uploader gets its own swift connection since a connection
+        can only serve one request at a time.
+        """
+        segment_size = max(min(MAX_FILE_SIZE,
+                               buffer_size // (concurrency + 1)),
+                           CHUNK_SIZE * 2)
+        stream_reader = StreamReader(stream, filename,
+                                     max_file_size=segment_size)
+        connections = self._connection_pool(concurrency)
+        pool = greenpool.GreenPool(size=concurrency)
+        uploads = []
+        failed = []
+
+        def _upload(segment, contents, segment_checksum):
+            if failed:
+                # Another segment already failed; don't waste the bandwidth.
+                return None
+            try:
+                with connections.item() as connection:
+                    etag = connection.put_object(BACKUP_CONTAINER, segment,
+                                                 contents)
+            except Exception:
+                failed.append(segment)
+                raise
+            if not self._check_segment_etag(etag, segment_checksum):
+                failed.append(segment)
+                return None
+            return segment_checksum
+
+        while not stream_reader.end_of_file and not failed:
+            segment = stream_reader.segment
+            chunks = []
+            chunk = stream_reader.read(CHUNK_SIZE)
+            while chunk:
+                chunks.append(chunk)
+                chunk = stream_reader.read(CHUNK_SIZE)
+            segment_checksum = stream_reader.segment_checksum.hexdigest()
+            # spawn blocks while all uploaders are busy, which bounds the
+            # number of segments held in memory.
+            uploads.append(pool.spawn(_upload, segment, ''.join(chunks),
+                                      segment_checksum))
+
+        # Wait for every upload so that no uploader outlives the backup;
+        # errors raised by an uploader are re-raised here.
+        segment_checksums = [upload.wait() for upload in uploads]
+        if failed:
+            return None, stream_reader.prefix
+        return segment_checksums, stream_reader.prefix
+
     def _explodeLocation(self, location):
         storage_url = "/".join(location.split('/')[:-2])
         container = location.split('/')[-2]
@@ -188,6 +282,11 @@ class SwiftStorage(base.Storage):
         """Restore a backup from the input stream to the restore_location."""
         storage_url, container, filename = self._explodeLocation(location)
 
+        if DOWNLOAD_CONCURRENCY > 1:
+            return self._load_segments_parallel(
+                container, filename, backup_checksum,
+                DOWNLOAD_CONCURRENCY, DOWNLOAD_RANGE_SIZE)
+
         headers, info = self.connection.get_object(container, filename,
                                                    resp_chunk_size=CHUNK_SIZE)
 
@@ -196,6 +295,106 @@ class SwiftStorage(base.Storage):
 
         return info
 
+    def _load_segments_parallel(self, container, filename, backup_checksum,
+                                concurrency, range_size):
+        """Download the segments behind a backup manifest concurrently.
+
+        The segments are listed from the manifest prefix and fetched with
+        ranged requests, keeping up to 'concurrency' ranges in flight ahead
+        of the consumer. The data is still returned in order.
+        """
+        headers = self.connection.head_object(container, filename)
+
+        if CONF.verify_swift_checksum_on_restore:
+            self._verify_checksum(headers.get('etag', ''), backup_checksum)
+
+        manifest = headers.get('x-object-manifest')
+        if not manifest:
+            # Not a segmented object; there is nothing to parallelize.
+            headers, info = self.connection.get_object(
+                container, filename, resp_chunk_size=CHUNK_SIZE)
+            return info
+
+        segment_container, prefix = manifest.split('/', 1)
+        # Swift concatenates the segments of a manifest in the same
+        # lexicographical order as the container listing.
+        headers, segments = self.connection.get_container(
+            segment_container, prefix=prefix, full_listing=True)
+
+        if CONF.verify_swift_checksum_on_restore:
+            # The manifest etag is the checksum of the concatenated segment
+            # etags, so this also guarantees the listing is complete.
+            listing_checksum = hashlib.md5()
+            for segment in segments:
+                listing_checksum.update(segment['hash'])
+            self._verify_checksum(listing_checksum.hexdigest(),
+                                  backup_checksum)
+
+        return self._download_segments(segment_container, segments,
+                                       concurrency, range_size)
+
+    def _segment_ranges(self, segments, range_size):
+        """Split the segments into (segment, first, last) byte ranges.
+
+        Empty segments yield a single empty range so their etag is still
+        verified.
+        """
+        for segment in segments:
+            if not segment['bytes']:
+                yield segment, 0, -1
+            for first in range(0, segment['bytes'], range_size):
+                last = min(first + range_size, segment['bytes']) - 1
+                yield segment, first, last
+
+    def _download_segments(self, container, segments, concurrency,
+                           range_size):
+        """Yield the segment data in order, fetching ahead concurrently."""
+        connections = self._connection_pool(concurrency)
+        pool = greenpool.GreenPool(size=concurrency)
+        ranges = self._segment_ranges(segments, range_size)
+        pending = collections.deque()
+
+        def _fetch(name, first, last):
+            with connections.item() as connection:
+                headers, body = connection.get_object(
+                    container, name,
+                    headers={'Range': 'bytes=%d-%d' % (first, last)})
+            return body
+
+        def _read_ahead():
+            while len(pending) < concurrency:
+                try:
+                    segment, first, last = next(ranges)
+                except StopIteration:
+                    return
+                download = None
+                if last >= first:
+                    download = pool.spawn(_fetch, segment['name'],
+                                          first, last)
+                pending.append((segment, last, download))
+
+        segment_checksum = hashlib.md5()
+        try:
+            _read_ahead()
+            while pending:
+                segment, last, download = pending.popleft()
+                _read_ahead()
+                data = download.wait() if download is not None else ''
+                segment_checksum.update(data)
+                if last == segment['bytes'] - 1:
+                    # Check each segment against the etag in the listing
+                    # as soon as all of its ranges have arrived.
+                    self._verify_checksum(segment['hash'],
+                                          segment_checksum.hexdigest())
+                    segment_checksum = hashlib.md5()
+                if data:
+                    yield data
+        finally:
+            # Stop any read-ahead if the consumer goes away early.
+            for segment, last, download in pending:
+                if download is not None:
+                    download.kill()
+
     def _get_attr(self, original):
         """Get a friendly name from an object header key."""
         key = original.replace('-', '_')
@@ -20,6 +20,7 @@ from datetime import datetime
 from datetime import timedelta
 import re
 
+from eventlet import queue
 from novaclient import exceptions as nova_exceptions
 from oslo_config.cfg import NoSuchOptError
 from oslo_log import log as logging
@@ -161,9 +162,11 @@ class SimpleInstance(object):
         self.db_info = db_info
         self.datastore_status = datastore_status
         self.root_pass = root_password
+        self.ds_version = ds_version
         if ds_version is None:
             self.ds_version = (datastore_models.DatastoreVersion.
                                load_by_uuid(self.db_info.datastore_version_id))
+        self.ds = ds
         if ds is None:
             self.ds = (datastore_models.Datastore.
                        load(self.ds_version.datastore_id))
@@ -527,7 +530,8 @@ class BaseInstance(SimpleInstance):
     -----------
     """
 
-    def __init__(self, context, db_info, server, datastore_status):
+    def __init__(self, context, db_info, server, datastore_status,
+                 ds_version=None, ds=None):
         """
         Creates a new initialized representation of an instance composed of its
         state in the database and its state from Nova
@@ -545,7 +549,8 @@ class BaseInstance(SimpleInstance):
         :type server: novaclient.v2.servers.Server
         :typdatastore_statusus: trove.instance.models.InstanceServiceStatus
         """
-        super(BaseInstance, self).__init__(context, db_info, datastore_status)
+        super(BaseInstance, self).__init__(context, db_info, datastore_status,
+                                           ds_version=ds_version, ds=ds)
         self.server = server
         self._guest = None
         self._nova_client = None
@@ -980,9 +985,7 @@ class Instance(BuiltInstance):
             raise exception.BadRequest(_("Instance %s is not a replica"
                                        " source.") % self.id)
         service = InstanceServiceStatus.find_by(instance_id=self.id)
-        last_heartbeat_delta = datetime.utcnow() - service.updated_at
-        agent_expiry_interval = timedelta(seconds=CONF.agent_heartbeat_expiry)
-        if last_heartbeat_delta < agent_expiry_interval:
+        if not service.is_stale():
             raise exception.BadRequest(_("Replica Source %s cannot be ejected"
                                          " as it has a current heartbeat")
                                        % self.id)
@@ -1107,16 +1110,25 @@ class Instance(BuiltInstance):
         self.update_db(configuration_id=configuration.id)
 
     def update_overrides(self, config):
+        self.push_overrides(config.get_configuration_overrides(),
+                            config.does_configuration_need_restart())
+
+    def push_overrides(self, overrides, restart_required):
+        """Push the overrides of a configuration group to the guest.
+
+        The overrides are applied to the running datastore service unless
+        some of them only take effect on restart, in which case the
+        instance is marked with a 'RESTART_REQUIRED' status instead.
+        """
         LOG.debug("Updating or removing overrides for instance %s.", self.id)
 
-        overrides = config.get_configuration_overrides()
         self.guest.update_overrides(overrides)
 
         # Apply the new configuration values dynamically to the running
         # datastore service.
         # Apply overrides only if ALL values can be applied at once or mark
         # the instance with a 'RESTART_REQUIRED' status.
-        if not config.does_configuration_need_restart():
+        if not restart_required:
             self.guest.apply_overrides(overrides)
         else:
             LOG.debug("Configuration overrides has non-dynamic settings and "
@@ -1131,8 +1143,12 @@ class Instance(BuiltInstance):
 
 def create_server_list_matcher(server_list):
     # Returns a method which finds a server from the given list.
+    servers_by_id = {}
+    for server in server_list:
+        servers_by_id.setdefault(server.id, []).append(server)
+
     def find_server(instance_id, server_id):
-        matches = [server for server in server_list if server.id == server_id]
+        matches = servers_by_id.get(server_id, [])
         if len(matches) == 1:
             return matches[0]
         elif len(matches) < 1:
@@ -1162,8 +1178,6 @@ class Instances(object):
 
         if context is None:
             raise TypeError("Argument context not defined.")
-        client = create_nova_client(context)
-        servers = client.servers.list()
 
         if include_clustered:
             db_infos = DBInstance.find_all(tenant_id=context.tenant,
@@ -1178,11 +1192,16 @@ class Instances(object):
                                                   marker=context.marker)
         next_marker = data_view.next_page_marker
 
-        find_server = create_server_list_matcher(servers)
-        for db in db_infos:
+        # Only ask nova for the servers when an instance on this page has
+        # one to look up.
+        servers = None
+        for db in data_view.collection:
             LOG.debug("Checking for db [id=%(db_id)s, "
                       "compute_instance_id=%(instance_id)s].",
                       {'db_id': db.id, 'instance_id': db.compute_instance_id})
+            if servers is None and InstanceTasks.BUILDING != db.task_status:
+                servers = create_nova_client(context).servers.list()
+        find_server = create_server_list_matcher(servers or [])
         ret = Instances._load_servers_status(load_simple_instance, context,
                                              data_view.collection,
                                              find_server)
@@ -1199,36 +1218,34 @@ class Instances(object):
     @staticmethod
     def _load_servers_status(load_instance, context, db_items, find_server):
         ret = []
+        db_items = list(db_items)
+        datastore_statuses = InstanceServiceStatus.find_all_by_instance_ids(
+            [db.id for db in db_items])
         for db in db_items:
             server = None
-            try:
-                # TODO(tim.simpson): Delete when we get notifications working!
-                if InstanceTasks.BUILDING == db.task_status:
-                    db.server_status = "BUILD"
+            # TODO(tim.simpson): Delete when we get notifications working!
+            if InstanceTasks.BUILDING == db.task_status:
+                db.server_status = "BUILD"
+                db.addresses = {}
+            else:
+                try:
+                    server = find_server(db.id, db.compute_instance_id)
+                    db.server_status = server.status
+                    db.addresses = server.addresses
+                except exception.ComputeInstanceNotFound:
+                    db.server_status = "SHUTDOWN"  # Fake it...
                     db.addresses = {}
-                else:
-                    try:
-                        server = find_server(db.id, db.compute_instance_id)
-                        db.server_status = server.status
-                        db.addresses = server.addresses
-                    except exception.ComputeInstanceNotFound:
-                        db.server_status = "SHUTDOWN"  # Fake it...
-                        db.addresses = {}
-                # TODO(tim.simpson): End of hack.
-
-                # volumes = find_volumes(server.id)
-                datastore_status = InstanceServiceStatus.find_by(
-                    instance_id=db.id)
-                if not datastore_status.status:  # This should never happen.
-                    LOG.error(_LE("Server status could not be read for "
-                                  "instance id(%s)."), db.id)
-                    continue
-                LOG.debug("Server api_status(%s).",
-                          datastore_status.status.api_status)
-            except exception.ModelNotFoundError:
+            # TODO(tim.simpson): End of hack.
+
+            # volumes = find_volumes(server.id)
+            datastore_status = datastore_statuses.get(db.id)
+            # This should never happen.
+            if datastore_status is None or not datastore_status.status:
                 LOG.error(_LE("Server status could not be read for "
                               "instance id(%s)."), db.id)
                 continue
+            LOG.debug("Server api_status(%s).",
+                      datastore_status.status.api_status)
             ret.append(load_instance(context, db, datastore_status,
                                      server=server))
         return ret
@@ -1273,6 +1290,52 @@ class DBInstance(dbmodels.DatabaseModelBase):
     task_status = property(get_task_status, set_task_status)
 
 
+class ServiceStatusWatch(object):
+    """Process local channel announcing service status updates.
+
+    A watch is woken as soon as the status of one of its instances is saved
+    in this process, for instance by a conductor heartbeat, so waiters can
+    check the statuses again instead of sleeping through a whole polling
+    interval. Updates saved by other processes are not announced.
+    """
+
+    _watches = set()
+
+    def __init__(self, instance_ids):
+        self.instance_ids = frozenset(instance_ids)
+        self._updates = queue.LightQueue(maxsize=1)
+
+    def __enter__(self):
+        ServiceStatusWatch._watches.add(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        ServiceStatusWatch._watches.discard(self)
+
+    def wait(self, timeout):
+        """Wait up to timeout seconds for an update of a watched status.
+
+        :returns: Whether an update was announced.
+        """
+        try:
+            self._updates.get(timeout=timeout)
+            return True
+        except queue.Empty:
+            return False
+
+    @classmethod
+    def notify(cls, instance_ids):
+        """Wake the watches of any of the given instances."""
+        for watch in list(cls._watches):
+            if watch.instance_ids.isdisjoint(instance_ids):
+                continue
+            try:
+                watch._updates.put_nowait(True)
+            except queue.Full:
+                # Already woken and not yet waited for.
+                pass
+
+
 class InstanceServiceStatus(dbmodels.DatabaseModelBase):
     _data_fields = ['instance_id', 'status_id', 'status_description',
                     'updated_at']
@@ -1310,7 +1373,84 @@ class InstanceServiceStatus(dbmodels.DatabaseModelBase):
 
     def save(self):
         self['updated_at'] = utils.utcnow()
-        return get_db_api().save(self)
+        saved = get_db_api().save(self)
+        ServiceStatusWatch.notify([self.instance_id])
+        return saved
+
+    @staticmethod
+    def heartbeat_expiry():
+        """Time without a heartbeat after which a status is stale.
+
+        Guests whose status does not change only send a heartbeat every
+        agent_heartbeat_keepalive seconds.
+        """
+        return timedelta(seconds=(CONF.agent_heartbeat_keepalive +
+                                  CONF.agent_heartbeat_expiry))
+
+    def is_stale(self):
+        """True if the guest missed its keepalive heartbeats."""
+        return utils.utcnow() - self.updated_at >= self.heartbeat_expiry()
+
+    @classmethod
+    def expire_stale(cls, statuses=None):
+        """Mark the given statuses as unknown where they are stale.
+
+        updated_at is left alone, so the statuses stay stale until the
+        guest sends a heartbeat again.
+
+        :returns: The number of statuses expired.
+        """
+        statuses = statuses or KEEPALIVE_STATUSES
+        unknown = tr_instance.ServiceStatuses.UNKNOWN
+        cutoff = utils.utcnow() - cls.heartbeat_expiry()
+        query = cls.query().filter(
+            cls.status_id.in_([status.code for status in statuses]),
+            cls.updated_at < cutoff)
+        return query.update({'status_id': unknown.code,
+                             'status_description': unknown.description},
+                            synchronize_session=False)
+
+    @classmethod
+    def watch(cls, instance_ids):
+        """Watch for updates of the statuses of the given instances."""
+        return ServiceStatusWatch(instance_ids)
+
+    @classmethod
+    def find_all_by_instance_ids(cls, instance_ids):
+        """Map each of the given instance ids to its service status."""
+        if not instance_ids:
+            return {}
+        statuses = get_db_api().find_all_in(cls, 'instance_id', instance_ids)
+        return dict((status.instance_id, status) for status in statuses)
+
+    @classmethod
+    def update_all(cls, statuses, notify=True):
+        """Save the status of many instances at once.
+
+        :param statuses: Map of instance id to its new ServiceStatus, or to
+                         None to only refresh updated_at.
+        :type statuses: dict
+        :param notify: Whether to wake the watches of the changed statuses;
+                       callers inside a transaction do so once it commits.
+        :returns: Ids of the instances whose status changed.
+        """
+        now = utils.utcnow()
+        changed = [{'instance_id': instance_id,
+                    'status_id': status.code,
+                    'status_description': status.description,
+                    'updated_at': now}
+                   for instance_id, status in statuses.items()
+                   if status is not None]
+        unchanged = [{'instance_id': instance_id, 'updated_at': now}
+                     for instance_id, status in statuses.items()
+                     if status is None]
+        db_api = get_db_api()
+        db_api.update_many(cls, ['instance_id'], changed)
+        db_api.update_many(cls, ['instance_id'], unchanged)
+        changed_ids = [row['instance_id'] for row in changed]
+        if notify:
+            ServiceStatusWatch.notify(changed_ids)
+        return changed_ids
 
     status = property(get_status, set_status)
 
@@ -1323,3 +1463,8 @@ def persisted_models():
 
 
 MYSQL_RESPONSIVE_STATUSES = [tr_instance.ServiceStatuses.RUNNING]
+
+# Statuses guests keep reporting while they are up, which are no longer
+# trusted once their heartbeats stop.
+KEEPALIVE_STATUSES = [tr_instance.ServiceStatuses.RUNNING,
+                      tr_instance.ServiceStatuses.BLOCKED]
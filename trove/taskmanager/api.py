@@ -147,6 +147,14 @@ class API(object):
         cctxt = self.client.prepare(version=self.version_cap)
         cctxt.cast(self.context, "delete_backup", backup_id=backup_id)
 
+    def refresh_configuration(self, configuration_id):
+        LOG.debug("Making async call to refresh configuration group %s on "
+                  "its instances" % configuration_id)
+
+        cctxt = self.client.prepare(version=self.version_cap)
+        cctxt.cast(self.context, "refresh_configuration",
+                   configuration_id=configuration_id)
+
     def create_instance(self, instance_id, name, flavor,
                         image_id, databases, users, datastore_manager,
                         packages, volume_size, backup_id=None,
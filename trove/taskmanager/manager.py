@@ -15,6 +15,9 @@
 
 from sets import Set
 
+from eventlet import event
+from eventlet import greenpool
+from eventlet import semaphore
 from oslo_log import log as logging
 import oslo_messaging as messaging
 from oslo_service import periodic_task
@@ -29,6 +32,7 @@ from trove.common.exception import TroveError
 from trove.common.i18n import _
 import trove.common.rpc.version as rpc_version
 from trove.common.strategies.cluster import strategy
+from trove.db import get_db_api
 import trove.extensions.mgmt.instances.models as mgmtmodels
 from trove.instance.tasks import InstanceTasks
 from trove.taskmanager import models
@@ -256,50 +260,122 @@ class Manager(periodic_task.PeriodicTasks):
                                   availability_zone, root_password, nics,
                                   overrides, slave_of_id, backup_id):
 
+        """Create the replicas of slave_of_id from one shared snapshot.
+
+        The snapshot is taken while the servers and volumes of all the
+        replicas are built, and each replica is prepared from it as soon as
+        its server is up, so the replicas restore it side by side. A replica
+        failing does not stop the others, but if the snapshot or all of the
+        replicas fail, the error is raised.
+        """
         if type(instance_id) in [list]:
             ids = instance_id
             root_passwords = root_password
         else:
             ids = [instance_id]
             root_passwords = [root_password]
-        replica_number = 0
-        replica_backup_id = backup_id
-        replica_backup_created = False
-        replicas = []
-
-        try:
-            for replica_index in range(0, len(ids)):
-                try:
-                    replica_number += 1
-                    LOG.debug("Creating replica %d of %d."
-                              % (replica_number, len(ids)))
-                    instance_tasks = FreshInstanceTasks.load(
-                        context, ids[replica_index])
+        count = len(ids)
+        replicas = [FreshInstanceTasks.load(context, replica_id)
+                    for replica_id in ids]
+        # Sends the snapshot of the first replica and the backup it is
+        # restored from, shared by all the replicas.
+        shared_snapshot = event.Event()
+        # Id of the backup taken for the replicas, deleted once they are
+        # done with it even if the snapshot could not be shared.
+        replica_backup_ids = []
+        # Every snapshot streamed by the source runs its own backup there,
+        # so it streams to a few replicas at a time, each holding its slot
+        # until it is restored.
+        streams = semaphore.Semaphore(
+            max(CONF.replication_stream_max_offers, 1))
+
+        def _take_snapshot():
+            try:
+                snapshot = replicas[0].get_replication_master_snapshot(
+                    context, slave_of_id, flavor, backup_id,
+                    replica_number=1)
+                replica_backup_ids.append(
+                    snapshot['dataset']['snapshot_id'])
+                backup_info = replicas[0].get_backup_info(
+                    snapshot['dataset']['snapshot_id'])
+            except Exception as e:
+                LOG.exception(_("Could not create a replication snapshot "
+                                "of %s.") % slave_of_id)
+                shared_snapshot.send_exception(e)
+            else:
+                if snapshot.get('stream'):
+                    # Held by the first replica until it is restored.
+                    streams.acquire()
+                shared_snapshot.send((snapshot, backup_info))
+
+        def _create_replica(replica_index):
+            replica_number = replica_index + 1
+            instance_tasks = replicas[replica_index]
+            holds_stream = False
+            try:
+                volume_info = instance_tasks.create_instance_resources(
+                    flavor, image_id, datastore_manager, volume_size,
+                    availability_zone, nics)
+                LOG.debug("Replica %(num)d of %(count)d built, waiting for "
+                          "the replication snapshot."
+                          % {'num': replica_number, 'count': count})
+                snapshot, backup_info = shared_snapshot.wait()
+                if replica_number == 1:
+                    holds_stream = bool(snapshot.get('stream'))
+                else:
+                    if snapshot.get('stream'):
+                        streams.acquire()
+                        holds_stream = True
                     snapshot = instance_tasks.get_replication_master_snapshot(
-                        context, slave_of_id, flavor, replica_backup_id,
+                        context, slave_of_id, flavor,
+                        snapshot['dataset']['snapshot_id'],
                         replica_number=replica_number)
-                    replica_backup_id = snapshot['dataset']['snapshot_id']
-                    replica_backup_created = (replica_backup_id is not None)
-                    instance_tasks.create_instance(
-                        flavor, image_id, databases, users, datastore_manager,
-                        packages, volume_size, replica_backup_id,
-                        availability_zone, root_passwords[replica_index],
-                        nics, overrides, None, snapshot)
-                    replicas.append(instance_tasks)
-                except Exception:
-                    # if it's the first replica, then we shouldn't continue
-                    LOG.exception(_(
-                        "Could not create replica %(num)d of %(count)d.")
-                        % {'num': replica_number, 'count': len(ids)})
-                    if replica_number == 1:
-                        raise
-
-            for replica in replicas:
-                replica.wait_for_instance(CONF.restore_usage_timeout, flavor)
-
+                instance_tasks.prepare_instance(
+                    flavor, volume_info, packages, databases, users,
+                    backup_info, root_passwords[replica_index], overrides,
+                    None, snapshot)
+            except Exception as e:
+                LOG.exception(_(
+                    "Could not create replica %(num)d of %(count)d.")
+                    % {'num': replica_number, 'count': count})
+                if not instance_tasks.db_info.task_status.is_error:
+                    instance_tasks.update_db(
+                        task_status=InstanceTasks.BUILDING_ERROR_REPLICA)
+                return e
+            else:
+                instance_tasks.wait_for_instance(CONF.restore_usage_timeout,
+                                                 flavor)
+                return None
+            finally:
+                if replica_number == 1 and not holds_stream:
+                    # It failed before learning if it holds the stream.
+                    try:
+                        holds_stream = bool(
+                            shared_snapshot.wait()[0].get('stream'))
+                    except Exception:
+                        pass
+                if holds_stream:
+                    streams.release()
+
+        pool = greenpool.GreenPool(count + 1)
+        try:
+            pool.spawn_n(_take_snapshot)
+            errors = [error for error in pool.imap(_create_replica,
+                                                   range(count))
+                      if error is not None]
         finally:
-            if replica_backup_created:
-                Backup.delete(context, replica_backup_id)
+            pool.waitall()
+            for replica_backup_id in replica_backup_ids:
+                if replica_backup_id is not None:
+                    Backup.delete(context, replica_backup_id)
+
+        if len(errors) == count:
+            raise errors[0]
+        if errors:
+            LOG.error(_("Created %(created)d of %(count)d replicas of "
+                        "%(source)s.") % {'created': count - len(errors),
+                                          'count': count,
+                                          'source': slave_of_id})
 
     def create_instance(self, context, instance_id, name, flavor,
                         image_id, databases, users, datastore_manager,
@@ -332,6 +408,9 @@ class Manager(periodic_task.PeriodicTasks):
         instance_tasks = models.BuiltInstanceTasks.load(context, instance_id)
         instance_tasks.update_overrides(overrides)
 
+    def refresh_configuration(self, context, configuration_id):
+        models.ConfigurationTasks.refresh_instances(context, configuration_id)
+
     def unassign_configuration(self, context, instance_id, flavor,
                                configuration_id):
         instance_tasks = models.BuiltInstanceTasks.load(context, instance_id)
@@ -360,8 +439,9 @@ class Manager(periodic_task.PeriodicTasks):
             Push this in Instance Tasks to fetch a report/collection
             :param context: currently None as specied in bin script
             """
-            mgmtmodels.publish_exist_events(self.exists_transformer,
-                                            self.admin_context)
+            with get_db_api().session_scope():
+                mgmtmodels.publish_exist_events(self.exists_transformer,
+                                                self.admin_context)
 
     def __getattr__(self, name):
         """
@@ -12,11 +12,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
 import os.path
 import traceback
 
 from cinderclient import exceptions as cinder_exceptions
+from eventlet import greenpool
 from eventlet import greenthread
+from eventlet import pools
 from heatclient import exc as heat_exceptions
 from novaclient import exceptions as nova_exceptions
 from oslo_log import log as logging
@@ -31,6 +34,7 @@ from trove.cluster.models import Cluster
 from trove.cluster.models import DBCluster
 from trove.cluster import tasks
 from trove.common import cfg
+from trove.common import dedup
 from trove.common import exception
 from trove.common.exception import BackupCreationError
 from trove.common.exception import GuestError
@@ -51,6 +55,8 @@ from trove.common.strategies.cluster import strategy
 from trove.common import template
 from trove.common import utils
 from trove.common.utils import try_recover
+from trove.configuration import models as config_models
+from trove.datastore import models as datastore_models
 from trove.extensions.mysql import models as mysql_models
 from trove.extensions.security_group.models import (
     SecurityGroupInstanceAssociation)
@@ -200,62 +206,98 @@ class ClusterTasks(Cluster):
     def get_ip(cls, instance):
         return instance.get_visible_ip_addresses()[0]
 
+    def _call_concurrently(self, func, items, *args):
+        """Call func on each of the items concurrently.
+
+        Meant for instance loads and guest calls which do not depend on
+        each other, so a large cluster is not set up one round trip at a
+        time. At most cluster_guest_call_concurrency calls run at once and
+        all of them run even if some fail.
+
+        :param items: Instances, their guests or their ids.
+        :param args: Sequences of further arguments, passed along with each
+                     item as map() does.
+        :returns: The results of the calls, in the order of the items.
+        :raises: ClusterInstancesOperationError mapping the id of each
+                 item whose call failed to its error.
+        """
+        def _call(item, *item_args):
+            try:
+                return func(item, *item_args), None
+            except Exception as e:
+                LOG.exception(_("Error calling %(func)s on %(item)s.") %
+                              {'func': getattr(func, '__name__', func),
+                               'item': getattr(item, 'id', item)})
+                return None, e
+
+        pool = greenpool.GreenPool(CONF.cluster_guest_call_concurrency)
+        results = []
+        errors = {}
+        for item, (result, error) in zip(items,
+                                         pool.imap(_call, items, *args)):
+            if error is not None:
+                errors[getattr(item, 'id', item)] = error
+            results.append(result)
+        if errors:
+            raise exception.ClusterInstancesOperationError(errors)
+        return results
+
+    def _load_instances(self, context, instance_ids):
+        """Load the given instances concurrently, keeping their order."""
+        return self._call_concurrently(
+            lambda instance_id: inst_models.Instance.load(context,
+                                                          instance_id),
+            instance_ids)
+
     def _all_instances_ready(self, instance_ids, cluster_id,
                              shard_id=None):
+        """Wait for the services of all the instances to be ready.
 
-        def _all_status_ready(ids):
-            LOG.debug("Checking service status of instance ids: %s" % ids)
-            for instance_id in ids:
-                status = InstanceServiceStatus.find_by(
-                    instance_id=instance_id).get_status()
-                if (status == ServiceStatuses.FAILED or
-                   status == ServiceStatuses.FAILED_TIMEOUT_GUESTAGENT):
-                        # if one has failed, no need to continue polling
-                        LOG.debug("Instance %s in %s, exiting polling." % (
-                            instance_id, status))
-                        return True
-                if status != ServiceStatuses.BUILD_PENDING:
-                        # if one is not in a cluster-ready state,
-                        # continue polling
-                        LOG.debug("Instance %s in %s, continue polling." % (
-                            instance_id, status))
-                        return False
-            LOG.debug("Instances are ready, exiting polling for: %s" % ids)
-            return True
-
-        def _instance_ids_with_failures(ids):
-            LOG.debug("Checking for service status failures for "
-                      "instance ids: %s" % ids)
-            failed_instance_ids = []
-            for instance_id in ids:
-                status = InstanceServiceStatus.find_by(
-                    instance_id=instance_id).get_status()
-                if (status == ServiceStatuses.FAILED or
-                   status == ServiceStatuses.FAILED_TIMEOUT_GUESTAGENT):
-                        failed_instance_ids.append(instance_id)
-            return failed_instance_ids
-
-        LOG.debug("Polling until service status is ready for "
+        The statuses of all the instances are read with a single query,
+        repeated with a growing delay until they are all ready or one of them
+        failed. A status update saved in this process, e.g. by the conductor,
+        triggers the next check early.
+        """
+        failed_statuses = [ServiceStatuses.FAILED,
+                           ServiceStatuses.FAILED_TIMEOUT_GUESTAGENT]
+        max_interval = max(USAGE_SLEEP_TIME, CONF.cluster_ready_poll_interval)
+        interval = CONF.cluster_ready_poll_interval
+        deadline = timeutils.utcnow() + datetime.timedelta(
+            seconds=CONF.usage_timeout)
+
+        LOG.debug("Waiting until service status is ready for "
                   "instance ids: %s" % instance_ids)
-        try:
-            utils.poll_until(lambda: instance_ids,
-                             lambda ids: _all_status_ready(ids),
-                             sleep_time=USAGE_SLEEP_TIME,
-                             time_out=CONF.usage_timeout)
-        except PollTimeOut:
-            LOG.exception(_("Timeout for all instance service statuses "
-                            "to become ready."))
-            self.update_statuses_on_failure(cluster_id, shard_id)
-            return False
-
-        failed_ids = _instance_ids_with_failures(instance_ids)
-        if failed_ids:
-            LOG.error(_("Some instances failed to become ready: %s") %
-                      failed_ids)
-            self.update_statuses_on_failure(cluster_id, shard_id)
-            return False
+        with InstanceServiceStatus.watch(instance_ids) as watch:
+            while True:
+                statuses = InstanceServiceStatus.find_all_by_instance_ids(
+                    instance_ids)
+                statuses = dict((instance_id, status.get_status())
+                                for instance_id, status in statuses.items())
+                failed_ids = [instance_id for instance_id in instance_ids
+                              if statuses.get(instance_id) in failed_statuses]
+                if failed_ids:
+                    LOG.error(_("Some instances failed to become ready: %s")
+                              % failed_ids)
+                    self.update_statuses_on_failure(cluster_id, shard_id)
+                    return False
+                pending_ids = [instance_id for instance_id in instance_ids
+                               if statuses.get(instance_id) !=
+                               ServiceStatuses.BUILD_PENDING]
+                if not pending_ids:
+                    LOG.debug("Instances are ready: %s" % instance_ids)
+                    return True
 
-        return True
+                remaining = timeutils.delta_seconds(timeutils.utcnow(),
+                                                    deadline)
+                if remaining <= 0:
+                    LOG.error(_("Timeout for all instance service statuses "
+                                "to become ready, still waiting for: %s")
+                              % pending_ids)
+                    self.update_statuses_on_failure(cluster_id, shard_id)
+                    return False
+                LOG.debug("Instances %s not ready, waiting." % pending_ids)
+                if not watch.wait(min(interval, remaining)):
+                    interval = min(interval * 2, max_interval)
 
     def delete_cluster(self, context, cluster_id):
 
@@ -337,7 +379,20 @@ class FreshInstanceTasks(FreshInstance, NotifyMixin, ConfigurationMixin):
         # It is the caller's responsibility to ensure that
         # FreshInstanceTasks.wait_for_instance is called after
         # create_instance to ensure that the proper usage event gets sent
-
+        volume_info = self.create_instance_resources(
+            flavor, image_id, datastore_manager, volume_size,
+            availability_zone, nics)
+        self.prepare_instance(flavor, volume_info, packages, databases,
+                              users, self.get_backup_info(backup_id),
+                              root_password, overrides, cluster_config,
+                              snapshot)
+
+    def create_instance_resources(self, flavor, image_id, datastore_manager,
+                                  volume_size, availability_zone, nics):
+        """Create the security group, server and volume of the instance.
+
+        :returns: The volume info to prepare the instance with.
+        """
         LOG.info(_("Creating instance %s.") % self.id)
         security_groups = None
 
@@ -389,17 +444,24 @@ class FreshInstanceTasks(FreshInstance, NotifyMixin, ConfigurationMixin):
                 availability_zone,
                 nics,
                 files)
+        return volume_info
 
+    def get_backup_info(self, backup_id):
+        """Look up what the guest needs to restore a backup, if any."""
+        if backup_id is None:
+            return None
+        backup = bkup_models.Backup.get_by_id(self.context, backup_id)
+        return {'id': backup_id,
+                'location': backup.location,
+                'type': backup.backup_type,
+                'checksum': backup.checksum,
+                }
+
+    def prepare_instance(self, flavor, volume_info, packages, databases,
+                         users, backup_info, root_password, overrides,
+                         cluster_config, snapshot=None):
+        """Prepare the guest once create_instance_resources is done."""
         config = self._render_config(flavor)
-
-        backup_info = None
-        if backup_id is not None:
-                backup = bkup_models.Backup.get_by_id(self.context, backup_id)
-                backup_info = {'id': backup_id,
-                               'location': backup.location,
-                               'type': backup.backup_type,
-                               'checksum': backup.checksum,
-                               }
         self._guest_prepare(flavor['ram'], volume_info,
                             packages, databases, users, backup_info,
                             config.config_contents, root_password,
@@ -440,6 +502,10 @@ class FreshInstanceTasks(FreshInstance, NotifyMixin, ConfigurationMixin):
         # First check to see if we need to take a backup
         master = BuiltInstanceTasks.load(context, slave_of_id)
         backup_required = master.backup_required_for_replication()
+        if backup_required and CONF.replication_stream_port:
+            snapshot = self._get_replication_master_stream(master, flavor)
+            if snapshot is not None:
+                return snapshot
         if backup_required:
             # if we aren't passed in a backup id, look it up to possibly do
             # an incremental backup, thus saving time
@@ -531,6 +597,38 @@ class FreshInstanceTasks(FreshInstance, NotifyMixin, ConfigurationMixin):
             # the delete worked, so just log the original problem with create
             self._log_and_raise(e_create, msg_create, err)
 
+    def _get_replication_master_stream(self, master, flavor):
+        """Have the master stream a snapshot straight to this replica.
+
+        Returns None if the master cannot stream snapshots, in which case
+        the replica is seeded from a backup in Swift.
+        """
+        snapshot_info = {
+            'id': None,
+            'instance_id': master.id,
+            'tenant_id': self.tenant_id,
+            'datastore': master.datastore.name,
+            'datastore_version': master.datastore_version.name,
+            'stream': True,
+        }
+        try:
+            snapshot = master.get_replication_snapshot(
+                snapshot_info, flavor=master.flavor_id)
+        except Exception as e:
+            msg = (_("Error streaming a replication snapshot from "
+                     "instance %(source)s to new replica %(replica)s.") %
+                   {'source': master.id, 'replica': self.id})
+            err = inst_models.InstanceTasks.BUILDING_ERROR_REPLICA
+            self._log_and_raise(e, msg, err)
+        if not snapshot.get('stream'):
+            LOG.info(_("Instance %s cannot stream replication snapshots, "
+                       "using a backup instead.") % master.id)
+            return None
+        snapshot.update({
+            'config': self._render_replica_config(flavor).config_contents
+        })
+        return snapshot
+
     def report_root_enabled(self):
         mysql_models.RootHistory.create(self.context, self.id, 'root')
 
@@ -1280,6 +1378,9 @@ class BuiltInstanceTasks(BuiltInstance, NotifyMixin, ConfigurationMixin):
 
 
 class BackupTasks(object):
+    # Number of files deleted between logs of the deletion progress.
+    DELETE_PROGRESS_INTERVAL = 1000
+
     @classmethod
     def _parse_manifest(cls, manifest):
         # manifest is in the format 'container/prefix'
@@ -1294,25 +1395,117 @@ class BackupTasks(object):
         return container, prefix
 
     @classmethod
-    def delete_files_from_swift(cls, context, filename):
+    def _delete_objects(cls, context, container, names, backup=None):
+        """Delete the named objects from the container concurrently.
+
+        Up to backup_delete_concurrency objects are deleted at a time, each
+        worker with its own connection; the swift client retries failed
+        requests with backoff. Objects already gone count as deleted. The
+        progress is logged for the backup, if given.
+        """
+        concurrency = max(CONF.backup_delete_concurrency, 1)
+        connections = pools.Pool(
+            max_size=concurrency,
+            create=lambda: remote.create_swift_client(context))
+        pool = greenpool.GreenPool(size=concurrency)
+        failed = []
+        deleted = []
+
+        def _delete(name):
+            if failed:
+                return
+            LOG.debug("Deleting file: %(cont)s/%(name)s" %
+                      {'cont': container, 'name': name})
+            try:
+                with connections.item() as client:
+                    client.delete_object(container, name)
+            except Exception as e:
+                if not (isinstance(e, ClientException) and
+                        e.http_status == 404):
+                    failed.append(e)
+                    return
+            deleted.append(name)
+            if backup and not len(deleted) % cls.DELETE_PROGRESS_INTERVAL:
+                LOG.info(_("Deleted %(count)d files of backup %(id)s.") %
+                         {'count': len(deleted), 'id': backup.id})
+
+        for name in names:
+            if failed:
+                break
+            pool.spawn_n(_delete, name)
+        pool.waitall()
+        if failed:
+            raise failed[0]
+        return len(deleted)
+
+    @classmethod
+    def _delete_unreferenced_chunks(cls, context, client, container):
+        # Chunks are shared between the deduplicated backups of the
+        # container, so only the ones no manifest references can go. Reading
+        # every manifest is costly, so this is done at most once per
+        # backup_dedup_gc_interval; the chunks of backups deleted meanwhile
+        # are collected by the next pass.
+        collected_at, marked = dedup.load_unreferenced(client, container)
+        now = timeutils.utcnow_ts()
+        if (collected_at is not None and
+                now - collected_at < CONF.backup_dedup_gc_interval):
+            LOG.debug("Chunks in %s were collected recently, not collecting "
+                      "them again yet." % container)
+            return
+        # A running backup may rely on a stored chunk its manifest does not
+        # list yet, if it started before the chunk was marked.
+        running = Backup.running_for_tenant(context.tenant)
+        stored = dedup.list_chunks(client, container)
+        references = dedup.chunk_references(client, container)
+        unreferenced = dict((digest, modified)
+                            for digest, modified in stored.items()
+                            if not references[digest])
+        # Mark the chunks before deleting any, so that backups starting
+        # from now on upload them again if they need them.
+        dedup.save_unreferenced(client, container, now, unreferenced)
+        if running:
+            LOG.debug("Backups are running, not deleting chunks in %s."
+                      % container)
+            return
+        # Only delete the chunks a previous pass marked, unless a new backup
+        # uploaded them again since.
+        cls._delete_objects(context, container,
+                            (dedup.chunk_name(digest)
+                             for digest, modified in unreferenced.items()
+                             if digest in marked and
+                             marked[digest] == modified))
+
+    @classmethod
+    def delete_files_from_swift(cls, context, filename, backup=None):
         container = CONF.backup_swift_container
         client = remote.create_swift_client(context)
         obj = client.head_object(container, filename)
+        if dedup.is_manifest(obj):
+            # Deduplicated backup, delete the manifest first so its chunks
+            # are no longer referenced.
+            LOG.debug("Deleting file: %(cont)s/%(filename)s" %
+                      {'cont': container, 'filename': filename})
+            client.delete_object(container, filename)
+            cls._delete_unreferenced_chunks(context, client, container)
+            return
         manifest = obj.get('x-object-manifest', '')
         cont, prefix = cls._parse_manifest(manifest)
         if all([cont, prefix]):
             # This is a manifest file, first delete all segments.
             LOG.debug("Deleting files with prefix: %(cont)s/%(prefix)s" %
                       {'cont': cont, 'prefix': prefix})
-            # list files from container/prefix specified by manifest
-            headers, segments = client.get_container(cont, prefix=prefix)
+            # list all the files from container/prefix specified by
+            # manifest, beyond the first page of the listing
+            headers, segments = client.get_container(cont, prefix=prefix,
+                                                     full_listing=True)
             LOG.debug(headers)
-            for segment in segments:
-                name = segment.get('name')
-                if name:
-                    LOG.debug("Deleting file: %(cont)s/%(name)s" %
-                              {'cont': cont, 'name': name})
-                    client.delete_object(cont, name)
+            count = cls._delete_objects(
+                context, cont,
+                (segment['name'] for segment in segments
+                 if segment.get('name')),
+                backup)
+            LOG.debug("Deleted %(count)d segments from %(cont)s." %
+                      {'count': count, 'cont': cont})
         # Delete the manifest file
         LOG.debug("Deleting file: %(cont)s/%(filename)s" %
                   {'cont': cont, 'filename': filename})
@@ -1326,7 +1519,10 @@ class BackupTasks(object):
         try:
             filename = backup.filename
             if filename:
-                BackupTasks.delete_files_from_swift(context, filename)
+                backup.state = bkup_models.BackupState.DELETING
+                backup.save()
+                BackupTasks.delete_files_from_swift(context, filename,
+                                                    backup)
         except ValueError:
             backup.delete()
         except ClientException as e:
@@ -1340,11 +1536,93 @@ class BackupTasks(object):
                 backup.save()
                 raise TroveError("Failed to delete swift object for backup %s."
                                  % backup_id)
+        except Exception:
+            LOG.exception(_("Error occurred when deleting backup %s.")
+                          % backup_id)
+            backup.state = bkup_models.BackupState.DELETE_FAILED
+            backup.save()
+            raise
         else:
             backup.delete()
         LOG.info(_("Deleted backup %s successfully.") % backup_id)
 
 
+class ConfigurationTasks(object):
+
+    @staticmethod
+    def _instance_batches(context, group, ds_version, ds):
+        """Yield the instances the group is attached to, a batch at a time.
+
+        Each batch is one query for the instances and one for their
+        service statuses.
+        """
+        query = DBInstance.find_all(tenant_id=group.tenant_id,
+                                    configuration_id=group.id,
+                                    deleted=False)
+        marker = None
+        while True:
+            db_infos, marker = query.paginated_collection(
+                limit=CONF.configuration_update_batch_size, marker=marker)
+            statuses = InstanceServiceStatus.find_all_by_instance_ids(
+                [db_info.id for db_info in db_infos])
+            yield [inst_models.Instance(context, db_info, None,
+                                        statuses.get(db_info.id),
+                                        ds_version=ds_version, ds=ds)
+                   for db_info in db_infos]
+            if marker is None:
+                return
+
+    @classmethod
+    def refresh_instances(cls, context, configuration_id):
+        """Push a configuration group to all the instances it is attached to.
+
+        The guests are updated concurrently by up to
+        configuration_update_concurrency green threads. An instance that
+        fails to update is only logged, so that its task, and whether the
+        user can act on it, is left alone. Returns the ids of the instances
+        that failed.
+        """
+        group = config_models.Configuration.load(context, configuration_id)
+        config = config_models.Configuration(context, configuration_id)
+        overrides = config.get_configuration_overrides()
+        restart_required = config.does_configuration_need_restart()
+        ds_version = datastore_models.DatastoreVersion.load_by_uuid(
+            group.datastore_version_id)
+        ds = datastore_models.Datastore.load(ds_version.datastore_id)
+
+        pool = greenpool.GreenPool(
+            size=max(CONF.configuration_update_concurrency, 1))
+        updated = []
+        failed = []
+
+        def _update(instance):
+            LOG.debug("Applying configuration group %(group)s to instance "
+                      "%(instance)s." % {'group': configuration_id,
+                                         'instance': instance.id})
+            try:
+                instance.push_overrides(overrides, restart_required)
+            except Exception:
+                LOG.exception(_("Failed to apply configuration group "
+                                "%(group)s to instance %(instance)s.") %
+                              {'group': configuration_id,
+                               'instance': instance.id})
+                failed.append(instance.id)
+                return
+            updated.append(instance.id)
+
+        for instances in cls._instance_batches(context, group, ds_version,
+                                               ds):
+            for instance in instances:
+                pool.spawn_n(_update, instance)
+        pool.waitall()
+
+        LOG.info(_("Applied configuration group %(group)s to %(updated)d "
+                   "instances, %(failed)d failed.") %
+                 {'group': configuration_id, 'updated': len(updated),
+                  'failed': len(failed)})
+        return failed
+
+
 class ResizeVolumeAction(object):
     """Performs volume resize action."""
 
@@ -24,3 +24,55 @@ class FakeRateLimitingMiddleware(limits.RateLimitingMiddleware):
 
     def enabled(self):
         return ENABLED
+
+
+class FakeRedis(object):
+    """Local stand-in for the Redis client used by limits.RedisBackend.
+
+    The bucket script is run in Python against an in-memory store.
+    """
+
+    def __init__(self):
+        self.store = {}
+        self.round_trips = 0
+
+    def register_script(self, script):
+        return FakeRedisScript(self)
+
+    def pipeline(self, transaction=True):
+        return FakeRedisPipeline(self)
+
+    def run_script(self, key, now, capacity, request_value):
+        now, capacity, request_value = (float(now), float(capacity),
+                                        float(request_value))
+        level, last = self.store.get(key, (0, now))
+        level, delay = limits.leak_bucket(level, last, now, capacity,
+                                          request_value)
+        self.store[key] = (level, max(now, last))
+        return [repr(level), repr(delay or 0)]
+
+
+class FakeRedisScript(object):
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    def __call__(self, keys=[], args=[], client=None):
+        if client is None:
+            self.redis.round_trips += 1
+            return self.redis.run_script(keys[0], *args)
+        client.commands.append((keys[0], args))
+
+
+class FakeRedisPipeline(object):
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def execute(self):
+        self.redis.round_trips += 1
+        results = [self.redis.run_script(key, *args)
+                   for key, args in self.commands]
+        self.commands = []
+        return results
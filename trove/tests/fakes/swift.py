@@ -92,6 +92,16 @@ class FakeSwiftConnection(object):
     def get_container(self, container, **kwargs):
         LOG.debug("fake get_container(%s)" % container)
         fake_header = None
+        prefix = kwargs.get('prefix')
+        if prefix and any(name.startswith(prefix)
+                          for name in self.container_objects):
+            # list the segments that were uploaded through put_object
+            return fake_header, [
+                {'name': name,
+                 'hash': md5(self.container_objects[name]).hexdigest(),
+                 'bytes': len(self.container_objects[name])}
+                for name in sorted(self.container_objects)
+                if name.startswith(prefix)]
         fake_body = [{'name': 'backup_001'},
                      {'name': 'backup_002'},
                      {'name': 'backup_003'}]
@@ -110,6 +120,8 @@ class FakeSwiftConnection(object):
             # this is included to test bad swift segment etags
             if name.startswith("bad_manifest_etag_"):
                 return {'etag': '"this_is_an_intentional_bad_manifest_etag"'}
+            return {'etag': '"%s"' % checksum.hexdigest(),
+                    'x-object-manifest': self.manifest_prefix}
         else:
             if name in self.container_objects:
                 checksum.update(self.container_objects[name])
@@ -119,11 +131,18 @@ class FakeSwiftConnection(object):
         # Currently a swift HEAD object returns etag with double quotes
         return {'etag': '"%s"' % checksum.hexdigest()}
 
-    def get_object(self, container, name, resp_chunk_size=None):
+    def get_object(self, container, name, resp_chunk_size=None,
+                   headers=None):
         LOG.debug("fake get_object(%(container)s, %(name)s)" %
                   {'container': container, 'name': name})
         if container == 'socket_error_on_get':
             raise socket.error(111, 'ECONNREFUSED')
+        if name in self.container_objects:
+            contents = self.container_objects[name]
+            if headers and 'Range' in headers:
+                first, last = headers['Range'].split('=')[1].split('-')
+                contents = contents[int(first):int(last) + 1]
+            return {'etag': '"%s"' % md5(contents).hexdigest()}, contents
         if 'metadata' in name:
             fake_object_header = None
             metadata = {}
@@ -31,6 +31,7 @@ from trove.limits.service import LimitsController
 from trove.limits import views
 from trove.quota.models import Quota
 from trove.quota.quota import QUOTAS
+from trove.tests.fakes import limits as fake_limits
 from trove.tests.unittests import trove_testtools
 
 TEST_LIMITS = [
@@ -185,6 +186,42 @@ class TestLimiter(limits.Limiter):
     pass
 
 
+class LimitMatcherTest(BaseLimitTestSuite):
+    """
+    Tests for the `limits.LimitMatcher` class.
+    """
+
+    def setUp(self):
+        super(LimitMatcherTest, self).setUp()
+        self.limits = TEST_LIMITS + [
+            Limit("POST", "/instances", "/instances", 5, limits.PER_MINUTE),
+            Limit("GET", "/instances/*", "^/instances/[^/]+$", 5,
+                  limits.PER_MINUTE),
+            Limit("DELETE", "/backups", "^/backups", 5, limits.PER_MINUTE),
+        ]
+        self.matcher = limits.LimitMatcher(self.limits)
+
+    def _naive_match(self, verb, url):
+        return [index for index, limit in enumerate(self.limits)
+                if limit.matches(verb, url)]
+
+    def test_match(self):
+        requests = [("GET", "/delayed"), ("GET", "/delayed/1"),
+                    ("GET", "/instances/1"), ("GET", "/instances/1/users"),
+                    ("POST", "/anything"), ("POST", "/mgmt/instances"),
+                    ("POST", "/instances"), ("PUT", "/anything"),
+                    ("DELETE", "/backups/1"), ("DELETE", "/back"),
+                    ("PATCH", "/anything")]
+        for verb, url in requests:
+            self.assertEqual(self._naive_match(verb, url),
+                             self.matcher.match(verb, url))
+
+    def test_patterns_precompiled(self):
+        with patch.object(limits.re, 'match') as mock_match:
+            self.matcher.match("GET", "/instances/1")
+        self.assertFalse(mock_match.called)
+
+
 class LimitMiddlewareTest(BaseLimitTestSuite):
     """
     Tests for the `limits.RateLimitingMiddleware` class.
@@ -485,6 +522,83 @@ class LimiterTest(BaseLimitTestSuite):
         self.assertEqual(expected, results)
 
 
+class SharedLimiterTest(BaseLimitTestSuite):
+    """
+    Tests for the `limits.SharedLimiter` class and its backends.
+    """
+
+    def setUp(self):
+        super(SharedLimiterTest, self).setUp()
+        time_patcher = patch.object(limits.time, 'time', return_value=0.0)
+        self.mock_time = time_patcher.start()
+        self.addCleanup(time_patcher.stop)
+        self.limiter = limits.SharedLimiter(TEST_LIMITS,
+                                            backend_slots='64')
+
+    def _check(self, num, verb, url, username=None, limiter=None):
+        limiter = limiter or self.limiter
+        return [limiter.check_for_delay(verb, url, username)[0]
+                for x in xrange(num)]
+
+    def test_default_backend(self):
+        self.assertIsInstance(self.limiter.backend,
+                              limits.SharedMemoryBackend)
+        self.assertEqual(64, len(self.limiter.backend._keys))
+
+    def test_delay_PUT_wait(self):
+        expected = [None] * 10 + [6.0]
+        self.assertEqual(expected, self._check(11, "PUT", "/anything"))
+
+        self.mock_time.return_value = 6.0
+        self.assertEqual([None, 6.0], self._check(2, "PUT", "/anything"))
+
+    def test_delay_POST_mgmt(self):
+        self.assertEqual([None] * 3, self._check(3, "POST", "/mgmt"))
+        delay = self.limiter.check_for_delay("POST", "/mgmt")[0]
+        self.assertAlmostEqual(60.0 / 3.0, delay, 4)
+
+    def test_shared_between_workers(self):
+        other = limits.SharedLimiter(TEST_LIMITS)
+        other.backend = self.limiter.backend
+
+        self.assertEqual([None] * 5, self._check(5, "PUT", "/anything"))
+        expected = [None] * 5 + [6.0]
+        self.assertEqual(expected,
+                         self._check(6, "PUT", "/anything", limiter=other))
+
+    def test_multiple_users(self):
+        self.assertEqual([None] * 10 + [6.0],
+                         self._check(11, "PUT", "/anything", "user1"))
+        self.assertEqual([None] * 10,
+                         self._check(10, "PUT", "/anything", "user2"))
+
+    def test_get_limits(self):
+        self._check(5, "PUT", "/anything")
+        put_limit = [limit for limit in self.limiter.get_limits()
+                     if limit['verb'] == 'PUT'][0]
+        self.assertEqual(5, put_limit['remaining'])
+        self.assertEqual(0, put_limit['resetTime'])
+
+    def test_recycle_drained_slots(self):
+        backend = limits.SharedMemoryBackend(slots=2)
+        for user in xrange(10):
+            self.assertEqual([(30.0, None)],
+                             backend.consume([("user%d" % user, 60, 30)],
+                                             float(user * 60)))
+
+    def test_redis_backend(self):
+        redis = fake_limits.FakeRedis()
+        self.limiter.backend = limits.RedisBackend(client=redis)
+
+        # Both POST limits are checked in a single round trip.
+        self.assertEqual([None] * 3, self._check(3, "POST", "/mgmt"))
+        self.assertEqual(3, redis.round_trips)
+        self.assertEqual(2, len(redis.store))
+
+        delay = self.limiter.check_for_delay("POST", "/mgmt")[0]
+        self.assertAlmostEqual(60.0 / 3.0, delay, 4)
+
+
 class WsgiLimiterTest(BaseLimitTestSuite):
     """
     Tests for `limits.WsgiLimiter` class.
@@ -304,6 +304,11 @@ class BackupORMTest(trove_testtools.TestCase):
             self.context, self.instance_id, include_incremental=False)
         self.assertEqual(BACKUP_NAME_4, backup.name)
 
+    def test_get_last_completed_none(self):
+        backup = models.Backup.get_last_completed(
+            self.context, self.instance_id, include_incremental=True)
+        self.assertIsNone(backup)
+
     def test_running(self):
         running = models.Backup.running(instance_id=self.instance_id)
         self.assertTrue(running)
@@ -384,37 +389,59 @@ class PaginationTests(trove_testtools.TestCase):
     def test_pagination_list(self):
         # page one
         backups, marker = models.Backup.list(self.context)
-        self.assertEqual(20, marker)
+        self.assertEqual(backups[-1].id, marker)
         self.assertEqual(20, len(backups))
+        seen = set(backup.id for backup in backups)
         # page two
-        self.context.marker = 20
+        self.context.marker = marker
         backups, marker = models.Backup.list(self.context)
-        self.assertEqual(40, marker)
+        self.assertEqual(backups[-1].id, marker)
         self.assertEqual(20, len(backups))
+        seen.update(backup.id for backup in backups)
         # page three
-        self.context.marker = 40
+        self.context.marker = marker
         backups, marker = models.Backup.list(self.context)
         self.assertIsNone(marker)
         self.assertEqual(10, len(backups))
+        seen.update(backup.id for backup in backups)
+        self.assertEqual(50, len(seen))
 
     def test_pagination_list_for_instance(self):
         # page one
         backups, marker = models.Backup.list_for_instance(self.context,
                                                           self.instance_id)
-        self.assertEqual(20, marker)
+        self.assertEqual(backups[-1].id, marker)
         self.assertEqual(20, len(backups))
         # page two
-        self.context.marker = 20
-        backups, marker = models.Backup.list(self.context)
-        self.assertEqual(40, marker)
+        self.context.marker = marker
+        backups, marker = models.Backup.list_for_instance(self.context,
+                                                          self.instance_id)
+        self.assertEqual(backups[-1].id, marker)
         self.assertEqual(20, len(backups))
         # page three
-        self.context.marker = 40
+        self.context.marker = marker
         backups, marker = models.Backup.list_for_instance(self.context,
                                                           self.instance_id)
         self.assertIsNone(marker)
         self.assertEqual(10, len(backups))
 
+    def test_pagination_ordered_by_updated(self):
+        backups = []
+        marker = None
+        while True:
+            self.context.marker = marker
+            page, marker = models.Backup.list(self.context)
+            backups.extend(page)
+            if not marker:
+                break
+        keys = [(backup.updated, backup.id) for backup in backups]
+        self.assertEqual(sorted(keys, reverse=True), keys)
+
+    def test_pagination_unknown_marker(self):
+        self.context.marker = 'non-existent'
+        self.assertRaises(exception.NotFound, models.Backup.list,
+                          self.context)
+
 
 class OrderingTests(trove_testtools.TestCase):
 
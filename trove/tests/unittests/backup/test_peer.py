@@ -0,0 +1,116 @@
+#    Copyright 2015 Tesora Inc.
+#    All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from eventlet.green import socket as green_socket
+from mock import Mock, patch
+from six import StringIO
+
+from trove.guestagent.backup import peer
+from trove.guestagent.strategies.backup.base import BackupError
+from trove.tests.unittests import trove_testtools
+
+
+class FakeRunner(object):
+
+    data = ''.join(chr(i % 256) for i in range(200000))
+
+    def __init__(self, filename, extra_opts=''):
+        self.stream = StringIO(self.data)
+        self.process = Mock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def read(self, size):
+        return self.stream.read(size)
+
+
+class FailingRunner(FakeRunner):
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        raise BackupError()
+
+
+class PeerStreamTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(PeerStreamTest, self).setUp()
+        for patcher in [patch.object(peer, 'socket', green_socket),
+                        patch.object(peer.netutils, 'get_my_ipv4',
+                                     return_value='127.0.0.1')]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.server = peer.PeerStreamServer(0)
+        # Let the server stop listening once the test is done.
+        self.addCleanup(self.server._offers.clear)
+
+    def _fetch(self, endpoint):
+        return ''.join(peer.PeerStorage(endpoint).load(None, None))
+
+    def test_stream(self):
+        endpoint = self.server.offer(FakeRunner, 'backup')
+        self.assertEqual('FakeRunner', endpoint['type'])
+        self.assertEqual(FakeRunner.data, self._fetch(endpoint))
+        self.assertEqual({}, self.server._offers)
+
+    def test_invalid_key(self):
+        endpoint = self.server.offer(FakeRunner, 'backup')
+        endpoint['key'] = 'x' * len(endpoint['key'])
+        self.assertRaises(peer.PeerStreamError, self._fetch, endpoint)
+        self.assertIn(endpoint['offer'], self.server._offers)
+
+    def test_unknown_offer(self):
+        endpoint = self.server.offer(FakeRunner, 'backup')
+        endpoint['offer'] = 'x' * len(endpoint['offer'])
+        self.assertRaises(peer.PeerStreamError, self._fetch, endpoint)
+
+    def test_stream_is_encrypted(self):
+        connection = Mock()
+        self.server._stream(connection, 'secret', 'challenge', FakeRunner,
+                            'backup', '')
+        sent = ''.join(args[0] for args, kwargs
+                       in connection.sendall.call_args_list)
+        self.assertNotIn(FakeRunner.data[:1000], sent)
+        self.assertNotIn('secret', sent)
+
+    def test_offered_once(self):
+        endpoint = self.server.offer(FakeRunner, 'backup')
+        self._fetch(endpoint)
+        self.assertRaises(peer.PeerStreamError, self._fetch, endpoint)
+
+    def test_backup_failed(self):
+        endpoint = self.server.offer(FailingRunner, 'backup')
+        self.assertRaises(peer.PeerStreamError, self._fetch, endpoint)
+
+
+class ThrottleTest(trove_testtools.TestCase):
+
+    @patch.object(peer, 'time')
+    def test_throttle(self, mock_time):
+        mock_time.time.side_effect = [100.0, 100.5, 103.0]
+        throttle = peer.Throttle(1000)
+        throttle(2000)
+        mock_time.sleep.assert_called_once_with(1.5)
+        throttle(1000)
+        self.assertEqual(1, mock_time.sleep.call_count)
+
+    @patch.object(peer, 'time')
+    def test_unthrottled(self, mock_time):
+        throttle = peer.Throttle(0)
+        throttle(2000)
+        self.assertFalse(mock_time.sleep.called)
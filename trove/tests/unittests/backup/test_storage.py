@@ -13,10 +13,17 @@
 # limitations under the License.
 
 import hashlib
+import os
+from StringIO import StringIO
 
 from mock import Mock, MagicMock, patch
+from swiftclient.client import ClientException
 
 from trove.common.context import TroveContext
+from trove.common import dedup
+from trove.guestagent.strategies.storage import dedup as dedup_storage
+from trove.guestagent.strategies.storage.dedup import ContentDefinedChunker
+from trove.guestagent.strategies.storage.dedup import SwiftDedupStorage
 from trove.guestagent.strategies.storage import swift
 from trove.guestagent.strategies.storage.swift import StreamReader
 from trove.guestagent.strategies.storage.swift \
@@ -130,6 +137,60 @@ class SwiftStorageSaveChecksumTests(trove_testtools.TestCase):
                          "Incorrect swift location was returned.")
 
 
+class SwiftStorageSaveParallelTests(trove_testtools.TestCase):
+    """SwiftStorage.save with several concurrent segment uploaders."""
+
+    def setUp(self):
+        super(SwiftStorageSaveParallelTests, self).setUp()
+        self.context = TroveContext()
+        self.swift_client = FakeSwiftConnection()
+        self.create_swift_client_patch = patch.object(
+            swift, 'create_swift_client',
+            MagicMock(return_value=self.swift_client))
+        self.create_swift_client_patch.start()
+        self.addCleanup(self.create_swift_client_patch.stop)
+        # Small chunks and buffer so the fake backup spans several segments
+        for name, value in (('UPLOAD_CONCURRENCY', 3),
+                            ('UPLOAD_BUFFER_SIZE', 1024),
+                            ('CHUNK_SIZE', 128)):
+            patcher = patch.object(swift, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.storage_strategy = SwiftStorage(self.context)
+
+    def _save(self, backup_id):
+        with MockBackupRunner(filename=backup_id,
+                              user='user',
+                              password='password') as runner:
+            return self.storage_strategy.save(runner.manifest, runner)
+
+    def test_swift_parallel_save(self):
+        success, note, checksum, location = self._save('123')
+
+        self.assertTrue(success, "The backup should have been successful.")
+        self.assertEqual('http://mockswift/v1/database_backups/123.gz.enc',
+                         location)
+        segments = sorted(name for name in self.swift_client.container_objects
+                          if name.startswith('123_'))
+        self.assertTrue(len(segments) > 1,
+                        "The backup should have been split into segments.")
+        self.assertEqual('123_%08d' % (len(segments) - 1), segments[-1])
+        expected = hashlib.md5()
+        for segment in segments:
+            expected.update(hashlib.md5(
+                self.swift_client.container_objects[segment]).hexdigest())
+        self.assertEqual(expected.hexdigest(), checksum)
+
+    def test_swift_parallel_segment_etag_mismatch(self):
+        success, note, checksum, location = self._save('bad_segment_etag_123')
+
+        self.assertFalse(success, "The backup should have failed!")
+        self.assertTrue(note.startswith("Error saving data to Swift!"))
+        self.assertIsNone(checksum)
+        self.assertIsNone(self.swift_client.manifest_name,
+                          "The manifest should not have been written.")
+
+
 class SwiftStorageUtils(trove_testtools.TestCase):
 
     def setUp(self):
@@ -213,6 +274,209 @@ class SwiftStorageLoad(trove_testtools.TestCase):
                           backup_checksum)
 
 
+class SwiftStorageLoadParallelTests(trove_testtools.TestCase):
+    """SwiftStorage.load with concurrent ranged segment downloads."""
+
+    def setUp(self):
+        super(SwiftStorageLoadParallelTests, self).setUp()
+        self.context = TroveContext()
+        self.swift_client = FakeSwiftConnection()
+        self.create_swift_client_patch = patch.object(
+            swift, 'create_swift_client',
+            MagicMock(return_value=self.swift_client))
+        self.create_swift_client_patch.start()
+        self.addCleanup(self.create_swift_client_patch.stop)
+        for name, value in (('UPLOAD_CONCURRENCY', 3),
+                            ('UPLOAD_BUFFER_SIZE', 1024),
+                            ('CHUNK_SIZE', 128),
+                            ('DOWNLOAD_CONCURRENCY', 3),
+                            ('DOWNLOAD_RANGE_SIZE', 100)):
+            patcher = patch.object(swift, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.storage_strategy = SwiftStorage(self.context)
+        with MockBackupRunner(filename='123',
+                              user='user',
+                              password='password') as runner:
+            (success, note, self.checksum,
+             self.location) = self.storage_strategy.save(runner.manifest,
+                                                         runner)
+        self.segments = sorted(self.swift_client.container_objects)
+
+    def test_load_parallel(self):
+        stream = self.storage_strategy.load(self.location, self.checksum)
+
+        expected = ''.join(self.swift_client.container_objects[segment]
+                           for segment in self.segments)
+        self.assertEqual(expected, ''.join(stream))
+
+    def test_load_parallel_checksum_mismatch(self):
+        self.assertRaises(SwiftDownloadIntegrityError,
+                          self.storage_strategy.load,
+                          self.location, 'not-the-backup-checksum')
+
+    def test_load_parallel_segment_etag_mismatch(self):
+        # Corrupt a segment after the manifest and listing were read
+        manifest = self.swift_client.head_object('database_backups',
+                                                 '123.gz.enc')
+        listing = self.swift_client.get_container(
+            'database_backups', prefix='123_')
+        self.swift_client.container_objects[self.segments[1]] = 'corrupted'
+        with patch.multiple(self.swift_client,
+                            head_object=MagicMock(return_value=manifest),
+                            get_container=MagicMock(return_value=listing)):
+            stream = self.storage_strategy.load(self.location, self.checksum)
+            self.assertRaises(SwiftDownloadIntegrityError, list, stream)
+
+
+class ContentDefinedChunkerTests(trove_testtools.TestCase):
+
+    def _chunks(self, data):
+        return list(ContentDefinedChunker(StringIO(data), min_size=256,
+                                          avg_size=1024, max_size=4096,
+                                          read_size=100))
+
+    def test_chunks_rebuild_stream(self):
+        data = os.urandom(64 * 1024)
+        chunks = self._chunks(data)
+        self.assertEqual(data, ''.join(chunks))
+        self.assertTrue(len(chunks) > 1)
+        for chunk in chunks[:-1]:
+            self.assertTrue(256 < len(chunk) <= 4096)
+
+    def test_empty_stream(self):
+        self.assertEqual([], self._chunks(''))
+
+    def test_uniform_stream(self):
+        chunks = self._chunks('\0' * 10000)
+        self.assertEqual('\0' * 10000, ''.join(chunks))
+        for chunk in chunks[:-1]:
+            self.assertTrue(256 < len(chunk) <= 4096)
+
+    def test_insertion_only_changes_nearby_chunks(self):
+        data = os.urandom(64 * 1024)
+        chunks = self._chunks(data)
+        shifted = self._chunks('inserted' + data)
+        self.assertEqual(chunks[-5:], shifted[-5:])
+
+
+class SwiftDedupStorageTests(trove_testtools.TestCase):
+    """SwiftDedupStorage stores each distinct chunk only once."""
+
+    def setUp(self):
+        super(SwiftDedupStorageTests, self).setUp()
+        self.context = TroveContext()
+        self.swift_client = FakeSwiftConnection()
+        self.create_swift_client_patch = patch.object(
+            swift, 'create_swift_client',
+            MagicMock(return_value=self.swift_client))
+        self.create_swift_client_patch.start()
+        self.addCleanup(self.create_swift_client_patch.stop)
+        for name, value in (('UPLOAD_CONCURRENCY', 3),
+                            ('DOWNLOAD_CONCURRENCY', 3),
+                            ('CHUNK_SIZE', 128),
+                            ('MIN_CHUNK_SIZE', 256),
+                            ('AVG_CHUNK_SIZE', 1024),
+                            ('MAX_CHUNK_SIZE', 4096)):
+            patcher = patch.object(dedup_storage, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.unreferenced = {}
+        patcher = patch.object(
+            dedup, 'load_unreferenced',
+            side_effect=lambda client, container: (None, self.unreferenced))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.storage_strategy = SwiftDedupStorage(self.context)
+        self.data = os.urandom(32 * 1024)
+
+    def _chunk_objects(self):
+        return [name for name in self.swift_client.container_objects
+                if name.startswith(dedup.CHUNK_PREFIX)]
+
+    def test_save_and_load(self):
+        success, note, checksum, location = self.storage_strategy.save(
+            '123.xbstream', StringIO(self.data))
+
+        self.assertTrue(success, "The backup should have been successful.")
+        self.assertEqual('http://mockswift/v1/database_backups/123.xbstream',
+                         location)
+        manifest = self.swift_client.container_objects['123.xbstream']
+        self.assertEqual(hashlib.md5(manifest).hexdigest(), checksum)
+        stream = self.storage_strategy.load(location, checksum)
+        self.assertEqual(self.data, ''.join(stream))
+
+    def test_save_uploads_only_new_chunks(self):
+        self.storage_strategy.save('123.xbstream', StringIO(self.data))
+        chunks = set(self._chunk_objects())
+
+        changed = self.data[:-100] + os.urandom(100)
+        success, note, checksum, location = self.storage_strategy.save(
+            '456.xbstream', StringIO(changed))
+
+        self.assertTrue(success, "The backup should have been successful.")
+        # Only the chunks around the change are uploaded again.
+        new_chunks = set(self._chunk_objects()) - chunks
+        self.assertTrue(0 < len(new_chunks) <= 2)
+        stream = self.storage_strategy.load(location, checksum)
+        self.assertEqual(changed, ''.join(stream))
+
+    def test_save_uploads_marked_chunks_again(self):
+        self.storage_strategy.save('123.xbstream', StringIO(self.data))
+        marked = self._chunk_objects()[0]
+        self.unreferenced = {marked[len(dedup.CHUNK_PREFIX):]: 't1'}
+        self.swift_client.put_object = MagicMock(
+            side_effect=self.swift_client.put_object)
+
+        success, note, checksum, location = self.storage_strategy.save(
+            '456.xbstream', StringIO(self.data))
+
+        self.assertTrue(success, "The backup should have been successful.")
+        self.assertEqual(
+            [marked, '456.xbstream'],
+            [args[1] for args, kwargs
+             in self.swift_client.put_object.call_args_list])
+
+    def test_save_marked_chunk_deleted(self):
+        self.storage_strategy.save('123.xbstream', StringIO(self.data))
+        marked = self._chunk_objects()[0]
+        self.unreferenced = {marked[len(dedup.CHUNK_PREFIX):]: 't1'}
+        self.swift_client.head_object = MagicMock(
+            side_effect=ClientException('foo', http_status=404))
+
+        success, note, checksum, location = self.storage_strategy.save(
+            '456.xbstream', StringIO(self.data))
+
+        self.assertFalse(success, "The backup should have failed.")
+
+    def test_load_checksum_mismatch(self):
+        success, note, checksum, location = self.storage_strategy.save(
+            '123.xbstream', StringIO(self.data))
+        self.assertRaises(SwiftDownloadIntegrityError,
+                          self.storage_strategy.load,
+                          location, 'not-the-backup-checksum')
+
+    def test_load_corrupted_chunk(self):
+        success, note, checksum, location = self.storage_strategy.save(
+            '123.xbstream', StringIO(self.data))
+        self.swift_client.container_objects[
+            self._chunk_objects()[0]] = 'corrupted'
+        stream = self.storage_strategy.load(location, checksum)
+        self.assertRaises(SwiftDownloadIntegrityError, list, stream)
+
+    def test_save_metadata_keeps_manifest_type(self):
+        location = 'http://mockswift.com/v1/545433/backups/mybackup.tar'
+        self.swift_client.post_object = Mock()
+
+        self.storage_strategy.save_metadata(location,
+                                            metadata={'lsn': '1234567'})
+
+        self.swift_client.post_object.assert_called_with(
+            'backups', 'mybackup.tar',
+            headers={'X-Object-Meta-lsn': '1234567',
+                     'Content-Type': dedup.MANIFEST_CONTENT_TYPE})
+
+
 class MockBackupStream(MockBackupRunner):
 
     def read(self, chunk_size):
@@ -14,6 +14,7 @@
 #    under the License.
 #
 from mock import Mock
+from mock import patch
 from testtools import ExpectedException
 from trove.common import exception
 from trove.common import utils
@@ -79,3 +80,33 @@ class TestTroveExecuteWithTimeout(trove_testtools.TestCase):
     def test_pagination_limit(self):
         self.assertEqual(5, utils.pagination_limit(5, 9))
         self.assertEqual(5, utils.pagination_limit(9, 5))
+
+
+class TestLRUCache(trove_testtools.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = utils.LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(3, cache.get('c'))
+        self.assertEqual(2, len(cache))
+
+    def test_expires(self):
+        cache = utils.LRUCache(2, ttl=10)
+        with patch.object(utils.time, 'time', return_value=100):
+            cache.set('a', 1)
+        with patch.object(utils.time, 'time', return_value=105):
+            self.assertEqual(1, cache.get('a'))
+        with patch.object(utils.time, 'time', return_value=110):
+            self.assertIsNone(cache.get('a'))
+
+    def test_delete(self):
+        cache = utils.LRUCache(2)
+        cache.set('a', 1)
+        cache.delete('a')
+        cache.delete('missing')
+        self.assertEqual('default', cache.get('a', 'default'))
@@ -12,18 +12,26 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from datetime import timedelta
+
+from mock import patch
+
 from trove.backup import models as bkup_models
 from trove.backup import state
+from trove.common import cfg
 from trove.common import exception as t_exception
 from trove.common.instance import ServiceStatuses
 from trove.common import utils
 from trove.conductor import manager as conductor_manager
+from trove.conductor.models import LastSeen
 from trove.guestagent.common import timeutils
 from trove.instance import models as t_models
 from trove.tests.unittests import trove_testtools
 from trove.tests.unittests.util import util
 
 
+CONF = cfg.CONF
+
 # See LP bug #1255178
 OLD_DBB_SAVE = bkup_models.DBBackup.save
 
@@ -104,6 +112,168 @@ class ConductorMethodTests(trove_testtools.TestCase):
         iss = self._get_iss(iss_id)
         self.assertEqual(ServiceStatuses.BUILDING, iss.status)
 
+    def test_last_seen_cached(self):
+        bkup_id = self._create_backup('cached')
+        now = timeutils.float_utcnow()
+        self.cond_mgr.update_backup(None, self.instance_id, bkup_id,
+                                    sent=now, name='first')
+        with patch.object(LastSeen, 'load') as load:
+            self.cond_mgr.update_backup(None, self.instance_id, bkup_id,
+                                        sent=now + 60, name='second')
+            self.cond_mgr.update_backup(None, self.instance_id, bkup_id,
+                                        sent=now + 30, name='third')
+        self.assertFalse(load.called)
+        self.assertEqual('second', self._get_backup(bkup_id).name)
+        self.assertEqual(now + 60, LastSeen.load(self.instance_id,
+                                                 'update_backup').sent)
+
+    def test_last_seen_newer_in_other_conductor(self):
+        bkup_id = self._create_backup('other')
+        now = timeutils.float_utcnow()
+        self.cond_mgr.update_backup(None, self.instance_id, bkup_id,
+                                    sent=now, name='first')
+        # Another conductor worker accepts a newer message.
+        conductor_manager.Manager().update_backup(
+            None, self.instance_id, bkup_id, sent=now + 60, name='second')
+        self.cond_mgr.update_backup(None, self.instance_id, bkup_id,
+                                    sent=now + 30, name='third')
+        self.assertEqual('second', self._get_backup(bkup_id).name)
+
+    # --- Tests for batched heartbeats ---
+
+    def _batch_heartbeats(self):
+        CONF.set_override('conductor_heartbeat_batch_interval', 5)
+        self.addCleanup(CONF.clear_override,
+                        'conductor_heartbeat_batch_interval')
+        looping_call_patch = patch.object(
+            conductor_manager.loopingcall, 'FixedIntervalLoopingCall')
+        looping_call_patch.start()
+        self.addCleanup(looping_call_patch.stop)
+
+    def test_batched_heartbeat_keeps_newest(self):
+        self._batch_heartbeats()
+        iss_id = self._create_iss()
+        build_p = {'service_status': ServiceStatuses.BUILDING.description}
+        running_p = {'service_status': ServiceStatuses.RUNNING.description}
+        now = timeutils.float_utcnow()
+        self.cond_mgr.heartbeat(None, self.instance_id, build_p, sent=now)
+        self.cond_mgr.heartbeat(None, self.instance_id, running_p,
+                                sent=now - 60)
+        self.assertEqual(ServiceStatuses.NEW, self._get_iss(iss_id).status)
+
+        self.cond_mgr._flush_heartbeats()
+        self.assertEqual(ServiceStatuses.BUILDING,
+                         self._get_iss(iss_id).status)
+        self.assertEqual(now, LastSeen.load(self.instance_id,
+                                            'heartbeat').sent)
+
+    def test_batched_heartbeat_without_status_keeps_status(self):
+        self._batch_heartbeats()
+        iss_id = self._create_iss()
+        build_p = {'service_status': ServiceStatuses.BUILDING.description}
+        now = timeutils.float_utcnow()
+        self.cond_mgr.heartbeat(None, self.instance_id, build_p, sent=now)
+        self.cond_mgr.heartbeat(None, self.instance_id, {}, sent=now + 60)
+        self.cond_mgr._flush_heartbeats()
+        self.assertEqual(ServiceStatuses.BUILDING,
+                         self._get_iss(iss_id).status)
+
+    def test_batched_heartbeat_older_than_last_seen_discarded(self):
+        self._batch_heartbeats()
+        iss_id = self._create_iss()
+        build_p = {'service_status': ServiceStatuses.BUILDING.description}
+        running_p = {'service_status': ServiceStatuses.RUNNING.description}
+        now = timeutils.float_utcnow()
+        self.cond_mgr.heartbeat(None, self.instance_id, build_p, sent=now)
+        self.cond_mgr._flush_heartbeats()
+        self.cond_mgr.heartbeat(None, self.instance_id, running_p,
+                                sent=now - 60)
+        self.cond_mgr._flush_heartbeats()
+        self.assertEqual(ServiceStatuses.BUILDING,
+                         self._get_iss(iss_id).status)
+
+    def test_batched_heartbeat_updates_last_seen(self):
+        self._batch_heartbeats()
+        iss_id = self._create_iss()
+        build_p = {'service_status': ServiceStatuses.BUILDING.description}
+        running_p = {'service_status': ServiceStatuses.RUNNING.description}
+        now = timeutils.float_utcnow()
+        self.cond_mgr.heartbeat(None, self.instance_id, build_p, sent=now)
+        self.cond_mgr._flush_heartbeats()
+        self.cond_mgr.heartbeat(None, self.instance_id, running_p,
+                                sent=now + 60)
+        self.cond_mgr._flush_heartbeats()
+        self.assertEqual(ServiceStatuses.RUNNING,
+                         self._get_iss(iss_id).status)
+        self.assertEqual(now + 60, LastSeen.load(self.instance_id,
+                                                 'heartbeat').sent)
+
+    def test_batched_heartbeat_newer_in_other_conductor(self):
+        self._batch_heartbeats()
+        iss_id = self._create_iss()
+        build_p = {'service_status': ServiceStatuses.BUILDING.description}
+        running_p = {'service_status': ServiceStatuses.RUNNING.description}
+        shutdown_p = {'service_status': ServiceStatuses.SHUTDOWN.description}
+        now = timeutils.float_utcnow()
+        self.cond_mgr.heartbeat(None, self.instance_id, build_p, sent=now)
+        self.cond_mgr._flush_heartbeats()
+        # Another conductor worker saves a newer heartbeat.
+        other_mgr = conductor_manager.Manager()
+        other_mgr.heartbeat(None, self.instance_id, running_p, sent=now + 60)
+        other_mgr._flush_heartbeats()
+        self.cond_mgr.heartbeat(None, self.instance_id, shutdown_p,
+                                sent=now + 30)
+        self.cond_mgr._flush_heartbeats()
+        self.assertEqual(ServiceStatuses.RUNNING,
+                         self._get_iss(iss_id).status)
+        self.assertEqual(now + 60, LastSeen.load(self.instance_id,
+                                                 'heartbeat').sent)
+
+    def test_batched_heartbeat_saved_on_cleanup(self):
+        self._batch_heartbeats()
+        iss_id = self._create_iss()
+        build_p = {'service_status': ServiceStatuses.BUILDING.description}
+        self.cond_mgr.heartbeat(None, self.instance_id, build_p,
+                                sent=timeutils.float_utcnow())
+        heartbeat_flush = self.cond_mgr._heartbeat_flush
+        self.cond_mgr.cleanup()
+        heartbeat_flush.stop.assert_called_once_with()
+        self.assertEqual(ServiceStatuses.BUILDING,
+                         self._get_iss(iss_id).status)
+
+    def test_batched_heartbeat_status_bogus_change(self):
+        self._batch_heartbeats()
+        self.assertRaises(ValueError, self.cond_mgr.heartbeat,
+                          None, self.instance_id,
+                          {'service_status': 'potato salad'})
+
+    def _expire_stale_statuses(self, delay):
+        later = (utils.utcnow() + delay +
+                 t_models.InstanceServiceStatus.heartbeat_expiry())
+        with patch.object(t_models.utils, 'utcnow', return_value=later):
+            self.cond_mgr.expire_stale_statuses(None)
+
+    def test_expire_stale_statuses(self):
+        iss_id = self._create_iss()
+        payload = {'service_status': ServiceStatuses.RUNNING.description}
+        self.cond_mgr.heartbeat(None, self.instance_id, payload)
+        self._expire_stale_statuses(timedelta(seconds=1))
+        iss = self._get_iss(iss_id)
+        self.assertEqual(ServiceStatuses.UNKNOWN, iss.status)
+
+    def test_expire_stale_statuses_within_keepalive(self):
+        iss_id = self._create_iss()
+        payload = {'service_status': ServiceStatuses.RUNNING.description}
+        self.cond_mgr.heartbeat(None, self.instance_id, payload)
+        self._expire_stale_statuses(timedelta(seconds=-1))
+        self.assertEqual(ServiceStatuses.RUNNING,
+                         self._get_iss(iss_id).status)
+
+    def test_expire_stale_statuses_not_running(self):
+        iss_id = self._create_iss()
+        self._expire_stale_statuses(timedelta(seconds=1))
+        self.assertEqual(ServiceStatuses.NEW, self._get_iss(iss_id).status)
+
     # --- Tests for update_backup ---
 
     def test_backup_not_found(self):
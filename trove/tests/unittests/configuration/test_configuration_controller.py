@@ -15,9 +15,12 @@
 #
 import jsonschema
 from mock import MagicMock
+from mock import patch
 
 from trove.common import configurations
+from trove.common.exception import NotFound
 from trove.common.exception import UnprocessableEntity
+from trove.configuration import models
 from trove.configuration.service import ConfigurationsController
 from trove.extensions.mgmt.configuration import service
 from trove.tests.unittests import trove_testtools
@@ -253,3 +256,73 @@ class TestConfigurationsParameterController(trove_testtools.TestCase):
         errors = sorted(validator.iter_errors(body), key=lambda e: e.path)
         error_messages = [error.message for error in errors]
         self.assertIn("'yes' is not of type 'integer'", error_messages)
+
+
+class TestConfigurationValidator(trove_testtools.TestCase):
+    def setUp(self):
+        super(TestConfigurationValidator, self).setUp()
+        self.params = [
+            self._param('max_connections', 'integer', 1, 100),
+            self._param('autocommit', 'boolean'),
+            self._param('innodb_buffer_pool_size', 'integer', 0, 10,
+                        restart_required=True),
+            self._param('old_passwords', 'boolean', deleted=True,
+                        restart_required=True),
+        ]
+        load_parameters = patch.object(
+            models.DatastoreConfigurationParameters, 'load_parameters',
+            return_value=self.params)
+        self.load_parameters = load_parameters.start()
+        self.addCleanup(load_parameters.stop)
+        validators = patch.object(models.DatastoreConfigurationParameters,
+                                  '_validators', None)
+        validators.start()
+        self.addCleanup(validators.stop)
+
+    def _param(self, name, data_type, min_size=None, max_size=None,
+               restart_required=False, deleted=False):
+        param = MagicMock(min_size=min_size, max_size=max_size,
+                          data_type=data_type,
+                          restart_required=restart_required,
+                          deleted=deleted)
+        param.name = name
+        return param
+
+    def test_validate(self):
+        validator = models.DatastoreConfigurationParameters.load_validator(
+            'version-id')
+        validator.validate({'MAX_CONNECTIONS': 100, 'autocommit': True},
+                           MagicMock())
+        self.assertRaises(UnprocessableEntity, validator.validate,
+                          {'max_connections': 101}, MagicMock())
+        self.assertRaises(UnprocessableEntity, validator.validate,
+                          {'old_passwords': True}, MagicMock())
+
+    def test_rule(self):
+        validator = models.DatastoreConfigurationParameters.load_validator(
+            'version-id')
+        self.assertEqual(
+            5, validator.rule('max_connections').convert('5'))
+        self.assertTrue(validator.rule('autocommit').convert('1'))
+        self.assertIsNone(validator.rule('old_passwords'))
+        self.assertIsNotNone(
+            validator.rule('old_passwords', show_deleted=True))
+
+    def test_needs_restart(self):
+        validator = models.DatastoreConfigurationParameters.load_validator(
+            'version-id')
+        self.assertFalse(validator.needs_restart(['max_connections']))
+        self.assertTrue(validator.needs_restart(['max_connections',
+                                                 'innodb_buffer_pool_size']))
+        self.assertTrue(validator.needs_restart(['old_passwords']))
+        self.assertRaises(NotFound, validator.needs_restart, ['unknown'])
+
+    def test_load_validator_cached(self):
+        params = models.DatastoreConfigurationParameters
+        validator = params.load_validator('version-id')
+        self.assertIs(validator, params.load_validator('version-id'))
+        self.assertEqual(1, self.load_parameters.call_count)
+
+        params.invalidate_validator('version-id')
+        self.assertIsNot(validator, params.load_validator('version-id'))
+        self.assertEqual(2, self.load_parameters.call_count)
@@ -12,6 +12,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from mock import patch
+
+from trove.datastore import models as datastore_models
+from trove.datastore.models import Capabilities
+from trove.datastore.models import Capability
 from trove.datastore.models import DatastoreVersion
 from trove.tests.unittests.datastore.base import TestDatastoreBase
 
@@ -47,3 +52,30 @@ class TestDatastoreVersions(TestDatastoreBase):
         self.assertIn(self.cap2.name, self.datastore_version.capabilities)
         self.assertNotIn("non-existent", self.datastore_version.capabilities)
         self.assertIn(self.cap1.name, self.datastore_version.capabilities)
+
+    def test_load_datastore_version_cached(self):
+        with patch.object(datastore_models.DBDatastoreVersion, 'find_by',
+                          wraps=datastore_models.DBDatastoreVersion.find_by
+                          ) as find_by:
+            DatastoreVersion.load_by_uuid(self.test_id)
+            version = DatastoreVersion.load_by_uuid(self.test_id)
+            self.assertEqual(self.ds_version, version.name)
+            self.assertEqual(1, find_by.call_count)
+
+            datastore_models.update_datastore_version(
+                self.ds_name, self.ds_version, "mysql", "new-image", "",
+                True)
+            version = DatastoreVersion.load_by_uuid(self.test_id)
+            self.assertEqual("new-image", version.image_id)
+
+    def test_datastore_version_capabilities_cached(self):
+        def cap1_enabled():
+            for capability in Capabilities.load(self.test_id):
+                if capability.name == self.cap1.name:
+                    return capability.enabled
+
+        self.assertTrue(cap1_enabled())
+        Capability.load(self.capability_name).disable()
+        self.assertFalse(cap1_enabled())
+        Capabilities.load(self.test_id).add(self.cap1, enabled=True)
+        self.assertTrue(cap1_enabled())
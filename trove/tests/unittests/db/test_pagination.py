@@ -0,0 +1,90 @@
+# Copyright 2015 Tesora Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from trove.common.context import TroveContext
+from trove.common import utils
+from trove.configuration.models import Configurations
+from trove.configuration.models import DBConfiguration
+from trove.tests.unittests import trove_testtools
+from trove.tests.unittests.util import util
+
+
+class TestKeysetPagination(trove_testtools.TestCase):
+
+    def setUp(self):
+        util.init_db()
+        super(TestKeysetPagination, self).setUp()
+        self.tenant_id = utils.generate_uuid()
+        # Duplicate names so the id has to break the ties.
+        self.configurations = [
+            DBConfiguration.create(name=name, description='',
+                                   tenant_id=self.tenant_id,
+                                   datastore_version_id='version')
+            for name in ['b', 'a', 'b', 'c', 'a']]
+
+    def tearDown(self):
+        super(TestKeysetPagination, self).tearDown()
+        for configuration in self.configurations:
+            configuration.delete()
+
+    def _pages(self, limit, **kwargs):
+        query = DBConfiguration.find_all(tenant_id=self.tenant_id,
+                                         deleted=False)
+        pages = []
+        marker = None
+        while True:
+            page, marker = query.paginated_collection(limit=limit,
+                                                      marker=marker, **kwargs)
+            pages.append([(row.name, row.id) for row in page])
+            if marker is None:
+                return pages
+
+    def test_paginate_sort_keys(self):
+        pages = self._pages(2, sort_keys=['name'])
+        expected = sorted((row.name, row.id) for row in self.configurations)
+        self.assertEqual([2, 2, 1], [len(page) for page in pages])
+        self.assertEqual(expected, sum(pages, []))
+
+    def test_paginate_sort_keys_desc(self):
+        pages = self._pages(3, sort_keys=['name'], sort_dirs=['desc'])
+        expected = sorted(((row.name, row.id) for row in self.configurations),
+                          reverse=True)
+        self.assertEqual(expected, sum(pages, []))
+
+    def test_paginate_default_order(self):
+        pages = self._pages(2)
+        expected = sorted(row.id for row in self.configurations)
+        self.assertEqual(expected, [row_id for name, row_id in sum(pages, [])])
+
+    def test_paginate_unknown_marker(self):
+        query = DBConfiguration.find_all(tenant_id=self.tenant_id,
+                                         deleted=False)
+        page, marker = query.paginated_collection(limit=2, marker='unknown',
+                                                  sort_keys=['name'])
+        self.assertEqual([], page)
+        self.assertIsNone(marker)
+
+    def test_configurations_listed_by_id(self):
+        pages = []
+        marker = None
+        while True:
+            context = TroveContext(tenant=self.tenant_id, limit=2,
+                                   marker=marker)
+            rows, marker = Configurations.load(context)
+            pages.append([row.id for row in rows])
+            if marker is None:
+                break
+        self.assertEqual([2, 2, 1], [len(ids) for ids in pages])
+        self.assertEqual(sorted(row.id for row in self.configurations),
+                         sum(pages, []))
@@ -0,0 +1,123 @@
+# Copyright 2015 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+import eventlet
+from mock import ANY
+from mock import patch
+
+from trove.common import cfg
+from trove.common import utils
+from trove.configuration.models import DBConfiguration
+from trove.db.sqlalchemy import session
+from trove.tests.unittests import trove_testtools
+from trove.tests.unittests.util import util
+
+CONF = cfg.CONF
+
+
+class TestCreateEngine(trove_testtools.TestCase):
+
+    def _options(self, connection):
+        return {'database': {'connection': connection}}
+
+    @patch.object(session, 'create_engine')
+    def test_pool_options(self, mock_create_engine):
+        session._create_engine(self._options('mysql://user@localhost/trove'))
+        mock_create_engine.assert_called_with(
+            'mysql://user@localhost/trove', pool_recycle=ANY, echo=ANY,
+            pool_size=CONF.database.max_pool_size,
+            max_overflow=CONF.database.max_overflow,
+            pool_timeout=CONF.database.pool_timeout)
+
+    @patch.object(session, 'create_engine')
+    def test_sqlite_not_sized(self, mock_create_engine):
+        session._create_engine(self._options('sqlite:///trove_test.sqlite'))
+        mock_create_engine.assert_called_with(
+            'sqlite:///trove_test.sqlite', pool_recycle=ANY, echo=ANY)
+
+
+class TestSessionScope(trove_testtools.TestCase):
+
+    def setUp(self):
+        util.init_db()
+        super(TestSessionScope, self).setUp()
+        self.tenant_id = utils.generate_uuid()
+
+    def _create(self):
+        return DBConfiguration.create(name='name', description='',
+                                      tenant_id=self.tenant_id,
+                                      datastore_version_id='version')
+
+    def _count(self):
+        return DBConfiguration.find_all(tenant_id=self.tenant_id).count()
+
+    def test_shares_connection(self):
+        with session.session_scope():
+            first = session.get_session().connection()
+            second = session.get_session().connection()
+            self.assertEqual(first.connection, second.connection)
+            with session.session_scope():
+                nested = session.get_session().connection()
+                self.assertEqual(first.connection, nested.connection)
+        self.assertIsNone(session._SCOPE.connection)
+
+    def test_scope_per_green_thread(self):
+        # The thread module is not monkey patched in the unit tests.
+        with session.session_scope():
+            other = eventlet.spawn(getattr, session._SCOPE, 'connection',
+                                   None)
+            self.assertIsNone(other.wait())
+            self.assertIsNotNone(session._SCOPE.connection)
+
+    def test_transactional_commit(self):
+        with session.session_scope(transactional=True):
+            self._create()
+            self._create()
+        self.assertEqual(2, self._count())
+
+    def test_transactional_rollback(self):
+        def _create_and_fail():
+            with session.session_scope(transactional=True):
+                self._create()
+                raise RuntimeError()
+
+        self.assertRaises(RuntimeError, _create_and_fail)
+        self.assertEqual(0, self._count())
+
+    def test_request_scope_is_lazy(self):
+        with session.request_scope():
+            self.assertIsNone(getattr(session._SCOPE, 'connection', None))
+            first = session.get_session().connection()
+            second = session.get_session().connection()
+            self.assertEqual(first.connection, second.connection)
+        self.assertIsNone(session._SCOPE.connection)
+
+    def test_request_scope_release(self):
+        with session.request_scope():
+            session.get_session()
+            first = session._SCOPE.connection
+            session.release_connection()
+            self.assertIsNone(session._SCOPE.connection)
+            self.assertTrue(first.closed)
+            session.get_session()
+            self.assertIsNot(first, session._SCOPE.connection)
+
+    def test_release_keeps_session_scope(self):
+        with session.request_scope():
+            with session.session_scope():
+                connection = session._SCOPE.connection
+                session.release_connection()
+                self.assertIs(connection, session._SCOPE.connection)
+            self.assertIsNone(session._SCOPE.connection)
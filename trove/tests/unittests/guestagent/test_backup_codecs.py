@@ -0,0 +1,156 @@
+# Copyright 2015 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import gzip
+import os
+import StringIO
+
+from mock import patch
+
+from trove.common import utils
+from trove.guestagent.common import backup_codecs
+from trove.guestagent.strategies.backup import base as backupBase
+from trove.guestagent.strategies.backup.mysql_impl import MySqlApp
+from trove.guestagent.strategies.restore import base as restoreBase
+from trove.tests.unittests import trove_testtools
+
+BACKUP_XTRA_CLS = ("trove.guestagent.strategies.backup."
+                   "mysql_impl.InnoBackupEx")
+RESTORE_XTRA_CLS = ("trove.guestagent.strategies.restore."
+                    "mysql_impl.InnoBackupEx")
+CRYPTO_KEY = "default_aes_cbc_key"
+
+
+def _read_all(stream, chunk_size=100):
+    output = []
+    chunk = stream.read(chunk_size)
+    while chunk:
+        output.append(chunk)
+        chunk = stream.read(chunk_size)
+    return ''.join(output)
+
+
+class BackupCodecsTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(BackupCodecsTest, self).setUp()
+        # Compressible data spanning several compression blocks
+        self.data = ''.join(os.urandom(16) * 64 for _ in range(40))
+
+    def _encoders(self):
+        return [backup_codecs.GzipEncoder(level=6, threads=3,
+                                          block_size=4096),
+                backup_codecs.OpenSSLAESEncoder(CRYPTO_KEY)]
+
+    def _decoders(self):
+        return [backup_codecs.OpenSSLAESDecoder(CRYPTO_KEY),
+                backup_codecs.GzipDecoder()]
+
+    def test_gzip_blocks_are_a_gzip_stream(self):
+        encoded = _read_all(backup_codecs.EncodedStream(
+            StringIO.StringIO(self.data),
+            [backup_codecs.GzipEncoder(level=6, threads=3,
+                                       block_size=4096)]))
+        self.assertEqual(self.data,
+                         gzip.GzipFile(fileobj=StringIO.StringIO(encoded))
+                         .read())
+
+    def test_round_trip(self):
+        encoded = _read_all(backup_codecs.EncodedStream(
+            StringIO.StringIO(self.data), self._encoders()))
+        self.assertTrue(encoded.startswith('Salted__'))
+        chunks = [encoded[i:i + 1000] for i in range(0, len(encoded), 1000)]
+        decoded = ''.join(backup_codecs.decode_stream(chunks,
+                                                      self._decoders()))
+        self.assertEqual(self.data, decoded)
+
+    def test_round_trip_empty_stream(self):
+        encoded = _read_all(backup_codecs.EncodedStream(
+            StringIO.StringIO(''), self._encoders()))
+        decoded = ''.join(backup_codecs.decode_stream([encoded],
+                                                      self._decoders()))
+        self.assertEqual('', decoded)
+
+    def test_decrypt_with_wrong_key(self):
+        encoded = _read_all(backup_codecs.EncodedStream(
+            StringIO.StringIO(self.data),
+            [backup_codecs.OpenSSLAESEncoder(CRYPTO_KEY)]))
+        self.assertRaises(
+            backup_codecs.CodecError, list,
+            backup_codecs.decode_stream(
+                [encoded], [backup_codecs.OpenSSLAESDecoder('wrong_key'),
+                            backup_codecs.GzipDecoder()]))
+
+    def test_sha256_digest(self):
+        encoded = _read_all(backup_codecs.EncodedStream(
+            StringIO.StringIO(self.data),
+            [backup_codecs.OpenSSLAESEncoder(CRYPTO_KEY, 'sha256')]))
+        decoded = ''.join(backup_codecs.decode_stream(
+            [encoded], [backup_codecs.OpenSSLAESDecoder(CRYPTO_KEY,
+                                                        'sha256')]))
+        self.assertEqual(self.data, decoded)
+        self.assertRaises(
+            backup_codecs.CodecError, list,
+            backup_codecs.decode_stream(
+                [encoded], [backup_codecs.OpenSSLAESDecoder(CRYPTO_KEY, 'md5'),
+                            backup_codecs.GzipDecoder()]))
+
+    def test_decrypt_unsalted_stream(self):
+        self.assertRaises(
+            backup_codecs.CodecError, list,
+            backup_codecs.decode_stream(
+                ['not an openssl stream'],
+                [backup_codecs.OpenSSLAESDecoder(CRYPTO_KEY)]))
+
+
+class InProcessCodecRunnerTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(InProcessCodecRunnerTest, self).setUp()
+        self.get_auth_pwd_patch = patch.object(
+            MySqlApp, 'get_auth_password', return_value='password')
+        self.get_auth_pwd_patch.start()
+        self.addCleanup(self.get_auth_pwd_patch.stop)
+        self.get_data_dir_patch = patch.object(
+            MySqlApp, 'get_data_dir', return_value='/var/lib/mysql/data')
+        self.get_data_dir_patch.start()
+        self.addCleanup(self.get_data_dir_patch.stop)
+        for runner in (backupBase.BackupRunner, restoreBase.RestoreRunner):
+            for name, value in (('is_zipped', True),
+                                ('is_encrypted', True),
+                                ('inprocess_codecs', True)):
+                patcher = patch.object(runner, name, value)
+                patcher.start()
+                self.addCleanup(patcher.stop)
+
+    def test_backup_command_has_no_pipeline(self):
+        RunnerClass = utils.import_class(BACKUP_XTRA_CLS)
+        bkup = RunnerClass(12345, extra_opts="")
+        self.assertNotIn('|', bkup.command)
+        self.assertNotIn(CRYPTO_KEY, bkup.command)
+        self.assertEqual("12345.xbstream.gz.enc", bkup.manifest)
+        self.assertEqual([backup_codecs.GzipEncoder,
+                          backup_codecs.OpenSSLAESEncoder],
+                         [type(codec) for codec in bkup.codecs])
+
+    def test_restore_command_has_no_pipeline(self):
+        RunnerClass = utils.import_class(RESTORE_XTRA_CLS)
+        restr = RunnerClass(None, restore_location="/var/lib/mysql/data",
+                            location="filename", checksum="md5")
+        self.assertEqual("sudo xbstream -x -C /var/lib/mysql/data",
+                         restr.restore_cmd)
+        self.assertEqual([backup_codecs.OpenSSLAESDecoder,
+                          backup_codecs.GzipDecoder],
+                         [type(codec) for codec in restr.codecs])
@@ -14,6 +14,7 @@
 
 import ConfigParser
 import os
+import socket
 import subprocess
 import tempfile
 import time
@@ -331,20 +332,51 @@ class MySqlAdminTest(testtools.TestCase):
         user.databases = []
         expected = ("SELECT grantee, table_schema FROM "
                     "information_schema.SCHEMA_PRIVILEGES WHERE privilege_type"
-                    " != 'USAGE' GROUP BY grantee, table_schema;")
+                    " != 'USAGE' AND grantee IN (:grantee0) "
+                    "GROUP BY grantee, table_schema;")
 
         with patch.object(dbaas.LocalSqlClient, 'execute',
                           Mock(return_value=db_result)):
             self.mySqlAdmin._associate_dbs(user)
-            args, _ = dbaas.LocalSqlClient.execute.call_args_list[0]
+            args, kwargs = dbaas.LocalSqlClient.execute.call_args_list[0]
 
             self.assertEqual(3, len(user.databases))
             self.assertEqual(expected, args[0].text,
                              "Associate database queries are not the same")
+            self.assertEqual({'grantee0': "'test_user'@'%'"}, kwargs)
 
             self.assertTrue(dbaas.LocalSqlClient.execute.called,
                             "The client object was not called")
 
+    def test__associate_dbs_many_users(self):
+        db_result = [{"grantee": "'test_user'@'%'", "table_schema": "db1"},
+                     {"grantee": "'test_user'@'%'", "table_schema": "db2"},
+                     {"grantee": "'test_user1'@'%'", "table_schema": "db3"}]
+        users = []
+        for name in ["test_user", "test_user1", "test_user2"]:
+            user = MagicMock()
+            user.name = name
+            user.host = "%"
+            user.databases = []
+            users.append(user)
+
+        with patch.object(dbaas.LocalSqlClient, 'execute',
+                          Mock(return_value=db_result)):
+            self.mySqlAdmin._associate_dbs(*users)
+            self.assertEqual(1, dbaas.LocalSqlClient.execute.call_count)
+            args, kwargs = dbaas.LocalSqlClient.execute.call_args
+            self.assertIn("grantee IN (:grantee0, :grantee1, :grantee2)",
+                          args[0].text)
+            self.assertEqual(3, len(kwargs))
+
+        self.assertEqual([2, 1, 0],
+                         [len(mock_user.databases) for mock_user in users])
+
+    def test__associate_dbs_no_users(self):
+        with patch.object(dbaas.LocalSqlClient, 'execute') as mock_execute:
+            self.mySqlAdmin._associate_dbs()
+        self.assertFalse(mock_execute.called)
+
     def test_change_passwords(self):
         user = [{"name": "test_user", "host": "%", "password": "password"}]
         self.mySqlAdmin.change_passwords(user)
@@ -1936,6 +1968,57 @@ class BaseDbStatusTest(testtools.TestCase):
                               rd_instance.ServiceStatuses.BUILD_PENDING,
                               rd_instance.ServiceStatuses.BUILD_PENDING)
 
+    @patch.object(base_datastore_service.time, 'time', return_value=1000.0)
+    def test_set_status_unchanged_skips_heartbeat(self, mock_time):
+        base_db_status = BaseDbStatus()
+        heartbeat = conductor_api.API.return_value.heartbeat
+
+        base_db_status.set_status(rd_instance.ServiceStatuses.RUNNING)
+        base_db_status.set_status(rd_instance.ServiceStatuses.RUNNING)
+        self.assertEqual(1, heartbeat.call_count)
+
+        base_db_status.set_status(rd_instance.ServiceStatuses.SHUTDOWN)
+        self.assertEqual(2, heartbeat.call_count)
+
+        base_db_status.set_status(rd_instance.ServiceStatuses.SHUTDOWN,
+                                  force=True)
+        self.assertEqual(3, heartbeat.call_count)
+
+    @patch.object(base_datastore_service.random, 'uniform', return_value=0.1)
+    @patch.object(base_datastore_service.time, 'time', return_value=1000.0)
+    def test_set_status_unchanged_keepalive(self, mock_time, mock_uniform):
+        base_db_status = BaseDbStatus()
+        heartbeat = conductor_api.API.return_value.heartbeat
+        keepalive = base_datastore_service.CONF.agent_heartbeat_keepalive
+
+        base_db_status.set_status(rd_instance.ServiceStatuses.RUNNING)
+        mock_time.return_value += keepalive * 0.9 - 1
+        base_db_status.set_status(rd_instance.ServiceStatuses.RUNNING)
+        self.assertEqual(1, heartbeat.call_count)
+        mock_time.return_value += 1
+        base_db_status.set_status(rd_instance.ServiceStatuses.RUNNING)
+        self.assertEqual(2, heartbeat.call_count)
+
+    @patch.object(base_datastore_service.time, 'time', return_value=1000.0)
+    def test_set_status_unchanged_after_restart(self, mock_time):
+        base_db_status = BaseDbStatus()
+        heartbeat = conductor_api.API.return_value.heartbeat
+
+        base_db_status.set_status(rd_instance.ServiceStatuses.RUNNING)
+        base_db_status.begin_restart()
+        base_db_status.restart_mode = False
+        base_db_status.set_status(rd_instance.ServiceStatuses.RUNNING)
+        self.assertEqual(2, heartbeat.call_count)
+
+        with patch.object(base_db_status, '_get_actual_db_status',
+                          return_value=rd_instance.ServiceStatuses.RUNNING):
+            with patch.object(base_datastore_service.time, 'sleep'):
+                base_db_status.wait_for_real_status_to_change_to(
+                    rd_instance.ServiceStatuses.RUNNING, 10)
+        base_db_status.set_status(rd_instance.ServiceStatuses.RUNNING)
+        base_db_status.set_status(rd_instance.ServiceStatuses.RUNNING)
+        self.assertEqual(3, heartbeat.call_count)
+
     def test_wait_for_database_service_status(self):
         status = BaseDbStatus()
         expected_status = rd_instance.ServiceStatuses.RUNNING
@@ -2124,6 +2207,11 @@ class MySqlAppStatusTest(testtools.TestCase):
         InstanceServiceStatus.create(instance_id=self.FAKE_ID,
                                      status=rd_instance.ServiceStatuses.NEW)
         dbaas.CONF.guest_id = self.FAKE_ID
+        # Exercise the status commands, the ping is tested on its own.
+        patcher_ping = patch.object(dbaas_base.BaseMySqlAppStatus, '_ping',
+                                    side_effect=Exception("No server."))
+        self.mock_ping = patcher_ping.start()
+        self.addCleanup(patcher_ping.stop)
 
     def tearDown(self):
         super(MySqlAppStatusTest, self).tearDown()
@@ -2178,6 +2266,43 @@ class MySqlAppStatusTest(testtools.TestCase):
 
         self.assertEqual(rd_instance.ServiceStatuses.BLOCKED, status)
 
+    @patch.object(utils, 'execute_with_timeout')
+    def test_get_actual_db_status_pinged(self, mock_execute):
+        self.mock_ping.side_effect = None
+        self.mock_ping.return_value = True
+
+        self.mySqlAppStatus = MySqlAppStatus.get()
+        status = self.mySqlAppStatus._get_actual_db_status()
+
+        self.assertEqual(rd_instance.ServiceStatuses.RUNNING, status)
+        self.assertFalse(mock_execute.called)
+
+
+class MySqlAppStatusPingTest(testtools.TestCase):
+
+    def setUp(self):
+        super(MySqlAppStatusPingTest, self).setUp()
+        dbaas_base.PING_ENGINE = None
+        self.addCleanup(setattr, dbaas_base, 'PING_ENGINE', None)
+
+    @patch.object(dbaas_base.BaseMySqlApp, 'get_auth_password',
+                  return_value='some_password')
+    @patch.object(dbaas_base.sqlalchemy, 'create_engine')
+    def test_ping_engine_reused(self, mock_create_engine, mock_auth_pwd):
+        engine = mock_create_engine.return_value
+
+        status = MySqlAppStatus.get()
+        self.assertTrue(status._ping())
+        self.assertTrue(status._ping())
+        self.assertEqual(1, mock_create_engine.call_count)
+        self.assertEqual(2, engine.connect.return_value.close.call_count)
+
+        engine.connect.side_effect = sqlalchemy.exc.OperationalError(
+            'SELECT 1', {}, 'Access denied')
+        self.assertRaises(sqlalchemy.exc.OperationalError, status._ping)
+        self.assertIsNone(dbaas_base.PING_ENGINE)
+        self.assertTrue(engine.dispose.called)
+
 
 class TestRedisApp(testtools.TestCase):
 
@@ -2569,6 +2694,23 @@ class CassandraDBAppTest(testtools.TestCase):
         # really delete the temporary_config_file
         os.unlink(temp_config_name)
 
+    @patch.object(cass_service.utils, 'execute_with_timeout')
+    @patch.object(cass_service.socket, 'create_connection')
+    def test_status_pinged(self, mock_connect, mock_execute):
+        status = cass_service.CassandraAppStatus()._get_actual_db_status()
+        self.assertEqual(rd_instance.ServiceStatuses.RUNNING, status)
+        self.assertTrue(mock_connect.return_value.close.called)
+        self.assertFalse(mock_execute.called)
+
+    @patch.object(cass_service.utils, 'execute_with_timeout',
+                  return_value=('', 'Connection error. Could not connect to'))
+    @patch.object(cass_service.socket, 'create_connection',
+                  side_effect=socket.error("Connection refused"))
+    def test_status_ping_failed(self, mock_connect, mock_execute):
+        status = cass_service.CassandraAppStatus()._get_actual_db_status()
+        self.assertEqual(rd_instance.ServiceStatuses.SHUTDOWN, status)
+        self.assertTrue(mock_execute.called)
+
 
 class CouchbaseAppTest(testtools.TestCase):
 
@@ -0,0 +1,164 @@
+# Copyright 2015 Tesora Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import stat
+import tempfile
+import threading
+
+from mock import Mock, patch
+
+from trove.common import exception
+from trove.guestagent.common import operating_system
+from trove.guestagent.common.operating_system import FileMode
+from trove.guestagent.common import root_helper
+from trove.tests.unittests import trove_testtools
+
+
+class TestRootHelperOperations(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(TestRootHelperOperations, self).setUp()
+        self.root_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.root_dir, 'file')
+
+    def tearDown(self):
+        super(TestRootHelperOperations, self).tearDown()
+        shutil.rmtree(self.root_dir, ignore_errors=True)
+
+    def _run(self, *operations):
+        return root_helper.run_operations(
+            [[name, args, kwargs] for name, args, kwargs in operations])
+
+    def test_write_read_stat(self):
+        response = self._run(
+            ('write_file', [self.path, 'ZGF0YQ=='], {}),
+            ('read_file', [self.path], {}),
+            ('stat', [self.path], {}))
+        self.assertNotIn('error', response)
+        self.assertEqual('ZGF0YQ==', response['results'][1])
+        self.assertEqual(4, response['results'][2]['size'])
+
+    def test_chmod(self):
+        root_helper.write_file(self.path, '')
+        root_helper.chmod(self.path, 0o600, None, None)
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(self.path).st_mode))
+        root_helper.chmod(self.path, None, 0o044, None)
+        self.assertEqual(0o644, stat.S_IMODE(os.stat(self.path).st_mode))
+        root_helper.chmod(self.path, None, None, 0o004)
+        self.assertEqual(0o640, stat.S_IMODE(os.stat(self.path).st_mode))
+
+    def test_create_move_remove(self):
+        directory = os.path.join(self.root_dir, 'a', 'b')
+        root_helper.create_directory(directory)
+        root_helper.create_directory(directory)
+        self.assertTrue(os.path.isdir(directory))
+        moved = os.path.join(self.root_dir, 'moved')
+        root_helper.move(directory, moved)
+        self.assertTrue(os.path.isdir(moved))
+        root_helper.remove(os.path.join(self.root_dir, 'a'))
+        root_helper.remove(os.path.join(self.root_dir, 'a'), force=True)
+        self.assertEqual(['moved'], os.listdir(self.root_dir))
+
+    def test_run_stops_at_first_error(self):
+        response = self._run(
+            ('create_directory', [os.path.join(self.root_dir, 'a')], {}),
+            ('remove', [os.path.join(self.root_dir, 'missing')], {}),
+            ('create_directory', [os.path.join(self.root_dir, 'b')], {}))
+        self.assertEqual(1, response['error']['index'])
+        self.assertEqual('remove', response['error']['operation'])
+        self.assertEqual(['a'], os.listdir(self.root_dir))
+
+
+class TestRootHelperClient(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(TestRootHelperClient, self).setUp()
+        self.root_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.root_dir, 'file')
+        socket_path = os.path.join(self.root_dir, 'run', 'helper.sock')
+        self.server = root_helper.RootHelperServer(socket_path, os.getuid())
+        self.thread = threading.Thread(target=self.server.serve)
+        self.thread.daemon = True
+        self.thread.start()
+        self.client = root_helper.RootHelperClient(socket_path)
+        self.client.start()
+
+    def tearDown(self):
+        super(TestRootHelperClient, self).tearDown()
+        self.server.shutdown()
+        self.thread.join()
+        shutil.rmtree(self.root_dir, ignore_errors=True)
+
+    def test_write_read(self):
+        self.client.write_file(self.path, 'data\x00')
+        self.assertEqual('data\x00', self.client.read_file(self.path))
+
+    def test_error(self):
+        self.assertRaises(exception.ProcessExecutionError,
+                          self.client.read_file,
+                          os.path.join(self.root_dir, 'missing'))
+
+    def test_batch(self):
+        with patch.object(self.client, 'run',
+                          side_effect=self.client.run) as run:
+            with self.client.batch():
+                self.client.write_file(self.path, 'data')
+                self.client.call('chmod', self.path, 0o600, None, None)
+                self.assertFalse(run.called)
+                self.assertEqual('data', self.client.read_file(self.path))
+                self.client.call('remove', self.path)
+            self.assertEqual(2, run.call_count)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_batch_error_on_exit(self):
+        def _batch():
+            with self.client.batch():
+                self.client.call('remove', self.path)
+        self.assertRaises(exception.ProcessExecutionError, _batch)
+
+
+class TestOperatingSystemRootHelper(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(TestOperatingSystemRootHelper, self).setUp()
+        self.helper = Mock()
+        patcher = patch.object(root_helper, 'get_client',
+                               return_value=self.helper)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_chown(self):
+        operating_system.chown('/path', 'user', 'group', as_root=True)
+        self.helper.call.assert_called_once_with(
+            'chown', '/path', 'user', 'group', recursive=True, force=False)
+
+    def test_chmod(self):
+        operating_system.chmod('/path', FileMode.ADD_READ_ALL,
+                               recursive=False, as_root=True)
+        self.helper.call.assert_called_once_with(
+            'chmod', '/path', None, 0o444, None, recursive=False,
+            force=False)
+
+    @patch.object(operating_system, '_execute_shell_cmd')
+    def test_not_as_root(self, execute_mock):
+        operating_system.remove('/path', as_root=False)
+        self.assertFalse(self.helper.call.called)
+        self.assertTrue(execute_mock.called)
+
+    def test_write_file(self):
+        operating_system.write_file('/path', 'data', as_root=True)
+        self.helper.write_file.assert_called_once_with('/path', 'data')
@@ -291,3 +291,103 @@ class TestReplication(trove_testtools.TestCase):
                           None, 'name', 2, "UUID", [], [], None,
                           self.datastore_version, 1,
                           None, slave_of_id=self.replica_info.id)
+
+
+class ServerListMatcherTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(ServerListMatcherTest, self).setUp()
+        self.servers = [Mock(id='server-1'), Mock(id='server-2'),
+                        Mock(id='dup'), Mock(id='dup')]
+        self.find_server = models.create_server_list_matcher(self.servers)
+
+    def test_find_server(self):
+        self.assertEqual(self.servers[1],
+                         self.find_server('instance', 'server-2'))
+
+    def test_find_server_not_found(self):
+        self.assertRaises(exception.ComputeInstanceNotFound,
+                          self.find_server, 'instance', 'missing')
+
+    def test_find_server_found_twice(self):
+        self.assertRaises(exception.TroveError,
+                          self.find_server, 'instance', 'dup')
+
+
+class LoadServersStatusTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        util.init_db()
+        super(LoadServersStatusTest, self).setUp()
+        self.db_items = [
+            Mock(id=str(uuid.uuid4()), compute_instance_id='server-1',
+                 task_status=InstanceTasks.NONE),
+            Mock(id=str(uuid.uuid4()), compute_instance_id='server-2',
+                 task_status=InstanceTasks.BUILDING),
+            Mock(id=str(uuid.uuid4()), compute_instance_id='missing',
+                 task_status=InstanceTasks.NONE)]
+        self.statuses = [
+            InstanceServiceStatus.create(instance_id=db.id,
+                                         status=ServiceStatuses.RUNNING)
+            for db in self.db_items[:2]]
+        self.find_server = models.create_server_list_matcher(
+            [Mock(id='server-1', status='ACTIVE', addresses={})])
+
+    def tearDown(self):
+        super(LoadServersStatusTest, self).tearDown()
+        for status in self.statuses:
+            status.delete()
+
+    def test_load_servers_status(self):
+        with patch.object(InstanceServiceStatus, 'find_by') as find_by:
+            loaded = models.Instances._load_servers_status(
+                lambda context, db, status, server: (db, status, server),
+                None, self.db_items, self.find_server)
+
+        self.assertFalse(find_by.called)
+        self.assertEqual([self.db_items[0], self.db_items[1]],
+                         [db for db, status, server in loaded])
+        self.assertEqual([ServiceStatuses.RUNNING, ServiceStatuses.RUNNING],
+                         [status.status for db, status, server in loaded])
+        self.assertEqual('ACTIVE', self.db_items[0].server_status)
+        self.assertEqual('BUILD', self.db_items[1].server_status)
+        self.assertIsNone(loaded[1][2])
+
+
+class ServiceStatusWatchTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        util.init_db()
+        super(ServiceStatusWatchTest, self).setUp()
+        self.status = InstanceServiceStatus.create(
+            instance_id=str(uuid.uuid4()), status=ServiceStatuses.BUILDING)
+
+    def tearDown(self):
+        super(ServiceStatusWatchTest, self).tearDown()
+        self.status.delete()
+
+    def test_save_wakes_watch(self):
+        with InstanceServiceStatus.watch([self.status.instance_id]) as watch:
+            self.status.set_status(ServiceStatuses.BUILD_PENDING)
+            self.status.save()
+            self.assertTrue(watch.wait(0))
+            self.assertFalse(watch.wait(0))
+
+    def test_update_all_wakes_watch(self):
+        with InstanceServiceStatus.watch([self.status.instance_id]) as watch:
+            InstanceServiceStatus.update_all({self.status.instance_id: None})
+            self.assertFalse(watch.wait(0))
+            InstanceServiceStatus.update_all(
+                {self.status.instance_id: ServiceStatuses.BUILD_PENDING})
+            self.assertTrue(watch.wait(0))
+
+    def test_other_instances_do_not_wake_watch(self):
+        with InstanceServiceStatus.watch(['other']) as watch:
+            self.status.save()
+            self.assertFalse(watch.wait(0))
+
+    def test_closed_watch_is_not_notified(self):
+        with InstanceServiceStatus.watch([self.status.instance_id]) as watch:
+            pass
+        self.status.save()
+        self.assertFalse(watch.wait(0))
@@ -128,13 +128,33 @@ class TestNotificationTransformer(MockMgmtInstanceTest):
         payloads = mgmtmodels.NotificationTransformer(
             context=self.context)()
         self.assertIsNotNone(payloads)
-        payload = payloads[0]
+        payload = [message for message in payloads
+                   if message['instance_id'] == instance.id][0]
         self.assertThat(payload['audit_period_beginning'],
                         Not(Is(None)))
         self.assertThat(payload['audit_period_ending'], Not(Is(None)))
         self.assertTrue(status.lower() in [db['state'] for db in payloads])
         self.addCleanup(self.do_cleanup, instance, service_status)
 
+    def test_transformer_batches(self):
+        CONF.set_override('exists_notification_batch_size', 1)
+        self.addCleanup(CONF.clear_override, 'exists_notification_batch_size')
+        status = rd_instance.ServiceStatuses.BUILDING.api_status
+        instance, service_status = self.build_db_instance(
+            status, InstanceTasks.BUILDING)
+        self.addCleanup(self.do_cleanup, instance, service_status)
+        instance2, service_status2 = self.build_db_instance(
+            status, InstanceTasks.BUILDING)
+        self.addCleanup(self.do_cleanup, instance2, service_status2)
+
+        batches = list(mgmtmodels.NotificationTransformer(
+            context=self.context).batches())
+        self.assertTrue(all(len(batch) <= 1 for batch in batches))
+        instance_ids = [message['instance_id']
+                        for batch in batches for message in batch]
+        self.assertIn(instance.id, instance_ids)
+        self.assertIn(instance2.id, instance_ids)
+
     def test_get_service_id(self):
         id_map = {
             'mysql': '123',
@@ -160,6 +180,11 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
     def setUpClass(cls):
         super(TestNovaNotificationTransformer, cls).setUpClass()
 
+    def _payload(self, payloads, instance):
+        # Instances left by other tests may be reported as well.
+        return [payload for payload in payloads
+                if payload['instance_id'] == instance.id][0]
+
     def test_transformer_cache(self):
         flavor = MagicMock(spec=Flavor)
         flavor.name = 'db.small'
@@ -191,22 +216,20 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
         flavor.name = 'db.small'
 
         server = MagicMock(spec=Server)
+        server.id = 'compute_id_1'
         server.user_id = 'test_user_id'
+        server.status = 'ACTIVE'
         transformer = mgmtmodels.NovaNotificationTransformer(
             context=self.context)
-        mgmt_instance = mgmtmodels.SimpleMgmtInstance(self.context,
-                                                      instance,
-                                                      server,
-                                                      service_status)
 
-        with patch.object(mgmtmodels, 'load_mgmt_instances',
-                          return_value=[mgmt_instance]):
+        with patch.object(self.server_mgr, 'list',
+                          side_effect=[[server], []]):
             with patch.object(self.flavor_mgr, 'get', return_value=flavor):
 
                 payloads = transformer()
 
                 self.assertIsNotNone(payloads)
-                payload = payloads[0]
+                payload = self._payload(payloads, instance)
                 self.assertThat(payload['audit_period_beginning'],
                                 Not(Is(None)))
                 self.assertThat(payload['audit_period_ending'],
@@ -228,25 +251,23 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
             id=instance.datastore_version_id)
         version.update(manager='something invalid')
         server = MagicMock(spec=Server)
+        server.id = 'compute_id_1'
         server.user_id = 'test_user_id'
+        server.status = 'ACTIVE'
 
         flavor = MagicMock(spec=Flavor)
         flavor.name = 'db.small'
 
-        mgmt_instance = mgmtmodels.SimpleMgmtInstance(self.context,
-                                                      instance,
-                                                      server,
-                                                      service_status)
         transformer = mgmtmodels.NovaNotificationTransformer(
             context=self.context)
-        with patch.object(mgmtmodels, 'load_mgmt_instances',
-                          return_value=[mgmt_instance]):
+        with patch.object(self.server_mgr, 'list',
+                          side_effect=[[server], []]):
             with patch.object(self.flavor_mgr,
                               'get', return_value=flavor):
                 payloads = transformer()
                 # assertions
                 self.assertIsNotNone(payloads)
-                payload = payloads[0]
+                payload = self._payload(payloads, instance)
                 self.assertThat(payload['audit_period_beginning'],
                                 Not(Is(None)))
                 self.assertThat(payload['audit_period_ending'],
@@ -270,7 +291,9 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
         instance, service_status = self.build_db_instance(status)
         service_status.set_status(rd_instance.ServiceStatuses.SHUTDOWN)
         server = MagicMock(spec=Server)
+        server.id = 'compute_id_1'
         server.user_id = 'test_user_id'
+        server.status = 'ACTIVE'
 
         mgmt_instance = mgmtmodels.SimpleMgmtInstance(self.context,
                                                       instance,
@@ -282,14 +305,14 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
             context=self.context)
         with patch.object(Backup, 'running', return_value=None):
             self.assertThat(mgmt_instance.status, Equals('SHUTDOWN'))
-            with patch.object(mgmtmodels, 'load_mgmt_instances',
-                              return_value=[mgmt_instance]):
+            with patch.object(self.server_mgr, 'list',
+                              side_effect=[[server], []]):
                 with patch.object(self.flavor_mgr, 'get', return_value=flavor):
                     payloads = transformer()
                     # assertion that SHUTDOWN instances are not reported
                     self.assertIsNotNone(payloads)
-                    self.assertNotIn(status.lower(),
-                                     [db['status']
+                    self.assertNotIn(instance.id,
+                                     [db['instance_id']
                                       for db in payloads])
         self.addCleanup(self.do_cleanup, instance, service_status)
 
@@ -307,41 +330,60 @@ class TestNovaNotificationTransformer(MockMgmtInstanceTest):
             context=self.context)
         with patch.object(Backup, 'running', return_value=None):
             self.assertThat(mgmt_instance.status, Equals('SHUTDOWN'))
-            with patch.object(mgmtmodels, 'load_mgmt_instances',
-                              return_value=[mgmt_instance]):
+            with patch.object(self.server_mgr, 'list',
+                              side_effect=[[]]):
                 with patch.object(self.flavor_mgr, 'get', return_value=flavor):
                     payloads = transformer()
                     # assertion that SHUTDOWN instances are not reported
                     self.assertIsNotNone(payloads)
-                    self.assertNotIn(status.lower(),
-                                     [db['status']
+                    self.assertNotIn(instance.id,
+                                     [db['instance_id']
                                       for db in payloads])
         self.addCleanup(self.do_cleanup, instance, service_status)
 
+    def test_tranformer_server_status(self):
+        status = rd_instance.ServiceStatuses.RUNNING.api_status
+        instance, service_status = self.build_db_instance(status)
+        server = MagicMock(spec=Server)
+        server.id = 'compute_id_1'
+        server.user_id = 'test_user_id'
+        server.status = 'ERROR'
+        flavor = MagicMock(spec=Flavor)
+        flavor.name = 'db.small'
+        transformer = mgmtmodels.NovaNotificationTransformer(
+            context=self.context)
+        with patch.object(self.server_mgr, 'list',
+                          side_effect=[[server], []]):
+            with patch.object(self.flavor_mgr, 'get', return_value=flavor):
+                payloads = transformer()
+                payload = self._payload(payloads, instance)
+                self.assertThat(payload['state'], Equals('error'))
+        self.addCleanup(self.do_cleanup, instance, service_status)
+
     def test_tranformer_flavor_cache(self):
         status = rd_instance.ServiceStatuses.BUILDING.api_status
         instance, service_status = self.build_db_instance(
             status, InstanceTasks.BUILDING)
 
         server = MagicMock(spec=Server)
+        server.id = 'compute_id_1'
         server.user_id = 'test_user_id'
-        mgmt_instance = mgmtmodels.SimpleMgmtInstance(self.context,
-                                                      instance,
-                                                      server,
-                                                      service_status)
+        server.status = 'ACTIVE'
         flavor = MagicMock(spec=Flavor)
         flavor.name = 'db.small'
         transformer = mgmtmodels.NovaNotificationTransformer(
             context=self.context)
-        with patch.object(mgmtmodels, 'load_mgmt_instances',
-                          return_value=[mgmt_instance]):
+        with patch.object(self.server_mgr, 'list',
+                          side_effect=[[server], [], [server], []]):
             with patch.object(self.flavor_mgr, 'get', return_value=flavor):
 
                 transformer()
                 payloads = transformer()
                 self.assertIsNotNone(payloads)
-                self.assertThat(len(payloads), Equals(1))
-                payload = payloads[0]
+                self.assertThat(len([payload for payload in payloads
+                                     if payload['instance_id'] ==
+                                     instance.id]), Equals(1))
+                payload = self._payload(payloads, instance)
                 self.assertThat(payload['audit_period_beginning'],
                                 Not(Is(None)))
                 self.assertThat(payload['audit_period_ending'], Not(Is(None)))
@@ -368,19 +410,17 @@ class TestMgmtInstanceTasks(MockMgmtInstanceTest):
         instance, service_status = self.build_db_instance(
             status, task_status=InstanceTasks.BUILDING)
         server = MagicMock(spec=Server)
+        server.id = 'compute_id_1'
         server.user_id = 'test_user_id'
-        mgmt_instance = mgmtmodels.SimpleMgmtInstance(self.context,
-                                                      instance,
-                                                      server,
-                                                      service_status)
+        server.status = 'ACTIVE'
 
         flavor = MagicMock(spec=Flavor)
         flavor.name = 'db.small'
 
         notifier = MagicMock()
         with patch.object(rpc, 'get_notifier', return_value=notifier):
-            with patch.object(mgmtmodels, 'load_mgmt_instances',
-                              return_value=[mgmt_instance]):
+            with patch.object(self.server_mgr, 'list',
+                              side_effect=[[server], []]):
                 with patch.object(self.flavor_mgr, 'get', return_value=flavor):
                     self.assertThat(self.context.auth_token,
                                     Is('some_secret_password'))
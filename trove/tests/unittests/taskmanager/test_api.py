@@ -68,6 +68,13 @@ class ApiTest(trove_testtools.TestCase):
         self._verify_cast('eject_replica_source',
                           instance_id='some-instance-id')
 
+    def test_refresh_configuration(self):
+        self.api.refresh_configuration('some-configuration-id')
+
+        self._verify_rpc_prepare_before_cast()
+        self._verify_cast('refresh_configuration',
+                          configuration_id='some-configuration-id')
+
     def test_create_cluster(self):
         self.api.create_cluster('some-cluster-id')
 
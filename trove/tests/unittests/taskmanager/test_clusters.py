@@ -17,9 +17,11 @@ import datetime
 
 from mock import Mock
 from mock import patch
+from oslo_utils import timeutils
 
 from trove.cluster.models import ClusterTasks as ClusterTaskStatus
 from trove.cluster.models import DBCluster
+from trove.common import exception
 from trove.common.strategies.cluster.experimental.mongodb.taskmanager import (
     MongoDbClusterTasks as ClusterTasks)
 from trove.common import utils
@@ -29,6 +31,7 @@ from trove.instance.models import DBInstance
 from trove.instance.models import Instance
 from trove.instance.models import InstanceServiceStatus
 from trove.instance.models import InstanceTasks
+from trove.instance.models import ServiceStatusWatch
 from trove.taskmanager.models import ServiceStatuses
 from trove.tests.unittests import trove_testtools
 
@@ -95,24 +98,87 @@ class MongoDbClusterTasksTest(trove_testtools.TestCase):
                                          datastore_version=mock_dv1)
 
     @patch.object(ClusterTasks, 'update_statuses_on_failure')
-    @patch.object(InstanceServiceStatus, 'find_by')
+    @patch.object(InstanceServiceStatus, 'find_all_by_instance_ids')
     def test_all_instances_ready_bad_status(self,
                                             mock_find, mock_update):
-        (mock_find.return_value.
-         get_status.return_value) = ServiceStatuses.FAILED
+        mock_status = Mock()
+        mock_status.get_status.return_value = ServiceStatuses.FAILED
+        mock_find.return_value = dict.fromkeys(["1", "2", "3", "4"],
+                                               mock_status)
         ret_val = self.clustertasks._all_instances_ready(["1", "2", "3", "4"],
                                                          self.cluster_id)
         mock_update.assert_called_with(self.cluster_id, None)
         self.assertEqual(False, ret_val)
 
-    @patch.object(InstanceServiceStatus, 'find_by')
+    @patch.object(InstanceServiceStatus, 'find_all_by_instance_ids')
     def test_all_instances_ready(self, mock_find):
-        (mock_find.return_value.
-         get_status.return_value) = ServiceStatuses.BUILD_PENDING
+        mock_status = Mock()
+        mock_status.get_status.return_value = ServiceStatuses.BUILD_PENDING
+        mock_find.return_value = dict.fromkeys(["1", "2", "3", "4"],
+                                               mock_status)
         ret_val = self.clustertasks._all_instances_ready(["1", "2", "3", "4"],
                                                          self.cluster_id)
         self.assertEqual(True, ret_val)
 
+    def test_call_concurrently(self):
+        results = self.clustertasks._call_concurrently(
+            lambda item, factor: item * factor, [1, 2, 3], [10, 20, 30])
+        self.assertEqual([10, 40, 90], results)
+
+    def test_call_concurrently_errors(self):
+        called = []
+
+        def _call(item):
+            called.append(item.id)
+            if item.id != "2":
+                raise Exception("Boom %s!" % item.id)
+
+        items = [Mock(id="1"), Mock(id="2"), Mock(id="3")]
+        error = self.assertRaises(
+            exception.ClusterInstancesOperationError,
+            self.clustertasks._call_concurrently, _call, items)
+        self.assertEqual(["1", "2", "3"], sorted(called))
+        self.assertEqual(["1", "3"], sorted(error.errors))
+        self.assertEqual("Boom 3!", str(error.errors["3"]))
+
+    @patch.object(ServiceStatusWatch, 'wait', return_value=True)
+    @patch.object(InstanceServiceStatus, 'find_all_by_instance_ids')
+    def test_all_instances_ready_after_update(self, mock_find, mock_wait):
+        building = Mock()
+        building.get_status.return_value = ServiceStatuses.BUILDING
+        ready = Mock()
+        ready.get_status.return_value = ServiceStatuses.BUILD_PENDING
+        mock_find.side_effect = [{"1": ready, "2": building},
+                                 {"1": ready},
+                                 {"1": ready, "2": ready}]
+        ret_val = self.clustertasks._all_instances_ready(["1", "2"],
+                                                         self.cluster_id)
+        self.assertEqual(True, ret_val)
+        self.assertEqual(3, mock_find.call_count)
+        mock_find.assert_called_with(["1", "2"])
+        self.assertEqual(2, mock_wait.call_count)
+
+    @patch.object(ClusterTasks, 'update_statuses_on_failure')
+    @patch.object(timeutils, 'utcnow')
+    @patch.object(ServiceStatusWatch, 'wait', return_value=False)
+    @patch.object(InstanceServiceStatus, 'find_all_by_instance_ids')
+    def test_all_instances_ready_timeout(self, mock_find, mock_wait,
+                                         mock_utcnow, mock_update):
+        building = Mock()
+        building.get_status.return_value = ServiceStatuses.BUILDING
+        mock_find.return_value = {"1": building}
+        now = datetime.datetime(2015, 1, 1)
+        mock_utcnow.side_effect = [now, now, now,
+                                   now + datetime.timedelta(days=1)]
+        ret_val = self.clustertasks._all_instances_ready(["1"],
+                                                         self.cluster_id)
+        self.assertEqual(False, ret_val)
+        mock_update.assert_called_with(self.cluster_id, None)
+        # The delay between the checks grows without any status update.
+        first, second = [args[0] for args, kwargs
+                         in mock_wait.call_args_list]
+        self.assertTrue(second > first)
+
     @patch.object(ClusterTasks, 'update_statuses_on_failure')
     @patch.object(ClusterTasks, 'get_guest')
     @patch.object(ClusterTasks, 'get_ip')
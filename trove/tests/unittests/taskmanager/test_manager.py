@@ -14,6 +14,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
 from mock import Mock, patch, PropertyMock
 
 from trove.backup.models import Backup
@@ -207,13 +208,112 @@ class TestManager(trove_testtools.TestCase):
     @patch.object(models.FreshInstanceTasks, 'load')
     @patch.object(Backup, 'delete')
     def test_exception_create_replication_slave(self, mock_delete, mock_load):
-        mock_load.return_value.create_instance = Mock(side_effect=TroveError)
+        mock_load.return_value.create_instance_resources = Mock(
+            side_effect=TroveError)
         self.assertRaises(TroveError, self.manager.create_instance,
                           self.context, ['id1', 'id2'], Mock(), Mock(),
                           Mock(), None, None, 'mysql', 'mysql-server', 2,
                           'temp-backup-id', None, 'some_password', None,
                           Mock(), 'some-master-id', None)
 
+    @patch.object(Backup, 'delete')
+    def test_create_replication_slaves(self, mock_backup_delete):
+        replicas = [Mock(), Mock(), Mock()]
+        for number, replica in enumerate(replicas, 1):
+            replica.get_replication_master_snapshot.return_value = {
+                'dataset': {'snapshot_id': 'test-id'}, 'number': number}
+        replicas[1].create_instance_resources.side_effect = TroveError
+        replicas[1].db_info.task_status.is_error = False
+        with patch.object(models.FreshInstanceTasks, 'load',
+                          side_effect=replicas):
+            self.manager.create_instance(self.context, ['id1', 'id2', 'id3'],
+                                         Mock(), Mock(), Mock(), None, None,
+                                         'mysql', 'mysql-server', 2,
+                                         'temp-backup-id', None,
+                                         ['pw1', 'pw2', 'pw3'], None, Mock(),
+                                         'some-master-id', None)
+        backup_info = replicas[0].get_backup_info.return_value
+        replicas[0].get_backup_info.assert_called_once_with('test-id')
+        self.assertEqual(
+            'temp-backup-id',
+            replicas[0].get_replication_master_snapshot.call_args[0][3])
+        self.assertEqual(
+            'test-id',
+            replicas[2].get_replication_master_snapshot.call_args[0][3])
+        self.assertFalse(replicas[1].prepare_instance.called)
+        replicas[1].update_db.assert_called_once_with(
+            task_status=InstanceTasks.BUILDING_ERROR_REPLICA)
+        for number in [1, 3]:
+            prepare_args = replicas[number - 1].prepare_instance.call_args[0]
+            self.assertEqual(backup_info, prepare_args[5])
+            self.assertEqual('pw%d' % number, prepare_args[6])
+            self.assertEqual(number, prepare_args[9]['number'])
+            self.assertTrue(replicas[number - 1].wait_for_instance.called)
+        mock_backup_delete.assert_called_once_with(self.context, 'test-id')
+
+    @patch.object(Backup, 'delete')
+    def test_stream_create_replication_slaves(self, mock_backup_delete):
+        events = []
+
+        def _offer(*args, **kwargs):
+            events.append('offer')
+            return {'dataset': {'snapshot_id': None}, 'stream': True}
+
+        def _restore(*args, **kwargs):
+            eventlet.sleep(0)
+            events.append('done')
+
+        replicas = [Mock(), Mock(), Mock()]
+        for replica in replicas:
+            replica.get_replication_master_snapshot.side_effect = _offer
+            replica.wait_for_instance.side_effect = _restore
+        with patch.object(models.FreshInstanceTasks, 'load',
+                          side_effect=replicas):
+            self.manager.create_instance(self.context, ['id1', 'id2', 'id3'],
+                                         Mock(), Mock(), Mock(), None, None,
+                                         'mysql', 'mysql-server', 2,
+                                         'temp-backup-id', None,
+                                         ['pw1', 'pw2', 'pw3'], None, Mock(),
+                                         'some-master-id', None)
+        # Each stream is only offered once the previous replica is restored.
+        self.assertEqual(['offer', 'done'] * 3, events)
+        self.assertFalse(mock_backup_delete.called)
+
+    @patch.object(Backup, 'delete')
+    def test_snapshot_failed_create_replication_slaves(self,
+                                                       mock_backup_delete):
+        replicas = [Mock(), Mock()]
+        replicas[0].get_replication_master_snapshot.side_effect = TroveError
+        with patch.object(models.FreshInstanceTasks, 'load',
+                          side_effect=replicas):
+            self.assertRaises(TroveError, self.manager.create_instance,
+                              self.context, ['id1', 'id2'], Mock(), Mock(),
+                              Mock(), None, None, 'mysql', 'mysql-server', 2,
+                              'temp-backup-id', None, ['pw1', 'pw2'], None,
+                              Mock(), 'some-master-id', None)
+        for replica in replicas:
+            self.assertTrue(replica.create_instance_resources.called)
+            self.assertFalse(replica.prepare_instance.called)
+        self.assertFalse(mock_backup_delete.called)
+
+    @patch.object(Backup, 'delete')
+    def test_backup_info_failed_create_replication_slaves(
+            self, mock_backup_delete):
+        replicas = [Mock(), Mock()]
+        replicas[0].get_replication_master_snapshot.return_value = {
+            'dataset': {'snapshot_id': 'test-id'}}
+        replicas[0].get_backup_info.side_effect = TroveError
+        with patch.object(models.FreshInstanceTasks, 'load',
+                          side_effect=replicas):
+            self.assertRaises(TroveError, self.manager.create_instance,
+                              self.context, ['id1', 'id2'], Mock(), Mock(),
+                              Mock(), None, None, 'mysql', 'mysql-server', 2,
+                              'temp-backup-id', None, ['pw1', 'pw2'], None,
+                              Mock(), 'some-master-id', None)
+        for replica in replicas:
+            self.assertFalse(replica.prepare_instance.called)
+        mock_backup_delete.assert_called_once_with(self.context, 'test-id')
+
     def test_AttributeError_create_instance(self):
         self.assertRaisesRegexp(
             AttributeError, 'Cannot create multiple non-replica instances.',
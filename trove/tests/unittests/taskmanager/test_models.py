@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import datetime
+import json
 import os
 from tempfile import NamedTemporaryFile
 import uuid
@@ -30,6 +31,7 @@ import trove.backup.models
 from trove.backup import models as backup_models
 from trove.backup import state
 import trove.common.context
+from trove.common import dedup
 from trove.common.exception import GuestError
 from trove.common.exception import MalformedSecurityGroupRuleError
 from trove.common.exception import PollTimeOut
@@ -38,6 +40,7 @@ from trove.common.instance import ServiceStatuses
 from trove.common import remote
 import trove.common.template as template
 from trove.common import utils
+from trove.configuration import models as config_models
 from trove.datastore import models as datastore_models
 import trove.db.models
 from trove.extensions.mysql import models as mysql_models
@@ -941,6 +944,143 @@ class BackupTasksTest(trove_testtools.TestCase):
                 self.backup.state,
                 "backup should be in DELETE_FAILED status")
 
+    def test_delete_backup_fail_connection(self):
+        self.swift_client.head_object = MagicMock(
+            side_effect=RuntimeError("foo"))
+        self.assertRaises(
+            RuntimeError,
+            taskmanager_models.BackupTasks.delete_backup,
+            'dummy context', self.backup.id)
+        self.assertFalse(self.backup.delete.called)
+        self.assertEqual(state.BackupState.DELETE_FAILED, self.backup.state)
+
+    @patch.object(taskmanager_models.BackupTasks, 'DELETE_PROGRESS_INTERVAL',
+                  1)
+    def test_delete_backup_progress_not_saved(self):
+        self.swift_client.head_object = MagicMock(
+            return_value={'x-object-manifest': 'database_backups/12e48_'})
+        taskmanager_models.BackupTasks.delete_backup('dummy context',
+                                                     self.backup.id)
+        self.assertEqual(1, self.bm_DBBackup_mock.call_count)
+        self.backup.delete.assert_any_call()
+
+    def test_delete_backup_segments(self):
+        states = []
+        self.swift_client.head_object = MagicMock(
+            return_value={'x-object-manifest': 'database_backups/12e48_'})
+        self.swift_client.delete_object = MagicMock(
+            side_effect=lambda container, name: states.append(
+                self.backup.state))
+        taskmanager_models.BackupTasks.delete_backup('dummy context',
+                                                     self.backup.id)
+        self.swift_client.get_container.assert_called_once_with(
+            'database_backups', prefix='12e48_', full_listing=True)
+        self.assertEqual(
+            sorted([(('database_backups', 'first'),),
+                    (('database_backups', 'second'),),
+                    (('database_backups', 'third'),)]),
+            sorted(self.swift_client.delete_object.call_args_list[:3]))
+        self.assertEqual(
+            (('database_backups', '12e48.xbstream.gz'),),
+            self.swift_client.delete_object.call_args)
+        self.assertEqual([state.BackupState.DELETING] * 4, states)
+        self.backup.delete.assert_any_call()
+
+    def test_delete_backup_segments_already_deleted(self):
+        def delete_object(container, name):
+            if name == 'second':
+                raise ClientException("foo", http_status=404)
+        self.swift_client.head_object = MagicMock(
+            return_value={'x-object-manifest': 'database_backups/12e48_'})
+        self.swift_client.delete_object = MagicMock(side_effect=delete_object)
+        taskmanager_models.BackupTasks.delete_backup('dummy context',
+                                                     self.backup.id)
+        self.assertEqual(4, self.swift_client.delete_object.call_count)
+        self.backup.delete.assert_any_call()
+
+    def _dedup_container(self, manifests, chunks, unreferenced=None):
+        objects = [{'name': name, 'content_type': dedup.MANIFEST_CONTENT_TYPE}
+                   for name in manifests]
+        objects.extend({'name': dedup.chunk_name(digest),
+                        'content_type': 'application/octet-stream',
+                        'last_modified': modified}
+                       for digest, modified in chunks.items())
+
+        def get_container(container, prefix='', **kwargs):
+            return None, [obj for obj in objects
+                          if obj['name'].startswith(prefix)]
+
+        def get_object(container, name):
+            if name == dedup.UNREFERENCED_OBJECT:
+                if unreferenced is None:
+                    raise ClientException("foo", http_status=404)
+                return None, json.dumps(unreferenced)
+            return None, manifests[name]
+        self.swift_client.get_container = MagicMock(side_effect=get_container)
+        self.swift_client.get_object = MagicMock(side_effect=get_object)
+        self.swift_client.head_object = MagicMock(
+            return_value={'content-type': dedup.MANIFEST_CONTENT_TYPE})
+
+    def _delete_dedup_backup(self, running=None):
+        context = trove.common.context.TroveContext(tenant='tenant')
+        with patch.object(backup_models.Backup, 'running_for_tenant',
+                          return_value=running):
+            taskmanager_models.BackupTasks.delete_files_from_swift(
+                context, '12e48.xbstream.gz')
+
+    def _saved_unreferenced(self):
+        args, kwargs = self.swift_client.put_object.call_args
+        self.assertEqual(('database_backups', dedup.UNREFERENCED_OBJECT),
+                         args[:2])
+        return json.loads(args[2])
+
+    def test_delete_dedup_backup_marks_chunks(self):
+        # 12e48.xbstream.gz is already deleted and no longer listed
+        self._dedup_container(
+            {'other.xbstream.gz': dedup.dump_manifest([('shared', 10)])},
+            {'shared': 't1', 'unused': 't1'})
+        self._delete_dedup_backup()
+        self.swift_client.delete_object.assert_called_once_with(
+            'database_backups', '12e48.xbstream.gz')
+        self.assertEqual({'unused': 't1'},
+                         self._saved_unreferenced()['chunks'])
+
+    def test_delete_dedup_backup_deletes_marked_chunks(self):
+        self._dedup_container(
+            {'other.xbstream.gz': dedup.dump_manifest([('shared', 10)])},
+            {'shared': 't1', 'unused': 't1', 'uploaded_again': 't2',
+             'unmarked': 't1'},
+            {'collected_at': 0,
+             'chunks': {'unused': 't1', 'uploaded_again': 't1',
+                        'shared': 't1'}})
+        self._delete_dedup_backup()
+        self.assertEqual(
+            [(('database_backups', '12e48.xbstream.gz'),),
+             (('database_backups', dedup.chunk_name('unused')),)],
+            self.swift_client.delete_object.call_args_list)
+        self.assertEqual({'unused': 't1', 'uploaded_again': 't2',
+                          'unmarked': 't1'},
+                         self._saved_unreferenced()['chunks'])
+
+    def test_delete_dedup_backup_collected_recently(self):
+        self._dedup_container({}, {'unused': 't1'},
+                              {'collected_at': timeutils.utcnow_ts(),
+                               'chunks': {'unused': 't1'}})
+        self._delete_dedup_backup()
+        self.swift_client.delete_object.assert_called_once_with(
+            'database_backups', '12e48.xbstream.gz')
+        self.assertFalse(self.swift_client.put_object.called)
+
+    def test_delete_dedup_backup_while_backup_running(self):
+        self._dedup_container({}, {'unused': 't1'},
+                              {'collected_at': 0,
+                               'chunks': {'unused': 't1'}})
+        self._delete_dedup_backup(running=self.backup)
+        self.swift_client.delete_object.assert_called_once_with(
+            'database_backups', '12e48.xbstream.gz')
+        self.assertEqual({'unused': 't1'},
+                         self._saved_unreferenced()['chunks'])
+
     def test_parse_manifest(self):
         manifest = 'container/prefix'
         cont, prefix = taskmanager_models.BackupTasks._parse_manifest(manifest)
@@ -966,6 +1106,53 @@ class BackupTasksTest(trove_testtools.TestCase):
         self.assertEqual('', prefix)
 
 
+class ConfigurationTasksTest(trove_testtools.TestCase):
+
+    def setUp(self):
+        super(ConfigurationTasksTest, self).setUp()
+        self.context = trove.common.context.TroveContext(tenant='tenant')
+        self.instances = [Mock(id='instance-%d' % i) for i in range(3)]
+        for instance in self.instances:
+            instance.db_info.task_status = InstanceTasks.NONE
+        patches = [
+            patch.object(config_models.Configuration, 'load'),
+            patch.object(config_models.Configuration,
+                         'get_configuration_overrides',
+                         return_value={'max_connections': 10}),
+            patch.object(config_models.Configuration,
+                         'does_configuration_need_restart',
+                         return_value=False),
+            patch.object(datastore_models.DatastoreVersion, 'load_by_uuid'),
+            patch.object(datastore_models.Datastore, 'load'),
+            patch.object(taskmanager_models.ConfigurationTasks,
+                         '_instance_batches',
+                         return_value=iter([self.instances[:2],
+                                            self.instances[2:]])),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_refresh_instances(self):
+        failed = taskmanager_models.ConfigurationTasks.refresh_instances(
+            self.context, 'config-id')
+        self.assertEqual([], failed)
+        for instance in self.instances:
+            instance.push_overrides.assert_called_once_with(
+                {'max_connections': 10}, False)
+            self.assertFalse(instance.update_db.called)
+
+    def test_refresh_instances_failure(self):
+        self.instances[1].push_overrides.side_effect = GuestError("foo")
+        failed = taskmanager_models.ConfigurationTasks.refresh_instances(
+            self.context, 'config-id')
+        self.assertEqual(['instance-1'], failed)
+        for instance in self.instances:
+            instance.push_overrides.assert_called_once_with(
+                {'max_connections': 10}, False)
+            self.assertFalse(instance.update_db.called)
+
+
 class NotifyMixinTest(trove_testtools.TestCase):
     def test_get_service_id(self):
         id_map = {